@@ -0,0 +1,33 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def async_url(url: str):
+    """DATABASE_URL with its async driver: asyncpg for Postgres, aiosqlite for SQLite."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        # asyncpg takes ssl= where libpq takes sslmode= (Supabase URLs carry it)
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    return url
+
+
+# The database behind app.database.engine, for `async def` routes: queries
+# are awaited instead of blocking the event loop. It keeps a connection pool
+# of its own next to the sync engine's.
+async_engine = create_async_engine(async_url(settings.DATABASE_URL))
+# Objects stay readable after commit without another round trip
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
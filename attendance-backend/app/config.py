@@ -8,6 +8,63 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440
     SUPABASE_URL: str
     SUPABASE_KEY: str
+    # Who keeps attendance_summary and course_daily_attendance in step with attendance_records:
+    # "db" (plpgsql triggers), "app" (AttendanceService) or "auto" (app on SQLite)
+    SUMMARY_MAINTENANCE: str = "auto"
+    # Queued marking (/api/faculty/attendance/mark?queued=true)
+    ATTENDANCE_QUEUE_MAXSIZE: int = 1000
+    ATTENDANCE_QUEUE_BATCH_SIZE: int = 50
+    ATTENDANCE_QUEUE_MAX_WAIT_MS: int = 50
+    # Offline sync (/api/faculty/attendance/batch)
+    ATTENDANCE_BATCH_MAX_SESSIONS: int = 200
+    # Months in which a semester starts (window=semester on /api/students/trends)
+    SEMESTER_START_MONTHS: list[int] = [1, 7]
+    # Cached shortage_threshold rules; in-process changes invalidate at once,
+    # this bounds staleness for edits made elsewhere
+    THRESHOLD_CACHE_TTL_SECONDS: int = 300
+    # Cached per-course percentage distributions; marking a course drops its
+    # entry at once, this bounds staleness for writes made elsewhere
+    DISTRIBUTION_CACHE_TTL_SECONDS: int = 300
+    # Student dashboard cache (per student, dropped when their enrollments are
+    # written); set DASHBOARD_CACHE_URL (redis://...) to share it between workers
+    DASHBOARD_CACHE_ENABLED: bool = True
+    DASHBOARD_CACHE_TTL_SECONDS: int = 300
+    DASHBOARD_CACHE_MAX_ENTRIES: int = 10000
+    DASHBOARD_CACHE_URL: str = ""
+    # Admin dashboard snapshot: rebuilt in the background on this interval, or
+    # after this many committed writes (0 = on the interval only)
+    ADMIN_SNAPSHOT_INTERVAL_SECONDS: int = 60
+    ADMIN_SNAPSHOT_MAX_WRITES: int = 500
+    # Background shortage sweep (status, reports, notifications); 0 disables
+    SHORTAGE_SWEEP_INTERVAL_SECONDS: int = 300
+    # Early-warning forecast: sessions in the recent window / sessions ahead
+    SHORTAGE_FORECAST_WINDOW: int = 10
+    SHORTAGE_FORECAST_HORIZON: int = 10
+    # Live change feed (/api/notifications/stream and /ws): events kept for
+    # resuming with Last-Event-ID, undelivered events per connection before it
+    # is resynced from that buffer, keep-alive interval, connection cap
+    LIVE_FEED_BUFFER_SIZE: int = 10000
+    LIVE_FEED_MAX_PENDING: int = 1000
+    LIVE_FEED_HEARTBEAT_SECONDS: int = 20
+    LIVE_FEED_MAX_CONNECTIONS: int = 10000
+    # Live marking sessions (/api/faculty/attendance/live/...): changes are
+    # written to attendance_records at most this often, and when the last
+    # participant leaves
+    LIVE_MARKING_FLUSH_MS: int = 2000
+    # Token -> user (with student/faculty profile id) cache behind
+    # get_current_user; edits committed through this process apply at once,
+    # the TTL bounds staleness for edits made elsewhere
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    # Password hashing runs on its own threads (0 = one per CPU) so logins
+    # don't hold up the request threadpool; beyond the workers at most
+    # PASSWORD_HASH_QUEUE_LIMIT calls wait, each for at most the timeout,
+    # before the request gets a 503. Hashes at another cost are upgraded on login
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 0
+    PASSWORD_HASH_QUEUE_LIMIT: int = 256
+    PASSWORD_HASH_TIMEOUT_SECONDS: float = 10
     
     class Config:
         env_file = ".env"
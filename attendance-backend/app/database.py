@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from datetime import datetime, timezone
+from sqlalchemy import DateTime, String, cast, create_engine, delete, false, func, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import get_settings
@@ -22,3 +24,66 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def dialect_insert(db, model):
+    """
+    Returns an INSERT construct for `model` that supports ON CONFLICT on the
+    backend of `db`, a Session or Connection (Postgres and SQLite share the
+    same upsert API).
+    """
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    if bind.dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+def lock_for_write(db, model, keys):
+    """
+    Holds off other transactions writing `model`'s table for any of `keys`
+    until this one ends, so rows read before writing are still current when
+    the write lands. Postgres takes a transaction-level advisory lock per
+    key, in sorted order so two writers can't deadlock. SQLite has one
+    writer at a time: its write lock is taken now, with a no-op DELETE,
+    instead of at the first write.
+    """
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    if bind.dialect.name == "sqlite":
+        db.execute(delete(model).where(false()))
+        return
+    for key in sorted({f"{model.__tablename__}:{key}" for key in keys}):
+        db.execute(select(func.pg_advisory_xact_lock(func.hashtext(key))))
+
+def clock_now(db):
+    """
+    SQL expression for the time a row is written, to stamp it with:
+    clock_timestamp() on Postgres, where now() is when the transaction
+    began; on SQLite, whose CURRENT_TIMESTAMP has whole seconds only, a
+    microsecond UTC timestamp taken now.
+    """
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    if bind.dialect.name == "sqlite":
+        return literal(datetime.now(timezone.utc), DateTime(timezone=True))
+    return func.clock_timestamp()
+
+def new_uuid_expr(db):
+    """
+    SQL expression generating a fresh UUID server-side, for INSERT ... SELECT.
+    SQLite stores Uuid columns as 32 hex characters.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return func.lower(func.hex(func.randomblob(16)))
+    return func.gen_random_uuid()
+
+# Ids per IN (...) list, under SQLite's 999 bound-parameter limit
+IN_CHUNK = 900
+
+def chunks(ids, size=IN_CHUNK):
+    """Consecutive slices of the list `ids`, each small enough for one IN (...)."""
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def text_id(column):
+    """
+    A UUID column read as text. For bulk reads: building UUID objects for
+    100k+ rows costs more than the arithmetic done on them.
+    """
+    return cast(column, String)
@@ -1,10 +1,11 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import traceback
 import sys
-from sqlalchemy import text
 from app.routers import auth, courses, attendance, dashboard, faculty, student, reports, notifications
+from app.async_database import async_engine
 from app.database import engine, Base
 from app.models.user import User
 from app.models.student import Student
@@ -13,47 +14,42 @@ from app.models.course import Course, CourseEnrollment
 from app.models.attendance import AttendanceRecord, AttendanceSummary, ShortageThreshold, ShortageReport
 from app.models.notification import Notification
 from app.models.user_settings import UserSettings
+from app.models.entity_version import EntityVersion
+from app.schema_patches import apply_schema_patches
+from app.services.admin_snapshot import admin_snapshot
+from app.services.password_hasher import password_hasher
+from app.services.shortage_service import shortage_sweep
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
-# Patch/normalize Postgres trigger functions (older DBs may have mismatched definitions)
+# Indexes added after the first release (create_all skips existing tables);
+# Postgres gets them from the schema patches below
+if engine.url.get_backend_name() == "sqlite":
+    for index in ShortageReport.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+
+# Versioned Postgres patches (statement-level summary trigger, shortage sweep, ...)
 try:
     if engine.url.get_backend_name() not in ["sqlite"]:
         with engine.begin() as conn:
-            # Ensure the shortage notification trigger function matches our schema.
-            conn.execute(text("""
-CREATE OR REPLACE FUNCTION notify_shortage()
-RETURNS TRIGGER AS $$
-DECLARE
-    v_user_id UUID;
-    v_course_name VARCHAR(255);
-BEGIN
-    SELECT u.user_id, c.course_name INTO v_user_id, v_course_name
-    FROM course_enrollments ce
-    JOIN students s ON ce.student_id = s.student_id
-    JOIN users u ON s.user_id = u.user_id
-    JOIN courses c ON ce.course_id = c.course_id
-    WHERE ce.enrollment_id = NEW.enrollment_id;
-
-    INSERT INTO notifications (user_id, title, message, type)
-    VALUES (
-        v_user_id,
-        'Attendance Shortage Alert',
-        FORMAT('Your attendance in %s is %.2f%%, which is below the required threshold.',
-               v_course_name, NEW.attendance_percentage),
-        'shortage_alert'
-    );
-
-    RETURN NEW;
-END;
-$$ LANGUAGE plpgsql;
-            """))
+            apply_schema_patches(conn)
 except Exception as e:
     # Don't block app startup if DB doesn't support these objects (e.g. sqlite)
     print(f"WARNING: trigger patch skipped/failed: {e}")
 
-app = FastAPI(title="Attendance Monitoring System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background jobs run for the life of the worker
+    shortage_sweep.start()
+    admin_snapshot.start()
+    yield
+    shortage_sweep.stop()
+    admin_snapshot.stop()
+    password_hasher.stop()
+    await async_engine.dispose()
+
+app = FastAPI(title="Attendance Monitoring System", lifespan=lifespan)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
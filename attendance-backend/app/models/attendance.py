@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Uuid, DateTime, ForeignKey, Date, Text, Boolean, Numeric, UniqueConstraint
+from sqlalchemy import Column, String, Integer, Uuid, DateTime, ForeignKey, Date, Text, Boolean, Numeric, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -44,6 +44,37 @@ class AttendanceSummary(Base):
         UniqueConstraint('enrollment_id', name='uq_summary_enrollment'),
     )
 
+class CourseDailyAttendance(Base):
+    """Per-course, per-day status counts, kept in step with attendance_records on write."""
+    __tablename__ = "course_daily_attendance"
+
+    course_id = Column(Uuid(as_uuid=True), ForeignKey('courses.course_id', ondelete='CASCADE'), primary_key=True)
+    class_date = Column(Date, primary_key=True)
+    present_count = Column(Integer, nullable=False, default=0)
+    late_count = Column(Integer, nullable=False, default=0)
+    absent_count = Column(Integer, nullable=False, default=0)
+    excused_count = Column(Integer, nullable=False, default=0)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class AttendanceCohortCube(Base):
+    """Attendance summary totals per cohort cell, kept in step with attendance_summary on write."""
+    __tablename__ = "attendance_cohort_cube"
+
+    student_department = Column(String(100), primary_key=True)
+    semester = Column(Integer, primary_key=True)
+    batch_year = Column(Integer, primary_key=True)
+    course_department = Column(String(100), primary_key=True)
+    academic_year = Column(String(10), primary_key=True)
+    enrollments = Column(Integer, nullable=False, default=0) # with at least one class held
+    total_classes = Column(Integer, nullable=False, default=0)
+    classes_attended = Column(Integer, nullable=False, default=0)
+    classes_late = Column(Integer, nullable=False, default=0)
+    classes_absent = Column(Integer, nullable=False, default=0)
+    classes_excused = Column(Integer, nullable=False, default=0)
+    percentage_sum = Column(Numeric(14, 2), nullable=False, default=0) # over the same enrollments
+    shortage_count = Column(Integer, nullable=False, default=0)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class ShortageThreshold(Base):
     __tablename__ = "shortage_threshold"
     
@@ -73,3 +104,24 @@ class ShortageReport(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     enrollment = relationship("CourseEnrollment")
+    
+    # One report per enrollment and day, upserted by the shortage sweep. An
+    # index rather than a constraint so it can be added to existing tables.
+    __table_args__ = (
+        Index('uq_shortage_reports_enrollment_date', 'enrollment_id', 'report_date', unique=True),
+    )
+
+class ShortageForecast(Base):
+    """Early-warning forecast from the nightly forecaster (app/services/forecast_service.py); one row per flagged enrollment."""
+    __tablename__ = "shortage_forecasts"
+
+    enrollment_id = Column(Uuid(as_uuid=True), ForeignKey('course_enrollments.enrollment_id', ondelete='CASCADE'), primary_key=True)
+    forecast_date = Column(Date, nullable=False)
+    classes_held = Column(Integer, nullable=False)
+    current_percentage = Column(Numeric(5, 2), nullable=False)
+    recent_rate = Column(Numeric(5, 2), nullable=False) # % attended over the recent window
+    trend_slope = Column(Numeric(6, 2), nullable=False) # percentage points per session over that window
+    projected_percentage = Column(Numeric(5, 2), nullable=False) # after the forecast horizon
+    warning_percentage = Column(Numeric(5, 2), nullable=False)
+    sessions_to_warning = Column(Integer, nullable=False) # 0 = already below warning
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, BigInteger, DateTime, String
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class EntityVersion(Base):
+    """Monotonic change counter per entity, for ETags (see app/services/version_service.py)."""
+    __tablename__ = "entity_versions"
+
+    kind = Column(String(20), primary_key=True)
+    entity_id = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
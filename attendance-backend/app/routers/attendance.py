@@ -1,35 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 from datetime import date
 from app.database import get_db
 from app.models.attendance import AttendanceRecord, AttendanceSummary
 from app.models.course import CourseEnrollment
 from app.models.user import User
-from app.schemas.attendance import BulkAttendanceCreate, AttendanceRecordResponse, AttendanceSummaryResponse
+from app.schemas.attendance import AttendanceSubmission, AttendanceRecordResponse, AttendanceSummaryResponse
 from app.utils.security import get_current_user
-from app.services.attendance_service import attendance_service
+from app.services.attendance_service import attendance_service, IdempotencyKeyConflict
 
 router = APIRouter(prefix="/api/attendance", tags=["Attendance"])
 
 @router.post("/bulk", status_code=status.HTTP_201_CREATED)
-def mark_bulk_attendance(data: BulkAttendanceCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def mark_bulk_attendance(
+    data: AttendanceSubmission,
+    idempotency_key: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     # Only faculty or admin can mark attendance
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    from app.models.faculty import Faculty
-    faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
-    faculty_id = faculty.faculty_id if faculty else None
+    faculty_id = current_user.faculty_id
 
-    return attendance_service.mark_attendance(
-        db=db,
-        course_id=data.course_id,
-        class_date=data.class_date,
-        attendance_data=data.attendance_data,
-        marked_by=faculty_id
-    )
+    try:
+        return attendance_service.mark_attendance(
+            db=db,
+            course_id=data.course_id,
+            class_date=data.class_date,
+            attendance_data=data.attendance_data,
+            marked_by=faculty_id,
+            idempotency_key=idempotency_key,
+            submitted_by=current_user.user_id
+        )
+    except IdempotencyKeyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different submission")
 
 @router.get("/student/{student_id}", response_model=List[AttendanceSummaryResponse])
 def get_student_attendance_summary(student_id: UUID, db: Session = Depends(get_db)):
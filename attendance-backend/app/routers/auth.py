@@ -1,14 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
+from app.async_database import get_async_db
 from app.database import get_db
 from app.models.user import User
 from app.models.student import Student
 from app.models.faculty import Faculty
 from app.schemas.user import UserCreate, UserResponse, Token
-from app.utils.security import verify_password, get_password_hash, create_access_token
+from app.utils.security import create_access_token
 from app.utils.security import get_current_user
+from app.services.password_hasher import password_hasher, PasswordHasherBusy
+from app.services.principal_cache import principal_cache
 from app.schemas.user import ForgotPasswordRequest, ResetPasswordRequest
 import uuid
 from pydantic import BaseModel
@@ -25,13 +30,30 @@ class ChangePasswordRequest(BaseModel):
 class NotificationPreferenceRequest(BaseModel):
     enabled: bool
 
+async def _hashing(operation, *args):
+    """Await a password_hasher call, answering 503 while hashing is saturated."""
+    try:
+        return await operation(*args)
+    except PasswordHasherBusy:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many sign-ins right now, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+# Password routes are async so bcrypt runs on the hashing pool instead of
+# holding a request thread, and use the async session. Each one closes the
+# session before awaiting a hash so a sign-in burst doesn't hold a pooled
+# connection per queued hash; the session reconnects if used again.
+
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = (await db.execute(select(User.user_id).filter(User.email == user.email))).first()
+    await db.close()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await _hashing(password_hasher.hash, user.password)
     db_user = User(
         email=user.email,
         password_hash=hashed_password,
@@ -40,8 +62,7 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         phone=user.phone
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.flush()
     
     # Create corresponding profile based on role
     if user.role == "student":
@@ -54,7 +75,6 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             enrollment_date=date.today()
         )
         db.add(student_profile)
-        db.commit()
     elif user.role == "faculty":
         faculty_profile = Faculty(
             user_id=db_user.user_id,
@@ -63,41 +83,70 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             designation="Lecturer"
         )
         db.add(faculty_profile)
-        db.commit()
+    await db.commit()
     
+    # Server defaults (created_at) loaded here, not lazily by the serializer
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(
+        select(User.user_id, User.email, User.password_hash).filter(User.email == form_data.username)
+    )).first()
+    await db.close()
+    if not user or not await _hashing(password_hasher.verify, form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
-    
+
     access_token = create_access_token(data={"sub": user.email})
+
+    # Upgrade a hash made at another cost while we have the password
+    new_hash = await password_hasher.rehash(form_data.password, user.password_hash)
+    if new_hash:
+        db_user = await db.get(User, user.user_id)
+        db_user.password_hash = new_hash
+        await db.commit()
+
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
+@router.get("/principal-cache")
+def get_principal_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return principal_cache.stats()
+
+@router.get("/hasher")
+def get_password_hasher_stats(current_user: User = Depends(get_current_user)):
+    """Password hashing pool: cost, queue depth, rejections, queue wait and hash time percentiles."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return password_hasher.stats()
+
 
 @router.put("/change-password")
-def change_password(
+async def change_password(
     payload: ChangePasswordRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    if not verify_password(payload.old_password, current_user.password_hash):
+    if not await _hashing(password_hasher.verify, payload.old_password, current_user.password_hash):
         raise HTTPException(status_code=400, detail="Old password is incorrect")
 
     if len(payload.new_password) < 6:
         raise HTTPException(status_code=400, detail="New password must be at least 6 characters")
 
-    current_user.password_hash = get_password_hash(payload.new_password)
-    db.commit()
+    # current_user may be a detached principal cache copy: write through the row
+    password_hash = await _hashing(password_hasher.hash, payload.new_password)
+    user = await db.get(User, current_user.user_id)
+    user.password_hash = password_hash
+    await db.commit()
     return {"message": "Password updated successfully"}
 
 
@@ -134,8 +183,8 @@ def update_notification_preference(
 RESET_TOKENS = {}
 
 @router.post("/forgot-password")
-async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+async def forgot_password(request: ForgotPasswordRequest, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(User).filter(User.email == request.email))).scalars().first()
     if not user:
         # For security, don't confirm if user exists or not, but for this mock we will
         raise HTTPException(status_code=404, detail="User with this email not found")
@@ -155,17 +204,20 @@ async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(
     return {"message": "Reset link generated. Check the server console."}
 
 @router.post("/reset-password/{token}")
-async def reset_password(token: str, request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(token: str, request: ResetPasswordRequest, db: AsyncSession = Depends(get_async_db)):
     email = RESET_TOKENS.get(token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired reset token")
     
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
+    user_id = (await db.execute(select(User.user_id).filter(User.email == email))).scalar()
+    await db.close()
+    if not user_id:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user.password_hash = get_password_hash(request.password)
-    db.commit()
+    password_hash = await _hashing(password_hasher.hash, request.password)
+    user = await db.get(User, user_id)
+    user.password_hash = password_hash
+    await db.commit()
     
     # Remove token after use
     del RESET_TOKENS[token]
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from uuid import UUID
@@ -7,6 +7,7 @@ from app.models.course import Course, CourseEnrollment
 from app.models.user import User
 from app.models.student import Student
 from app.schemas.course import CourseCreate, CourseResponse, EnrollmentCreate, EnrollmentResponse
+from app.services.version_service import COURSE, COURSE_LIST, entity_versions
 from app.utils.security import get_current_user
 
 router = APIRouter(prefix="/api/courses", tags=["Courses"])
@@ -24,12 +25,18 @@ def create_course(course: CourseCreate, db: Session = Depends(get_db), current_u
     return db_course
 
 @router.get("/", response_model=List[CourseResponse])
-def read_courses(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_courses(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    not_modified = entity_versions.conditional(request, response, db, [COURSE_LIST], skip, limit)
+    if not_modified:
+        return not_modified
     courses = db.query(Course).offset(skip).limit(limit).all()
     return courses
 
 @router.get("/{course_id}", response_model=CourseResponse)
-def read_course(course_id: UUID, db: Session = Depends(get_db)):
+def read_course(course_id: UUID, request: Request, response: Response, db: Session = Depends(get_db)):
+    not_modified = entity_versions.conditional(request, response, db, [(COURSE, course_id)])
+    if not_modified:
+        return not_modified
     course = db.query(Course).filter(Course.course_id == course_id).first()
     if course is None:
         raise HTTPException(status_code=404, detail="Course not found")
@@ -54,10 +61,14 @@ def enroll_student(enrollment: EnrollmentCreate, db: Session = Depends(get_db),
     db.refresh(db_enrollment)
     return db_enrollment
 @router.get("/{course_id}/students")
-def get_enrolled_students(course_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_enrolled_students(course_id: UUID, request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     # Authenticate faculty or admin
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Not authorized")
+
+    not_modified = entity_versions.conditional(request, response, db, [(COURSE, course_id)])
+    if not_modified:
+        return not_modified
         
     students = db.query(Student, User.full_name, Student.roll_number).join(
         User, Student.user_id == User.user_id
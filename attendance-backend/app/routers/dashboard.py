@@ -1,25 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+from sqlalchemy import func
 import datetime
 import traceback
-from app.database import get_db
+from typing import List, Literal, Optional
+from app.async_database import get_async_db
 from app.models.user import User
 from app.models.student import Student
 from app.models.faculty import Faculty
 from app.models.course import Course, CourseEnrollment
-from app.models.attendance import AttendanceSummary, AttendanceRecord
+from app.models.attendance import AttendanceSummary
 from app.utils.security import get_current_user
+from app.services.admin_snapshot import admin_snapshot
+from app.services.cube_service import cohort_cube
+from app.services.dashboard_cache import student_dashboard_cache
+from app.services.forecast_service import shortage_forecaster
+from app.services.rollup_service import daily_rollup
+from app.services.version_service import COURSE, COURSE_LIST, FORECASTS, USER, entity_versions
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
+# Dashboards are served on the async session; the query code they share with
+# the services is sync and runs through run_sync, on the same connection and
+# without a threadpool hop. Dashboard cache lookups go through
+# get_or_build_async, which keeps a Redis backend off the event loop.
+
 @router.get("/student")
-def get_student_dashboard(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_student_dashboard(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Not a student")
     
-    student = db.query(Student).filter(Student.user_id == current_user.user_id).first()
-    if not student:
+    student_id = current_user.student_id
+    if not student_id:
         # Return empty dashboard if profile doesn't exist yet
         return {
             "overall_percentage": 0,
@@ -31,6 +44,12 @@ def get_student_dashboard(db: Session = Depends(get_db), current_user: User = De
             }
         }
         
+    # The profile is only loaded when the dashboard has to be built
+    return await student_dashboard_cache.get_or_build_async("dashboard", student_id, lambda: db.run_sync(
+        lambda session: _student_dashboard(session, session.get(Student, student_id))
+    ))
+
+def _student_dashboard(db: Session, student: Student):
     summaries = db.query(AttendanceSummary, Course).join(
         CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
     ).join(
@@ -67,11 +86,28 @@ def get_student_dashboard(db: Session = Depends(get_db), current_user: User = De
         }
     }
 
+@router.get("/cache")
+def get_dashboard_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not an admin")
+    return student_dashboard_cache.stats()
+
+@router.put("/cache")
+def set_dashboard_cache(enabled: bool, current_user: User = Depends(get_current_user)):
+    """Turn the student dashboard cache on or off in this process (debugging); clears it either way."""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not an admin")
+    student_dashboard_cache.enabled = enabled
+    student_dashboard_cache.clear()
+    return student_dashboard_cache.stats()
+
 @router.get("/faculty")
-def get_faculty_dashboard(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_faculty_dashboard(request: Request, response: Response, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "faculty":
         raise HTTPException(status_code=403, detail="Not a faculty member")
-        
+    return await db.run_sync(_faculty_dashboard, request, response, current_user)
+
+def _faculty_dashboard(db: Session, request: Request, response: Response, current_user: User):
     try:
         # Resolve faculty_id
         faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
@@ -80,9 +116,23 @@ def get_faculty_dashboard(db: Session = Depends(get_db), current_user: User = De
                 "faculty_info": {"employee_id": "Not Set", "department": "Not Set"},
                 "courses": [],
                 "stats": {"total_students": 0, "avg_attendance": 0, "total_courses": 0},
-                "daily_activity": []
+                "daily_activity": [],
+                "early_warnings": []
             }
-            
+
+        # Everything below changes with these courses, their enrollments,
+        # the forecast run, the faculty profile or the date
+        course_ids = [course_id for (course_id,) in db.query(CourseEnrollment.course_id).filter(
+            CourseEnrollment.faculty_id == faculty.faculty_id
+        ).distinct().all()]
+        not_modified = entity_versions.conditional(
+            request, response, db,
+            [(COURSE, course_id) for course_id in course_ids] + [COURSE_LIST, FORECASTS, (USER, current_user.user_id)],
+            datetime.date.today(),
+        )
+        if not_modified:
+            return not_modified
+        
         # Get courses
         courses_query = db.query(
             Course, 
@@ -111,22 +161,13 @@ def get_faculty_dashboard(db: Session = Depends(get_db), current_user: User = De
         today = datetime.date.today()
         last_7_days = today - datetime.timedelta(days=6)
         
-        activity_records = db.query(
-            AttendanceRecord.class_date,
-            func.sum(case((AttendanceRecord.status.in_(["present", "late"]), 1), else_=0)).label("present"),
-            func.sum(case((AttendanceRecord.status == "absent", 1), else_=0)).label("absent")
-        ).filter(
-            AttendanceRecord.marked_by == faculty.faculty_id,
-            AttendanceRecord.class_date >= last_7_days
-        ).group_by(AttendanceRecord.class_date).all()
-        
-        # Safe handling of None values
+        # Read from the per-course daily rollup: one row per course and day shown
+        daily = daily_rollup.daily_counts(
+            db, [course.course_id for course, _, _ in courses_query], last_7_days, today
+        )
         activity_map = {
-            r.class_date: {
-                "present": int(r.present or 0) if r.present is not None else 0,
-                "absent": int(r.absent or 0) if r.absent is not None else 0
-            } 
-            for r in activity_records
+            class_date: {"present": c["present"] + c["late"], "absent": c["absent"]}
+            for class_date, c in daily.items()
         }
         
         activity_trend = []
@@ -148,7 +189,9 @@ def get_faculty_dashboard(db: Session = Depends(get_db), current_user: User = De
                 "avg_attendance": round(sum(c['avg_attendance'] for c in courses_data) / len(courses_data), 1) if len(courses_data) > 0 else 0.0,
                 "total_courses": len(courses_data)
             },
-            "daily_activity": activity_trend
+            "daily_activity": activity_trend,
+            # From the nightly shortage forecast, soonest first
+            "early_warnings": shortage_forecaster.forecasts(db, faculty_id=faculty.faculty_id, limit=10)
         }
     except Exception as e:
         print(f"CRITICAL DASHBOARD ERROR: {str(e)}")
@@ -156,33 +199,44 @@ def get_faculty_dashboard(db: Session = Depends(get_db), current_user: User = De
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/admin")
-def get_admin_dashboard(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_admin_dashboard(refresh: bool = False, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    """
+    Served from the admin snapshot; `snapshot` reports when it was generated
+    and how many writes it hasn't seen yet. refresh=true rebuilds it first.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not an admin")
-        
-    total_students = db.query(func.count(Student.student_id)).scalar()
-    total_faculty = db.query(func.count(Faculty.faculty_id)).scalar()
-    total_courses = db.query(func.count(Course.course_id)).scalar()
-    shortage_count = db.query(func.count(AttendanceSummary.summary_id)).filter(AttendanceSummary.shortage_status == True).scalar()
-    
+
+    if refresh:
+        await db.run_sync(admin_snapshot.refresh)
+    return await db.run_sync(admin_snapshot.get)
+
+@router.get("/admin/cohorts")
+async def get_cohort_analytics(
+    group_by: List[Literal["student_department", "semester", "batch_year", "course_department", "academic_year"]] = Query([]),
+    student_department: Optional[str] = None,
+    semester: Optional[int] = None,
+    batch_year: Optional[int] = None,
+    course_department: Optional[str] = None,
+    academic_year: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not an admin")
+
+    filters = {
+        name: value for name, value in {
+            "student_department": student_department,
+            "semester": semester,
+            "batch_year": batch_year,
+            "course_department": course_department,
+            "academic_year": academic_year,
+        }.items() if value is not None
+    }
+    group_by = list(dict.fromkeys(group_by))
     return {
-        "stats": {
-            "total_students": total_students or 0,
-            "total_faculty": total_faculty or 0,
-            "total_courses": total_courses or 0,
-            "shortage_alerts": shortage_count or 0
-        },
-        "dept_distribution": [
-            {"name": dept, "value": count} for dept, count in db.query(Student.department, func.count(Student.student_id)).group_by(Student.department).all()
-        ],
-        "course_performance": [
-            {
-                "name": code, 
-                "present": round(float(avg_perc or 0), 1) if avg_perc is not None else 0.0, 
-                "absent": round(max(0, 100 - float(avg_perc or 0)), 1) if avg_perc is not None else 100.0
-            } for code, avg_perc in db.query(Course.course_code, func.avg(AttendanceSummary.attendance_percentage))\
-                .join(CourseEnrollment, Course.course_id == CourseEnrollment.course_id)\
-                .join(AttendanceSummary, CourseEnrollment.enrollment_id == AttendanceSummary.enrollment_id)\
-                .group_by(Course.course_code).all()
-        ]
+        "group_by": group_by,
+        "filters": filters,
+        "cohorts": await db.run_sync(cohort_cube.query, group_by, filters),
     }
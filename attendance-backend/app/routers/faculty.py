@@ -1,12 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Request, Response, UploadFile, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import JSONResponse
 from datetime import date
+from uuid import UUID
+import io
+import json
 from sqlalchemy import func, or_
 from sqlalchemy.orm import Session
+from app.async_database import AsyncSessionLocal
+from app.config import get_settings
 from app.database import get_db
 from app.models.user import User
-from app.schemas.attendance import BulkAttendanceCreate
-from app.utils.security import get_current_user
-from app.services.attendance_service import attendance_service
+from app.schemas.attendance import AttendanceSubmission, BatchAttendanceCreate, QuickMarkRequest
+from app.utils.security import get_current_user, user_from_token
+from app.services.attendance_service import attendance_service, IdempotencyKeyConflict
+from app.services.distribution_service import distribution_service
+from app.services.write_queue import attendance_write_queue, WriteQueueFull
+from app.services.import_service import AttendanceImporter
+from app.services.live_marking import live_marking
+from app.services.version_service import COURSE_LIST, USER, entity_versions
 from app.models.course import Course, CourseEnrollment
 from app.models.student import Student
 from app.models.faculty import Faculty
@@ -15,34 +26,233 @@ from app.models.attendance import AttendanceSummary, AttendanceRecord
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/api/faculty", tags=["Faculty"])
+settings = get_settings()
 
 
 class EnrollStudentRequest(BaseModel):
     student_id: str
     academic_year: str | None = None
 
+
+class RejectedRows:
+    """csv.writer stand-in that keeps the first `limit` rejected rows for the response."""
+
+    def __init__(self, limit: int = 1000):
+        self.limit = limit
+        self.header = None
+        self.rows = []
+        self.truncated = False
+
+    def writerow(self, row):
+        if self.header is None:
+            self.header = row
+        elif len(self.rows) < self.limit:
+            self.rows.append(dict(zip(self.header, row)))
+        else:
+            self.truncated = True
+
 @router.post("/attendance/mark", status_code=status.HTTP_200_OK)
 def mark_attendance(
-    data: BulkAttendanceCreate, 
+    data: AttendanceSubmission,
+    queued: bool = False,
+    idempotency_key: str | None = Header(default=None),
     db: Session = Depends(get_db), 
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Marks attendance for one class session.
+    With ?queued=true the submission is written by the group-commit writer
+    and the response is 202 with a job id to poll at /attendance/jobs/{job_id}.
+    Retries carrying the same Idempotency-Key header are no-ops.
+    Accepts the per-student JSON list or the compact roster + bitmap form.
+    """
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Not authorized. Faculty only.")
 
-    # Resolve faculty_id
-    faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
-    faculty_id = faculty.faculty_id if faculty else None
+    faculty_id = current_user.faculty_id
 
-    result = attendance_service.mark_attendance(
-        db=db,
-        course_id=data.course_id,
-        class_date=data.class_date,
-        attendance_data=data.attendance_data,
-        marked_by=faculty_id
-    )
+    if queued:
+        try:
+            job = attendance_write_queue.submit(data, faculty_id, idempotency_key, current_user.user_id)
+        except WriteQueueFull:
+            raise HTTPException(
+                status_code=503,
+                detail="Attendance writer is busy, retry shortly",
+                headers={"Retry-After": "1"}
+            )
+        return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=job)
+
+    try:
+        result = attendance_service.mark_attendance(
+            db=db,
+            course_id=data.course_id,
+            class_date=data.class_date,
+            attendance_data=data.attendance_data,
+            marked_by=faculty_id,
+            idempotency_key=idempotency_key,
+            submitted_by=current_user.user_id
+        )
+    except IdempotencyKeyConflict:
+        raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different submission")
     return result
 
+@router.post("/attendance/batch")
+def mark_attendance_batch(
+    data: BatchAttendanceCreate,
+    idempotency_key: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Syncs many class sessions (e.g. a tablet's offline day) in one request.
+    All sessions share one transaction and one commit; each runs in its own
+    savepoint, so a failing session is reported without losing the others.
+    Records changed on the server after a session's last_synced_at are not
+    overwritten and come back as conflicts.
+    """
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized. Faculty only.")
+    if len(data.sessions) > settings.ATTENDANCE_BATCH_MAX_SESSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.ATTENDANCE_BATCH_MAX_SESSIONS} sessions per batch"
+        )
+
+    faculty_id = current_user.faculty_id
+
+    sessions = []
+    totals = {"inserted": 0, "updated": 0, "unchanged": 0, "conflicts": 0, "skipped": 0, "failed": 0}
+    for index, session in enumerate(data.sessions):
+        entry = {"course_id": str(session.course_id), "class_date": session.class_date.isoformat()}
+        try:
+            with db.begin_nested():
+                result = attendance_service.mark_attendance(
+                    db=db,
+                    course_id=session.course_id,
+                    class_date=session.class_date,
+                    attendance_data=session.attendance_data,
+                    marked_by=faculty_id,
+                    commit=False,
+                    idempotency_key=f"{idempotency_key}:{index}" if idempotency_key else None,
+                    if_unmodified_since=session.last_synced_at,
+                    submitted_by=current_user.user_id
+                )
+        except IdempotencyKeyConflict:
+            raise HTTPException(status_code=409, detail="Idempotency-Key was already used for a different submission")
+        except Exception as e:
+            totals["failed"] += 1
+            # Database errors carry the statement; report only the driver message
+            sessions.append({**entry, "status": "failed", "error": str(getattr(e, "orig", e)).strip()})
+            continue
+        for key in totals:
+            totals[key] += result.get(key, 0)
+        sessions.append({**entry, "status": "ok", **result})
+    db.commit()
+
+    return {"message": "Batch processed", **totals, "sessions": sessions}
+
+@router.post("/attendance/import")
+def import_attendance(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Backfills attendance from a CSV with columns roll_number, course_code,
+    date (YYYY-MM-DD) and status. The upload is streamed and committed in
+    chunks; rejected rows come back with their line number and reason.
+    """
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized. Faculty only.")
+
+    faculty_id = current_user.faculty_id
+
+    rejects = RejectedRows()
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        stats = AttendanceImporter(db, marked_by=faculty_id).run(stream, rejects=rejects)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        stream.detach()
+
+    return {
+        "message": "Import finished",
+        **stats,
+        "rejected_rows": rejects.rows,
+        "rejected_rows_truncated": rejects.truncated
+    }
+
+@router.get("/attendance/jobs/{job_id}")
+def get_attendance_job(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Reports whether a queued submission has been committed (durable).
+    Only the user who submitted it can see it; anyone else gets 404.
+    """
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized. Faculty only.")
+
+    job = attendance_write_queue.status(job_id, current_user.user_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/attendance/live")
+def get_live_marking_sessions(current_user: User = Depends(get_current_user)):
+    """Live marking sessions open on this worker."""
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized. Faculty only.")
+    return live_marking.stats()
+
+async def _live_marker(token: str):
+    # (name, faculty_id) of a faculty/admin token, in a session of its own so
+    # the socket doesn't hold a pooled connection
+    async with AsyncSessionLocal() as db:
+        user = await user_from_token(token, db)
+    if user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Not authorized. Faculty only.")
+    return user.full_name, user.faculty_id
+
+@router.websocket("/attendance/live/{course_id}/{class_date}")
+async def live_marking_session(websocket: WebSocket, course_id: UUID, class_date: date, token: str = ""):
+    """
+    Collaborative marking of one class session. The server sends a
+    `snapshot` of the roster on connect, then `delta` for every change by any
+    participant, `participants` when someone joins or leaves and `flushed`
+    once changes are written. Clients send
+    {"type": "mark", "changes": [{"student_id", "status", "remarks"?}]}
+    (or a single change inline) and {"type": "flush"} to write at once.
+    """
+    try:
+        name, faculty_id = await _live_marker(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+
+    session = await live_marking.join(course_id, class_date, websocket, websocket.send_text, name)
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                await websocket.send_text(json.dumps({"type": "error", "detail": "Messages must be JSON"}))
+                continue
+            kind = message.get("type") if isinstance(message, dict) else None
+            if kind == "mark":
+                changes = message.get("changes") or [message]
+                rejected = await session.apply(changes, faculty_id, name)
+                if rejected:
+                    await websocket.send_text(json.dumps({"type": "rejected", "changes": rejected}))
+            elif kind == "flush":
+                await session.flush()
+            else:
+                await websocket.send_text(json.dumps({"type": "error", "detail": f"Unknown message type '{kind}'"}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await live_marking.leave(session, websocket)
+
 @router.post("/courses", status_code=status.HTTP_201_CREATED)
 def create_course(data: CourseCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.role not in ["faculty", "admin"]:
@@ -82,9 +292,13 @@ def create_course(data: CourseCreate, db: Session = Depends(get_db), current_use
     }
 
 @router.get("/courses")
-def get_faculty_courses(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_faculty_courses(request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Faculty only")
+
+    not_modified = entity_versions.conditional(request, response, db, [COURSE_LIST, (USER, current_user.user_id)])
+    if not_modified:
+        return not_modified
     
     faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
     if not faculty:
@@ -141,48 +355,53 @@ def update_course(course_id: str, data: CourseUpdate, db: Session = Depends(get_
     return course
 
 @router.post("/courses/{course_id}/quick-mark")
-def quick_mark_attendance(course_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Marks all enrolled students as Present for today."""
+def quick_mark_attendance(
+    course_id: str,
+    payload: QuickMarkRequest | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Marks all enrolled students as Present for the date (default today),
+    except the optional absentees, in one server-side statement. Students
+    already marked keep their status; 400 only when nobody was left to mark.
+    Body (optional): { "class_date": "YYYY-MM-DD", "absentees": ["student uuid", ...] }
+    """
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Faculty only")
-    
-    enrollments = db.query(CourseEnrollment).filter(CourseEnrollment.course_id == course_id).all()
-    if not enrollments:
-        raise HTTPException(status_code=404, detail="No students enrolled in this course")
-    
-    today = date.today()
-    
-    # Check if already marked for today (any record for this course today)
-    # We join with CourseEnrollment to filter by course_id
-    existing = db.query(AttendanceRecord).join(
-        CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
-    ).filter(
-        CourseEnrollment.course_id == course_id,
-        AttendanceRecord.class_date == today
-    ).first()
-    
-    if existing:
-        raise HTTPException(status_code=400, detail="Attendance already marked for this course today")
-    
-    attendance_data = []
-    for e in enrollments:
-        attendance_data.append({
-            "student_id": str(e.student_id),
-            "status": "present"
-        })
-    
-    # Resolve faculty_id
-    faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
-    faculty_id = faculty.faculty_id if faculty else None
 
-    result = attendance_service.mark_attendance(
+    try:
+        course_id = UUID(course_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Course not found")
+    payload = payload or QuickMarkRequest()
+    class_date = payload.class_date or date.today()
+
+    faculty_id = current_user.faculty_id
+
+    written = attendance_service.quick_mark(
         db=db,
         course_id=course_id,
-        class_date=today,
-        attendance_data=attendance_data,
-        marked_by=faculty_id
+        class_date=class_date,
+        marked_by=faculty_id,
+        absentees=payload.absentees
     )
-    return result
+
+    if not written:
+        # Only the failure path pays for telling the two cases apart
+        enrolled = db.query(CourseEnrollment.enrollment_id).filter(CourseEnrollment.course_id == course_id).first()
+        if not enrolled:
+            raise HTTPException(status_code=404, detail="No students enrolled in this course")
+        raise HTTPException(status_code=400, detail="Attendance already marked for this course on this date")
+
+    absent = sum(1 for _, s in written if s == "absent")
+    return {
+        "message": "Attendance marked successfully",
+        "class_date": class_date.isoformat(),
+        "inserted": len(written),
+        "present": len(written) - absent,
+        "absent": absent
+    }
 
 @router.post("/courses/enroll", status_code=status.HTTP_201_CREATED)
 def enroll_student(data: EnrollmentByRollNumber, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -194,9 +413,7 @@ def enroll_student(data: EnrollmentByRollNumber, db: Session = Depends(get_db),
     if not student:
         raise HTTPException(status_code=404, detail=f"Student with roll number {data.roll_number} not found")
     
-    # Resolve faculty_id if current user is faculty
-    faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
-    faculty_id = faculty.faculty_id if faculty else None
+    faculty_id = current_user.faculty_id
 
     # Check existing
     existing = db.query(CourseEnrollment).filter(
@@ -238,9 +455,7 @@ def enroll_student_by_id(
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Faculty only")
 
-    # Resolve faculty_id
-    faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
-    faculty_id = faculty.faculty_id if faculty else None
+    faculty_id = current_user.faculty_id
     if not faculty_id:
         raise HTTPException(status_code=404, detail="Faculty profile not found")
 
@@ -311,6 +526,7 @@ def delete_course(course_id: str, db: Session = Depends(get_db), current_user: U
         raise HTTPException(status_code=404, detail="Course not found")
     
     db.delete(course)
+    distribution_service.invalidate(db, [course.course_id])
     db.commit()
     return {"message": "Course deleted"}
 
@@ -319,6 +535,11 @@ def unenroll_student(course_id: str, student_id: str, db: Session = Depends(get_
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Faculty only")
     
+    try:
+        course_id, student_id = UUID(course_id), UUID(student_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Enrollment not found")
+
     enrollment = db.query(CourseEnrollment).filter(
         CourseEnrollment.course_id == course_id,
         CourseEnrollment.student_id == student_id
@@ -327,6 +548,7 @@ def unenroll_student(course_id: str, student_id: str, db: Session = Depends(get_
     if not enrollment:
         raise HTTPException(status_code=404, detail="Enrollment not found")
     
+    attendance_service.clear_enrollment_attendance(db, enrollment)
     db.delete(enrollment)
     db.commit()
     return {"message": "Student unenrolled"}
@@ -336,9 +558,7 @@ def get_marking_history(db: Session = Depends(get_db), current_user: User = Depe
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Faculty only")
     
-    # Resolve faculty_id
-    faculty = db.query(Faculty).filter(Faculty.user_id == current_user.user_id).first()
-    faculty_id = faculty.faculty_id if faculty else None
+    faculty_id = current_user.faculty_id
 
     # Get unique sessions marked by this faculty/admin
     sessions = db.query(
@@ -1,22 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from app.async_database import AsyncSessionLocal, get_async_db
+from app.config import get_settings
 from app.database import get_db
 from app.models.user import User
 from app.models.notification import Notification
-from app.utils.security import get_current_user
+from app.utils.security import get_current_user, user_from_token
 from app.models.student import Student
 from app.models.course import CourseEnrollment
 from uuid import UUID
 from app.schemas.notification import NotificationCreate
+from app.services.live_feed import live_feed
 
+settings = get_settings()
 router = APIRouter(prefix="/api/notifications", tags=["Notifications"])
 
+# Reconnect delay suggested to EventSource clients
+STREAM_RETRY_MS = 3000
+
 @router.get("/")
-def get_notifications(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    notifications = db.query(Notification).filter(
-        Notification.user_id == current_user.user_id
-    ).order_by(Notification.created_at.desc()).all()
+async def get_notifications(
+    since: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    query = select(Notification).filter(Notification.user_id == current_user.user_id)
+    if since is not None:
+        query = query.filter(Notification.created_at > since)
+    query = query.order_by(Notification.created_at.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    notifications = (await db.execute(query)).scalars().all()
     
     return [
         {
@@ -59,3 +80,100 @@ def send_reminder(data: NotificationCreate, db: Session = Depends(get_db), curre
     db.add_all(new_notifications)
     db.commit()
     return {"message": f"Reminders sent to {len(new_notifications)} students"}
+
+
+async def _feed_topics(token: str):
+    # Own short-lived session: a feed connection must not hold a pooled
+    # connection for as long as it stays open
+    async with AsyncSessionLocal() as db:
+        user = await user_from_token(token, db)
+        return await db.run_sync(live_feed.topics_for, user)
+
+
+def _bearer_token(request, token: Optional[str]) -> str:
+    # EventSource can't set headers, so ?token= is accepted too
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        return authorization[7:]
+    return token or ""
+
+
+@router.get("/stream")
+async def stream_notifications(request: Request, token: Optional[str] = None, last_event_id: Optional[str] = None):
+    """
+    Server-Sent Events: new notifications, and attendance marked for the
+    user (students) or their courses (faculty). Resumes after the
+    Last-Event-ID header (or ?last_event_id=); a `reset` event means the gap
+    could not be replayed and the client should refetch once.
+    """
+    topics = await _feed_topics(_bearer_token(request, token))
+    if live_feed.full():
+        raise HTTPException(status_code=503, detail="Too many live connections", headers={"Retry-After": "30"})
+    resume_from = request.headers.get("last-event-id") or last_event_id
+
+    async def events():
+        subscription = live_feed.subscribe(topics, resume_from)
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while True:
+                batch = await subscription.next(settings.LIVE_FEED_HEARTBEAT_SECONDS)
+                if batch is None:
+                    break
+                if not batch:
+                    # Keeps proxies from timing out an idle stream
+                    yield ": ping\n\n"
+                    continue
+                yield "".join(live_feed.format_sse(e, live_feed.event_id(e.seq)) for e in batch)
+        finally:
+            live_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _close_on_disconnect(websocket: WebSocket, subscription):
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        subscription.close()
+
+
+@router.websocket("/ws")
+async def notifications_socket(websocket: WebSocket, token: Optional[str] = None, last_event_id: Optional[str] = None):
+    """The /stream feed over a WebSocket, one JSON message {id, type, data} per event."""
+    try:
+        topics = await _feed_topics(token or "")
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if live_feed.full():
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    await websocket.accept()
+
+    subscription = live_feed.subscribe(topics, last_event_id)
+    watcher = asyncio.ensure_future(_close_on_disconnect(websocket, subscription))
+    try:
+        while True:
+            batch = await subscription.next(settings.LIVE_FEED_HEARTBEAT_SECONDS)
+            if batch is None:
+                break
+            if not batch:
+                await websocket.send_text('{"type": "ping"}')
+            for e in batch:
+                await websocket.send_text(live_feed.format_json(e, live_feed.event_id(e.seq)))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        live_feed.unsubscribe(subscription)
+
+
+@router.get("/stream/stats")
+def get_stream_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return live_feed.stats()
@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from io import BytesIO
 import datetime
@@ -9,6 +12,7 @@ from reportlab.lib import colors
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
 
+from app.async_database import get_async_db
 from app.database import get_db
 from app.models.student import Student
 from app.models.user import User
@@ -16,29 +20,43 @@ from app.models.faculty import Faculty
 from app.models.attendance import AttendanceRecord, AttendanceSummary
 from app.models.course import CourseEnrollment, Course
 from app.utils.security import get_current_user
+from app.services.distribution_service import distribution_service
+from app.services.forecast_service import shortage_forecaster
+from app.services.projection_service import projection_service
+from app.services.shortage_service import shortage_sweep
+from app.services.threshold_service import threshold_resolver
+from uuid import UUID
 
 router = APIRouter(prefix="/api/reports", tags=["Reports"])
 
-@router.get("/download/pdf/{student_id}")
-async def download_attendance_pdf(student_id: str, db: Session = Depends(get_db)):
-    # 1. Fetch Student and User Details
-    student = db.query(Student).filter(Student.student_id == student_id).first()
+# The report downloads read on the async session; reportlab / openpyxl
+# rendering is CPU-bound and sync, so it is handed to the threadpool.
+
+async def _student_records(db: AsyncSession, student_id: str):
+    """(student, user, [(record, course_name, course_code)] newest first) or 404."""
+    student = (await db.execute(select(Student).filter(Student.student_id == student_id))).scalars().first()
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    user = db.query(User).filter(User.user_id == student.user_id).first()
-    
-    # 2. Fetch Attendance Records across all courses
-    enrollments = db.query(CourseEnrollment).filter(CourseEnrollment.student_id == student_id).all()
-    enrollment_ids = [e.enrollment_id for e in enrollments]
+    user = await db.get(User, student.user_id)
     
-    records = db.query(AttendanceRecord, Course.course_name, Course.course_code)\
-        .join(CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id)\
-        .join(Course, CourseEnrollment.course_id == Course.course_id)\
-        .filter(AttendanceRecord.enrollment_id.in_(enrollment_ids))\
-        .order_by(AttendanceRecord.class_date.desc()).all()
+    # Attendance Records across all courses
+    records = (await db.execute(
+        select(AttendanceRecord, Course.course_name, Course.course_code)
+        .join(CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id)
+        .join(Course, CourseEnrollment.course_id == Course.course_id)
+        .filter(CourseEnrollment.student_id == student_id)
+        .order_by(AttendanceRecord.class_date.desc())
+    )).all()
+    return student, user, records
 
-    # 3. Create PDF
+@router.get("/download/pdf/{student_id}")
+async def download_attendance_pdf(student_id: str, db: AsyncSession = Depends(get_async_db)):
+    student, user, records = await _student_records(db, student_id)
+    buffer = await run_in_threadpool(_attendance_pdf, student, user, records)
+    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=attendance_{student.roll_number}.pdf"})
+
+def _attendance_pdf(student: Student, user: User, records) -> BytesIO:
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=letter)
     width, height = letter
@@ -83,26 +101,19 @@ async def download_attendance_pdf(student_id: str, db: Session = Depends(get_db)
     p.save()
     
     buffer.seek(0)
-    return StreamingResponse(buffer, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=attendance_{student.roll_number}.pdf"})
+    return buffer
 
 @router.get("/download/excel/{student_id}")
-async def download_attendance_excel(student_id: str, db: Session = Depends(get_db)):
-    # 1. Fetch Data
-    student = db.query(Student).filter(Student.student_id == student_id).first()
-    if not student:
-        raise HTTPException(status_code=404, detail="Student not found")
-    
-    user = db.query(User).filter(User.user_id == student.user_id).first()
-    enrollments = db.query(CourseEnrollment).filter(CourseEnrollment.student_id == student_id).all()
-    enrollment_ids = [e.enrollment_id for e in enrollments]
-    
-    records = db.query(AttendanceRecord, Course.course_name, Course.course_code)\
-        .join(CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id)\
-        .join(Course, CourseEnrollment.course_id == Course.course_id)\
-        .filter(AttendanceRecord.enrollment_id.in_(enrollment_ids))\
-        .order_by(AttendanceRecord.class_date.desc()).all()
+async def download_attendance_excel(student_id: str, db: AsyncSession = Depends(get_async_db)):
+    student, user, records = await _student_records(db, student_id)
+    buffer = await run_in_threadpool(_attendance_excel, student, user, records)
+    return StreamingResponse(
+        buffer, 
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers={"Content-Disposition": f"attachment; filename=attendance_{student.roll_number}.xlsx"}
+    )
 
-    # 2. Create Excel
+def _attendance_excel(student: Student, user: User, records) -> BytesIO:
     wb = Workbook()
     ws = wb.active
     ws.title = "Attendance Report"
@@ -141,26 +152,125 @@ async def download_attendance_excel(student_id: str, db: Session = Depends(get_d
     buffer = BytesIO()
     wb.save(buffer)
     buffer.seek(0)
-    
-    return StreamingResponse(
-        buffer, 
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=attendance_{student.roll_number}.xlsx"}
+    return buffer
+
+@router.get("/projections")
+def get_recovery_projections(
+    student_id: UUID | None = None,
+    course_id: UUID | None = None,
+    at_risk_only: bool = False,
+    limit: int = Query(500, ge=1, le=100000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Classes needed to recover / classes that can still be missed, for one
+    student, one course or (no filters) every enrollment. Totals cover all
+    matches; rows come back most-at-risk first, up to `limit`.
+    """
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Faculty only")
+
+    return projection_service.projections(
+        db, student_id=student_id, course_id=course_id, at_risk_only=at_risk_only, limit=limit
     )
 
+@router.get("/distributions")
+def get_course_distributions(
+    bin_width: int = Query(10, ge=1, le=100),
+    include_students: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Attendance percentage histogram and quartiles for every course, from one
+    pass over attendance_summary for the courses not already cached.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+
+    return {"courses": distribution_service.course_report(db, bin_width=bin_width, include_students=include_students)}
+
+@router.get("/distributions/{course_id}")
+def get_course_distribution(
+    course_id: UUID,
+    bin_width: int = Query(10, ge=1, le=100),
+    student_id: UUID | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    One course's histogram and quartiles with every student's percentile
+    rank (mid-rank: share of the class below, plus half of the ties), or
+    only `student_id`'s.
+    """
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Faculty only")
+
+    courses = distribution_service.course_report(db, [course_id], bin_width=bin_width, student_id=student_id)
+    if not courses:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return courses[0]
+
+@router.get("/forecasts")
+def get_shortage_forecasts(
+    course_id: UUID | None = None,
+    limit: int = Query(500, ge=1, le=100000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Enrollments the nightly forecaster expects to fall below their warning
+    percentage within the forecast horizon, soonest first.
+    """
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Faculty only")
+
+    return {"forecasts": shortage_forecaster.forecasts(db, course_id=course_id, limit=limit)}
+
+@router.post("/shortage-sweep")
+def run_shortage_sweep(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Run the shortage sweep now instead of waiting for the next periodic one:
+    refreshes shortage status, today's shortage reports and notifications.
+    """
+    if current_user.role not in ["faculty", "admin"]:
+        raise HTTPException(status_code=403, detail="Faculty only")
+
+    result = shortage_sweep.run(db)
+    db.commit()
+    return result
+
 @router.get("/faculty/shortage-audit")
-async def shortage_audit(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def shortage_audit(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     if current_user.role not in ["faculty", "admin"]:
         raise HTTPException(status_code=403, detail="Faculty only")
     
-    # Get all students with shortage in any course
-    shortages = db.query(AttendanceSummary, Student.roll_number, User.full_name, Course.course_name, Course.course_code)\
+    shortages = await db.run_sync(_shortages)
+    buffer = await run_in_threadpool(_shortage_audit_excel, shortages)
+    return StreamingResponse(buffer, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=shortage_audit.xlsx"})
+
+def _shortages(db: Session):
+    # Get all students with shortage in any course. SQL narrows to the highest
+    # minimum in use; each row is then checked against its own threshold.
+    # Enrollments with no classes yet are not shortages, as in the sweep.
+    resolve = threshold_resolver.lookup(db)
+    candidates = db.query(AttendanceSummary.attendance_percentage, Course.course_id, Student.department, Student.roll_number, User.full_name, Course.course_name, Course.course_code)\
         .join(CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id)\
         .join(Student, CourseEnrollment.student_id == Student.student_id)\
         .join(User, Student.user_id == User.user_id)\
         .join(Course, CourseEnrollment.course_id == Course.course_id)\
-        .filter(AttendanceSummary.percentage < 75).all()
+        .filter(AttendanceSummary.total_classes > 0,
+                AttendanceSummary.attendance_percentage < threshold_resolver.highest_minimum(db))\
+        .order_by(Course.course_code, Student.roll_number).all()
+    shortages = []
+    for percentage, course_id, department, roll, name, c_name, c_code in candidates:
+        minimum = resolve(course_id, department).minimum
+        if percentage < minimum:
+            shortages.append((roll, name, c_code, c_name, percentage, minimum))
+    return shortages
 
+def _shortage_audit_excel(shortages) -> BytesIO:
     wb = Workbook()
     ws = wb.active
     ws.title = "Shortage Audit"
@@ -169,19 +279,20 @@ async def shortage_audit(db: Session = Depends(get_db), current_user: User = Dep
     ws["A1"].font = Font(bold=True, size=14)
     ws["A2"] = f"Generated: {datetime.datetime.now().strftime('%Y-%m-%d')}"
     
-    headers = ["Roll Number", "Student Name", "Course Code", "Course Name", "Attendance %"]
+    headers = ["Roll Number", "Student Name", "Course Code", "Course Name", "Attendance %", "Minimum %"]
     for col, h in enumerate(headers, 1):
         cell = ws.cell(row=4, column=col, value=h)
         cell.font = Font(bold=True)
         
-    for idx, (sum, roll, name, c_name, c_code) in enumerate(shortages, 5):
+    for idx, (roll, name, c_code, c_name, percentage, minimum) in enumerate(shortages, 5):
         ws.cell(row=idx, column=1, value=roll)
         ws.cell(row=idx, column=2, value=name)
         ws.cell(row=idx, column=3, value=c_code)
         ws.cell(row=idx, column=4, value=c_name)
-        ws.cell(row=idx, column=5, value=f"{sum.percentage:.2f}%")
+        ws.cell(row=idx, column=5, value=f"{percentage:.2f}%")
+        ws.cell(row=idx, column=6, value=f"{minimum:.2f}%")
 
     buffer = BytesIO()
     wb.save(buffer)
     buffer.seek(0)
-    return StreamingResponse(buffer, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=shortage_audit.xlsx"})
+    return buffer
@@ -1,7 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func, case
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import datetime
+from typing import Literal
+from app.async_database import get_async_db
 from app.database import get_db
 from app.models.user import User
 from app.models.student import Student
@@ -9,6 +11,10 @@ from app.models.course import Course, CourseEnrollment
 from app.models.attendance import AttendanceRecord, AttendanceSummary
 from app.models.faculty import Faculty
 from app.utils.security import get_current_user
+from app.services.dashboard_cache import student_dashboard_cache
+from app.services.trend_service import trend_service
+from app.services.projection_service import projection_service
+from app.services.version_service import COURSE_LIST, STUDENT, USER, entity_versions
 from sqlalchemy.orm import aliased
 
 router = APIRouter(prefix="/api/students", tags=["Students"])
@@ -37,21 +43,29 @@ def list_students(db: Session = Depends(get_db), current_user: User = Depends(ge
     ]
 
 @router.get("/dashboard")
-def get_student_dashboard(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_student_dashboard(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
     """
     Returns real attendance data (percentage, shortage status) from the summary table.
     """
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Not a student")
     
-    student = db.query(Student).filter(Student.user_id == current_user.user_id).first()
-    if not student:
+    student_id = current_user.student_id
+    if not student_id:
         return {
             "overall_percentage": 0,
             "courses": [],
             "student_info": {"roll_number": "N/A", "department": "N/A", "semester": 0}
         }
         
+    # Sync query code on the async session's connection (see dashboard.py)
+    dashboard = await student_dashboard_cache.get_or_build_async("students", student_id, lambda: db.run_sync(
+        lambda session: _student_dashboard(session, session.get(Student, student_id))
+    ))
+    # The name comes from the caller's user row, not the cached entry
+    return {**dashboard, "student_info": {"full_name": current_user.full_name, **dashboard["student_info"]}}
+
+def _student_dashboard(db: Session, student: Student):
     # Query attendance_summary + enrollment (to surface academic_year)
     summaries = db.query(AttendanceSummary, Course, CourseEnrollment).join(
         CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
@@ -88,7 +102,6 @@ def get_student_dashboard(db: Session = Depends(get_db), current_user: User = De
         "overall_percentage": round(overall_percentage, 2),
         "courses": courses_data,
         "student_info": {
-            "full_name": current_user.full_name,
             "roll_number": student.roll_number,
             "department": student.department,
             "semester": student.semester
@@ -98,13 +111,23 @@ def get_student_dashboard(db: Session = Depends(get_db), current_user: User = De
     }
 
 @router.get("/attendance")
-def get_student_attendance(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_student_attendance(request: Request, response: Response, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Not a student")
     
-    student = db.query(Student).filter(Student.user_id == current_user.user_id).first()
-    if not student:
+    student_id = current_user.student_id
+    if not student_id:
         return []
+
+    # The records, plus course and faculty names shown next to them
+    faculty_users = [(USER, user_id) for (user_id,) in db.query(Faculty.user_id).join(
+        CourseEnrollment, Faculty.faculty_id == CourseEnrollment.faculty_id
+    ).filter(CourseEnrollment.student_id == student_id).distinct().all()]
+    not_modified = entity_versions.conditional(
+        request, response, db, [(STUDENT, student_id), COURSE_LIST, *faculty_users]
+    )
+    if not_modified:
+        return not_modified
         
     FacultyUser = aliased(User)
     
@@ -121,7 +144,7 @@ def get_student_attendance(db: Session = Depends(get_db), current_user: User = D
     ).join(
         FacultyUser, Faculty.user_id == FacultyUser.user_id
     ).filter(
-        CourseEnrollment.student_id == student.student_id
+        CourseEnrollment.student_id == student_id
     ).order_by(AttendanceRecord.class_date.desc()).all()
     
     attendance_list = []
@@ -137,39 +160,36 @@ def get_student_attendance(db: Session = Depends(get_db), current_user: User = D
     return attendance_list
 
 @router.get("/trends")
-def get_attendance_trends(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def get_attendance_trends(
+    window: Literal["7", "30", "90", "semester"] = "30",
+    granularity: Literal["day", "week", "month"] = "day",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Attendance trend over the last 7/30/90 days or the current semester,
+    bucketed by day, week or month: the overall series plus one per course.
+    """
     if current_user.role != "student":
         raise HTTPException(status_code=403, detail="Not a student")
     
-    student = db.query(Student).filter(Student.user_id == current_user.user_id).first()
-    if not student:
-        return []
+    if not current_user.student_id:
+        return {"window": window, "granularity": granularity, "overall": [], "courses": []}
     
-    enrollments = db.query(CourseEnrollment).filter(CourseEnrollment.student_id == student.student_id).all()
-    enrollment_ids = [e.enrollment_id for e in enrollments]
-    
-    trends = []
-    today = datetime.date.today()
-    for i in range(29, -1, -1):
-        target_date = today - datetime.timedelta(days=i)
-        
-        counts = db.query(
-            func.count(AttendanceRecord.attendance_id).label("total"),
-            func.sum(case((AttendanceRecord.status == "present", 1), else_=0)).label("present"),
-            func.sum(case((AttendanceRecord.status == "late", 1), else_=0)).label("late")
-        ).filter(
-            AttendanceRecord.enrollment_id.in_(enrollment_ids),
-            AttendanceRecord.class_date == target_date
-        ).first()
-        
-        total = counts.total or 0
-        present = (counts.present or 0) + (counts.late or 0)
-        percentage = round((present / total * 100), 1) if total > 0 else 0
-        
-        trends.append({
-            "name": target_date.strftime("%b %d"),
-            "attendance": percentage,
-            "fullDate": target_date.isoformat()
-        })
-        
-    return trends
+    return await db.run_sync(
+        trend_service.student_trends, current_user.student_id, window=window, granularity=granularity
+    )
+
+@router.get("/projection")
+def get_recovery_projection(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Per course: classes the student must attend in a row to get back above
+    the threshold, and how many they can still miss.
+    """
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Not a student")
+
+    if not current_user.student_id:
+        return {"totals": {"enrollments": 0, "below_threshold": 0, "unrecoverable": 0}, "projections": []}
+
+    return projection_service.projections(db, student_id=current_user.student_id)
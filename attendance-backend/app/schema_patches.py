@@ -0,0 +1,451 @@
+"""
+Versioned Postgres schema patches applied at startup (see app/main.py).
+
+Each patch is (name, version, sql). The version last applied is recorded in
+schema_patches, so a patch runs once per database and again only when its
+version is bumped here. This is the only definition of the triggers: new
+databases get them from apply_schema_patches.py after
+database_setup/01_schema.sql, not from a copy in database_setup/.
+"""
+from sqlalchemy import text
+
+# Statement-level replacement for the per-row update_attendance_summary()
+# trigger. Transition tables give every row touched by the statement; the
+# function folds them into per-enrollment counter deltas and applies them
+# with one upsert, instead of recounting each enrollment's full history.
+# Postgres only allows transition tables on single-event triggers, hence
+# one trigger per event sharing the same function.
+SUMMARY_DELTA_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION apply_attendance_summary_deltas()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_changes TEXT;
+BEGIN
+    v_changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT enrollment_id, status, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT enrollment_id, status, -1 AS sign FROM old_rows'
+        ELSE
+            'SELECT enrollment_id, status, 1 AS sign FROM new_rows
+             UNION ALL
+             SELECT enrollment_id, status, -1 AS sign FROM old_rows'
+    END;
+
+    EXECUTE format($sql$
+        WITH changes AS (%s),
+        deltas AS (
+            SELECT
+                c.enrollment_id,
+                SUM(c.sign) AS total_classes,
+                SUM(CASE WHEN c.status = 'present' THEN c.sign ELSE 0 END) AS classes_attended,
+                SUM(CASE WHEN c.status = 'absent' THEN c.sign ELSE 0 END) AS classes_absent,
+                SUM(CASE WHEN c.status = 'late' THEN c.sign ELSE 0 END) AS classes_late,
+                SUM(CASE WHEN c.status = 'excused' THEN c.sign ELSE 0 END) AS classes_excused
+            FROM changes c
+            JOIN course_enrollments ce ON ce.enrollment_id = c.enrollment_id
+            GROUP BY c.enrollment_id
+        )
+        INSERT INTO attendance_summary (
+            summary_id, enrollment_id, total_classes, classes_attended,
+            classes_absent, classes_late, classes_excused,
+            attendance_percentage, last_updated
+        )
+        SELECT
+            gen_random_uuid(),
+            enrollment_id,
+            total_classes,
+            classes_attended,
+            classes_absent,
+            classes_late,
+            classes_excused,
+            CASE
+                WHEN total_classes > 0 THEN
+                    ROUND(((classes_attended + classes_late)::DECIMAL / total_classes) * 100, 2)
+                ELSE 0
+            END,
+            CURRENT_TIMESTAMP
+        FROM deltas
+        WHERE total_classes <> 0 OR classes_attended <> 0 OR classes_absent <> 0
+           OR classes_late <> 0 OR classes_excused <> 0
+        ON CONFLICT (enrollment_id)
+        DO UPDATE SET
+            total_classes = attendance_summary.total_classes + EXCLUDED.total_classes,
+            classes_attended = attendance_summary.classes_attended + EXCLUDED.classes_attended,
+            classes_absent = attendance_summary.classes_absent + EXCLUDED.classes_absent,
+            classes_late = attendance_summary.classes_late + EXCLUDED.classes_late,
+            classes_excused = attendance_summary.classes_excused + EXCLUDED.classes_excused,
+            attendance_percentage = CASE
+                WHEN attendance_summary.total_classes + EXCLUDED.total_classes > 0 THEN
+                    ROUND((
+                        (attendance_summary.classes_attended + EXCLUDED.classes_attended
+                         + attendance_summary.classes_late + EXCLUDED.classes_late)::DECIMAL
+                        / (attendance_summary.total_classes + EXCLUDED.total_classes)
+                    ) * 100, 2)
+                ELSE 0
+            END,
+            last_updated = CURRENT_TIMESTAMP
+    $sql$, v_changes);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_attendance_summary ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_attendance_summary_insert ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_attendance_summary_update ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_attendance_summary_delete ON attendance_records;
+
+CREATE TRIGGER trigger_attendance_summary_insert
+AFTER INSERT ON attendance_records
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_attendance_summary_deltas();
+
+CREATE TRIGGER trigger_attendance_summary_update
+AFTER UPDATE ON attendance_records
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_attendance_summary_deltas();
+
+CREATE TRIGGER trigger_attendance_summary_delete
+AFTER DELETE ON attendance_records
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_attendance_summary_deltas();
+"""
+
+# Maintains course_daily_attendance (app/models/attendance.py) from the same
+# transition tables, then fills it from the existing records once.
+COURSE_DAILY_ROLLUP_SQL = """
+CREATE TABLE IF NOT EXISTS course_daily_attendance (
+    course_id UUID REFERENCES courses(course_id) ON DELETE CASCADE,
+    class_date DATE NOT NULL,
+    present_count INTEGER NOT NULL DEFAULT 0,
+    late_count INTEGER NOT NULL DEFAULT 0,
+    absent_count INTEGER NOT NULL DEFAULT 0,
+    excused_count INTEGER NOT NULL DEFAULT 0,
+    last_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (course_id, class_date)
+);
+
+CREATE OR REPLACE FUNCTION apply_course_daily_rollup_deltas()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_changes TEXT;
+BEGIN
+    v_changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT enrollment_id, class_date, status, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT enrollment_id, class_date, status, -1 AS sign FROM old_rows'
+        ELSE
+            'SELECT enrollment_id, class_date, status, 1 AS sign FROM new_rows
+             UNION ALL
+             SELECT enrollment_id, class_date, status, -1 AS sign FROM old_rows'
+    END;
+
+    EXECUTE format($sql$
+        WITH changes AS (%s),
+        deltas AS (
+            SELECT
+                ce.course_id,
+                c.class_date,
+                SUM(CASE WHEN c.status = 'present' THEN c.sign ELSE 0 END) AS present_count,
+                SUM(CASE WHEN c.status = 'late' THEN c.sign ELSE 0 END) AS late_count,
+                SUM(CASE WHEN c.status = 'absent' THEN c.sign ELSE 0 END) AS absent_count,
+                SUM(CASE WHEN c.status = 'excused' THEN c.sign ELSE 0 END) AS excused_count
+            FROM changes c
+            JOIN course_enrollments ce ON ce.enrollment_id = c.enrollment_id
+            GROUP BY ce.course_id, c.class_date
+        )
+        INSERT INTO course_daily_attendance (
+            course_id, class_date, present_count, late_count,
+            absent_count, excused_count, last_updated
+        )
+        SELECT course_id, class_date, present_count, late_count,
+               absent_count, excused_count, CURRENT_TIMESTAMP
+        FROM deltas
+        WHERE present_count <> 0 OR late_count <> 0 OR absent_count <> 0 OR excused_count <> 0
+        ON CONFLICT (course_id, class_date)
+        DO UPDATE SET
+            present_count = course_daily_attendance.present_count + EXCLUDED.present_count,
+            late_count = course_daily_attendance.late_count + EXCLUDED.late_count,
+            absent_count = course_daily_attendance.absent_count + EXCLUDED.absent_count,
+            excused_count = course_daily_attendance.excused_count + EXCLUDED.excused_count,
+            last_updated = CURRENT_TIMESTAMP
+    $sql$, v_changes);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_course_daily_rollup_insert ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_course_daily_rollup_update ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_course_daily_rollup_delete ON attendance_records;
+
+CREATE TRIGGER trigger_course_daily_rollup_insert
+AFTER INSERT ON attendance_records
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_course_daily_rollup_deltas();
+
+CREATE TRIGGER trigger_course_daily_rollup_update
+AFTER UPDATE ON attendance_records
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_course_daily_rollup_deltas();
+
+CREATE TRIGGER trigger_course_daily_rollup_delete
+AFTER DELETE ON attendance_records
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_course_daily_rollup_deltas();
+
+LOCK TABLE attendance_records IN SHARE MODE;
+DELETE FROM course_daily_attendance;
+INSERT INTO course_daily_attendance (course_id, class_date, present_count, late_count, absent_count, excused_count)
+SELECT ce.course_id, ar.class_date,
+       SUM(CASE WHEN ar.status = 'present' THEN 1 ELSE 0 END),
+       SUM(CASE WHEN ar.status = 'late' THEN 1 ELSE 0 END),
+       SUM(CASE WHEN ar.status = 'absent' THEN 1 ELSE 0 END),
+       SUM(CASE WHEN ar.status = 'excused' THEN 1 ELSE 0 END)
+FROM attendance_records ar
+JOIN course_enrollments ce ON ce.enrollment_id = ar.enrollment_id
+GROUP BY ce.course_id, ar.class_date;
+"""
+
+# Shortage status, reports and notifications move to the set-based sweep in
+# app/services/shortage_service.py. The per-row trigger chain goes, and
+# shortage_reports gets the (enrollment_id, report_date) key the sweep upserts
+# on. The old trigger's ON CONFLICT DO NOTHING never matched anything, so it
+# left a report per summary update; keep the newest of each day.
+SHORTAGE_SWEEP_SQL = """
+DROP TRIGGER IF EXISTS trigger_check_shortage ON attendance_summary;
+DROP TRIGGER IF EXISTS trigger_notify_shortage ON shortage_reports;
+
+DELETE FROM shortage_reports a
+USING shortage_reports b
+WHERE a.enrollment_id = b.enrollment_id
+  AND a.report_date = b.report_date
+  AND (a.created_at, a.report_id) < (b.created_at, b.report_id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_shortage_reports_enrollment_date
+    ON shortage_reports(enrollment_id, report_date);
+"""
+
+# Cohort cube: attendance_summary totals per (student department, semester,
+# batch year, course department, academic year), so admin analytics read a
+# row per cell instead of scanning summaries. Statement-level like the
+# summary trigger: the transition tables of each summary write are folded
+# into per-cell deltas (new rows minus old rows). Updates to students and
+# courses run the same function, moving the enrollments of a student or
+# course whose cell attributes changed. v2 adds those and rebuilds the cube,
+# repairing cells left stale by earlier dimension changes.
+COHORT_CUBE_SQL = """
+CREATE TABLE IF NOT EXISTS attendance_cohort_cube (
+    student_department VARCHAR(100) NOT NULL,
+    semester INTEGER NOT NULL,
+    batch_year INTEGER NOT NULL,
+    course_department VARCHAR(100) NOT NULL,
+    academic_year VARCHAR(10) NOT NULL,
+    enrollments INTEGER NOT NULL DEFAULT 0,
+    total_classes INTEGER NOT NULL DEFAULT 0,
+    classes_attended INTEGER NOT NULL DEFAULT 0,
+    classes_late INTEGER NOT NULL DEFAULT 0,
+    classes_absent INTEGER NOT NULL DEFAULT 0,
+    classes_excused INTEGER NOT NULL DEFAULT 0,
+    percentage_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    shortage_count INTEGER NOT NULL DEFAULT 0,
+    last_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (student_department, semester, batch_year, course_department, academic_year)
+);
+
+CREATE OR REPLACE FUNCTION apply_cohort_cube_deltas()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_cells TEXT;
+    v_changes TEXT;
+BEGIN
+    -- Rows of the transition table (%2$s) in their cube cell, signed (%1$s)
+    v_cells := CASE TG_TABLE_NAME
+        WHEN 'attendance_summary' THEN
+            'SELECT s.department AS student_department, s.semester, s.batch_year,
+                    co.department AS course_department, ce.academic_year, r.*, %1$s AS sign
+             FROM %2$s r
+             JOIN course_enrollments ce ON ce.enrollment_id = r.enrollment_id
+             JOIN students s ON s.student_id = ce.student_id
+             JOIN courses co ON co.course_id = ce.course_id'
+        -- A student or course moving cell takes its enrollments' summaries
+        -- out of the old cell (old_rows) and into the new one (new_rows)
+        WHEN 'students' THEN
+            'SELECT r.department AS student_department, r.semester, r.batch_year,
+                    co.department AS course_department, ce.academic_year, sm.*, %1$s AS sign
+             FROM %2$s r
+             JOIN course_enrollments ce ON ce.student_id = r.student_id
+             JOIN courses co ON co.course_id = ce.course_id
+             JOIN attendance_summary sm ON sm.enrollment_id = ce.enrollment_id
+             WHERE r.student_id IN (
+                 SELECT o.student_id FROM old_rows o JOIN new_rows n USING (student_id)
+                 WHERE (o.department, o.semester, o.batch_year)
+                       IS DISTINCT FROM (n.department, n.semester, n.batch_year))'
+        ELSE
+            'SELECT s.department AS student_department, s.semester, s.batch_year,
+                    r.department AS course_department, ce.academic_year, sm.*, %1$s AS sign
+             FROM %2$s r
+             JOIN course_enrollments ce ON ce.course_id = r.course_id
+             JOIN students s ON s.student_id = ce.student_id
+             JOIN attendance_summary sm ON sm.enrollment_id = ce.enrollment_id
+             WHERE r.course_id IN (
+                 SELECT o.course_id FROM old_rows o JOIN new_rows n USING (course_id)
+                 WHERE o.department IS DISTINCT FROM n.department)'
+    END;
+
+    v_changes := CASE TG_OP
+        WHEN 'INSERT' THEN format(v_cells, 1, 'new_rows')
+        WHEN 'DELETE' THEN format(v_cells, -1, 'old_rows')
+        ELSE format(v_cells, 1, 'new_rows') || ' UNION ALL ' || format(v_cells, -1, 'old_rows')
+    END;
+
+    EXECUTE format($sql$
+        WITH changes AS (%s),
+        deltas AS (
+            SELECT
+                c.student_department,
+                c.semester,
+                c.batch_year,
+                c.course_department,
+                c.academic_year,
+                SUM(CASE WHEN c.total_classes > 0 THEN c.sign ELSE 0 END) AS enrollments,
+                SUM(c.sign * COALESCE(c.total_classes, 0)) AS total_classes,
+                SUM(c.sign * COALESCE(c.classes_attended, 0)) AS classes_attended,
+                SUM(c.sign * COALESCE(c.classes_late, 0)) AS classes_late,
+                SUM(c.sign * COALESCE(c.classes_absent, 0)) AS classes_absent,
+                SUM(c.sign * COALESCE(c.classes_excused, 0)) AS classes_excused,
+                SUM(CASE WHEN c.total_classes > 0 THEN c.sign * COALESCE(c.attendance_percentage, 0) ELSE 0 END) AS percentage_sum,
+                SUM(CASE WHEN c.shortage_status THEN c.sign ELSE 0 END) AS shortage_count
+            FROM changes c
+            GROUP BY c.student_department, c.semester, c.batch_year, c.course_department, c.academic_year
+        )
+        INSERT INTO attendance_cohort_cube (
+            student_department, semester, batch_year, course_department, academic_year,
+            enrollments, total_classes, classes_attended, classes_late, classes_absent,
+            classes_excused, percentage_sum, shortage_count, last_updated
+        )
+        SELECT
+            student_department, semester, batch_year, course_department, academic_year,
+            enrollments, total_classes, classes_attended, classes_late, classes_absent,
+            classes_excused, percentage_sum, shortage_count, CURRENT_TIMESTAMP
+        FROM deltas
+        WHERE enrollments <> 0 OR total_classes <> 0 OR classes_attended <> 0 OR classes_late <> 0
+           OR classes_absent <> 0 OR classes_excused <> 0 OR percentage_sum <> 0 OR shortage_count <> 0
+        ON CONFLICT (student_department, semester, batch_year, course_department, academic_year)
+        DO UPDATE SET
+            enrollments = attendance_cohort_cube.enrollments + EXCLUDED.enrollments,
+            total_classes = attendance_cohort_cube.total_classes + EXCLUDED.total_classes,
+            classes_attended = attendance_cohort_cube.classes_attended + EXCLUDED.classes_attended,
+            classes_late = attendance_cohort_cube.classes_late + EXCLUDED.classes_late,
+            classes_absent = attendance_cohort_cube.classes_absent + EXCLUDED.classes_absent,
+            classes_excused = attendance_cohort_cube.classes_excused + EXCLUDED.classes_excused,
+            percentage_sum = attendance_cohort_cube.percentage_sum + EXCLUDED.percentage_sum,
+            shortage_count = attendance_cohort_cube.shortage_count + EXCLUDED.shortage_count,
+            last_updated = CURRENT_TIMESTAMP
+    $sql$, v_changes);
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_cohort_cube_insert ON attendance_summary;
+DROP TRIGGER IF EXISTS trigger_cohort_cube_update ON attendance_summary;
+DROP TRIGGER IF EXISTS trigger_cohort_cube_delete ON attendance_summary;
+DROP TRIGGER IF EXISTS trigger_cohort_cube_student_move ON students;
+DROP TRIGGER IF EXISTS trigger_cohort_cube_course_move ON courses;
+
+CREATE TRIGGER trigger_cohort_cube_insert
+AFTER INSERT ON attendance_summary
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_cohort_cube_deltas();
+
+CREATE TRIGGER trigger_cohort_cube_update
+AFTER UPDATE ON attendance_summary
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_cohort_cube_deltas();
+
+CREATE TRIGGER trigger_cohort_cube_delete
+AFTER DELETE ON attendance_summary
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_cohort_cube_deltas();
+
+CREATE TRIGGER trigger_cohort_cube_student_move
+AFTER UPDATE ON students
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_cohort_cube_deltas();
+
+CREATE TRIGGER trigger_cohort_cube_course_move
+AFTER UPDATE ON courses
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION apply_cohort_cube_deltas();
+
+LOCK TABLE attendance_summary IN SHARE MODE;
+DELETE FROM attendance_cohort_cube;
+INSERT INTO attendance_cohort_cube (
+    student_department, semester, batch_year, course_department, academic_year,
+    enrollments, total_classes, classes_attended, classes_late, classes_absent,
+    classes_excused, percentage_sum, shortage_count
+)
+SELECT s.department, s.semester, s.batch_year, co.department, ce.academic_year,
+       SUM(CASE WHEN sm.total_classes > 0 THEN 1 ELSE 0 END),
+       SUM(COALESCE(sm.total_classes, 0)),
+       SUM(COALESCE(sm.classes_attended, 0)),
+       SUM(COALESCE(sm.classes_late, 0)),
+       SUM(COALESCE(sm.classes_absent, 0)),
+       SUM(COALESCE(sm.classes_excused, 0)),
+       SUM(CASE WHEN sm.total_classes > 0 THEN COALESCE(sm.attendance_percentage, 0) ELSE 0 END),
+       SUM(CASE WHEN sm.shortage_status THEN 1 ELSE 0 END)
+FROM attendance_summary sm
+JOIN course_enrollments ce ON ce.enrollment_id = sm.enrollment_id
+JOIN students s ON s.student_id = ce.student_id
+JOIN courses co ON co.course_id = ce.course_id
+GROUP BY s.department, s.semester, s.batch_year, co.department, ce.academic_year;
+"""
+
+SCHEMA_PATCHES = [
+    ("attendance_summary_delta_trigger", 1, SUMMARY_DELTA_TRIGGER_SQL),
+    ("course_daily_rollup_trigger", 1, COURSE_DAILY_ROLLUP_SQL),
+    ("shortage_sweep", 1, SHORTAGE_SWEEP_SQL),
+    ("cohort_cube_trigger", 2, COHORT_CUBE_SQL),
+]
+
+
+def apply_schema_patches(conn):
+    """
+    Apply every patch whose recorded version is behind SCHEMA_PATCHES.
+    Must run inside a transaction on a Postgres connection.
+    """
+    conn.execute(text("""
+CREATE TABLE IF NOT EXISTS schema_patches (
+    name VARCHAR(100) PRIMARY KEY,
+    version INTEGER NOT NULL,
+    applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+)
+    """))
+    # Serialise concurrent workers starting up against the same database
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_patches'))"))
+    applied = dict(conn.execute(text("SELECT name, version FROM schema_patches")).all())
+
+    for name, version, sql in SCHEMA_PATCHES:
+        if applied.get(name, 0) >= version:
+            continue
+        # no_parameters keeps the driver from %-formatting the plpgsql body
+        conn.exec_driver_sql(sql, execution_options={"no_parameters": True})
+        conn.execute(text("""
+INSERT INTO schema_patches (name, version) VALUES (:name, :version)
+ON CONFLICT (name) DO UPDATE SET version = EXCLUDED.version, applied_at = CURRENT_TIMESTAMP
+        """), {"name": name, "version": version})
+        print(f"Applied schema patch {name} v{version}")
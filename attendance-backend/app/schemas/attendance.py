@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import Base64Bytes, BaseModel, Discriminator, PrivateAttr, Tag, model_validator
+from typing import Annotated, Dict, Optional, List, Union
 from datetime import date, datetime
 from uuid import UUID
 
@@ -13,6 +13,81 @@ class BulkAttendanceCreate(BaseModel):
     class_date: date
     attendance_data: List[AttendanceMark]
 
+COMPACT_STATUSES = {"present", "absent", "late", "excused"}
+
+class CompactAttendanceCreate(BaseModel):
+    """
+    Columnar alternative to BulkAttendanceCreate for large classes: the
+    roster is sent once and the statuses as a bitmap, so no model is built
+    per student. Bit i of `present` (base64, least significant bit first
+    within each byte) marks roster[i] present, otherwise absent;
+    `exceptions` (e.g. late/excused) and `remarks` are keyed by roster index.
+    """
+    course_id: UUID
+    class_date: date
+    roster: List[UUID]
+    present: Base64Bytes
+    exceptions: Dict[int, str] = {}
+    remarks: Dict[int, str] = {}
+    _marks: list = PrivateAttr(default_factory=list)
+
+    @model_validator(mode="after")
+    def decode_marks(self):
+        size = len(self.roster)
+        bitmap = self.present
+        if len(bitmap) != (size + 7) // 8:
+            raise ValueError(f"present must be {(size + 7) // 8} bytes for a roster of {size}")
+        if size % 8 and bitmap[-1] >> (size % 8):
+            raise ValueError("present has bits set past the end of the roster")
+        for index, status in self.exceptions.items():
+            if not 0 <= index < size:
+                raise ValueError(f"exception index {index} is outside the roster")
+            if status not in COMPACT_STATUSES:
+                raise ValueError(f"invalid status '{status}' at index {index}")
+        for index in self.remarks:
+            if not 0 <= index < size:
+                raise ValueError(f"remarks index {index} is outside the roster")
+
+        statuses = ["present" if bitmap[i >> 3] >> (i & 7) & 1 else "absent" for i in range(size)]
+        for index, status in self.exceptions.items():
+            statuses[index] = status
+        remarks = self.remarks
+        self._marks = [
+            (student_id, status, remarks.get(i))
+            for i, (student_id, status) in enumerate(zip(self.roster, statuses))
+        ]
+        return self
+
+    @property
+    def attendance_data(self):
+        # (student_id, status, remarks) tuples, read directly by AttendanceService
+        return self._marks
+
+def _submission_format(value):
+    if isinstance(value, dict):
+        return "compact" if "roster" in value else "list"
+    return "compact" if isinstance(value, CompactAttendanceCreate) else "list"
+
+# Body of the marking endpoints: either encoding, picked by the presence of `roster`
+AttendanceSubmission = Annotated[
+    Union[
+        Annotated[BulkAttendanceCreate, Tag("list")],
+        Annotated[CompactAttendanceCreate, Tag("compact")],
+    ],
+    Discriminator(_submission_format),
+]
+
+class AttendanceSessionSync(BulkAttendanceCreate):
+    # When the tablet last pulled this session; server rows changed after it are conflicts
+    last_synced_at: Optional[datetime] = None
+
+class BatchAttendanceCreate(BaseModel):
+    sessions: List[AttendanceSessionSync]
+
+class QuickMarkRequest(BaseModel):
+    class_date: Optional[date] = None # defaults to today
+    absentees: List[UUID] = [] # student_ids to mark absent; everyone else is present
+
 class AttendanceRecordResponse(BaseModel):
     attendance_id: UUID
     enrollment_id: UUID
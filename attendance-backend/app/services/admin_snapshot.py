@@ -0,0 +1,185 @@
+import threading
+import time
+import traceback
+from datetime import datetime, timezone
+from sqlalchemy import case, event, func, select
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.attendance import AttendanceSummary
+from app.models.course import Course, CourseEnrollment
+from app.models.faculty import Faculty
+from app.models.student import Student
+
+settings = get_settings()
+
+
+class AdminDashboardSnapshot:
+    """
+    The admin dashboard statistics, built in three queries by a background
+    thread and served from memory, so admin page loads never touch
+    attendance_summary.
+
+    The snapshot is rebuilt every ADMIN_SNAPSHOT_INTERVAL_SECONDS, or sooner
+    once ADMIN_SNAPSHOT_MAX_WRITES writes have been committed through this
+    process since the last build (write paths call note_writes(); ORM
+    inserts/deletes of students, faculty, courses and enrollments count via
+    the listeners below).
+    """
+
+    def __init__(self, interval_seconds: int, max_writes: int):
+        self._interval = interval_seconds
+        self._max_writes = max_writes
+        self._snapshot = None
+        self._writes = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def build(db: Session) -> dict:
+        counts = db.execute(select(
+            select(func.count(Student.student_id)).scalar_subquery(),
+            select(func.count(Faculty.faculty_id)).scalar_subquery(),
+            select(func.count(Course.course_id)).scalar_subquery(),
+        )).one()
+
+        departments = db.query(Student.department, func.count(Student.student_id)).group_by(Student.department).all()
+
+        courses = db.query(
+            Course.course_code,
+            func.avg(AttendanceSummary.attendance_percentage),
+            func.sum(case((AttendanceSummary.shortage_status == True, 1), else_=0)),
+        ).join(
+            CourseEnrollment, Course.course_id == CourseEnrollment.course_id
+        ).join(
+            AttendanceSummary, CourseEnrollment.enrollment_id == AttendanceSummary.enrollment_id
+        ).group_by(Course.course_code).all()
+
+        total_students, total_faculty, total_courses = counts
+        return {
+            "stats": {
+                "total_students": total_students or 0,
+                "total_faculty": total_faculty or 0,
+                "total_courses": total_courses or 0,
+                "shortage_alerts": sum(int(shortage or 0) for _, _, shortage in courses),
+            },
+            "dept_distribution": [
+                {"name": dept, "value": count} for dept, count in departments
+            ],
+            "course_performance": [
+                {
+                    "name": code,
+                    "present": round(float(avg_perc or 0), 1) if avg_perc is not None else 0.0,
+                    "absent": round(max(0, 100 - float(avg_perc or 0)), 1) if avg_perc is not None else 100.0
+                } for code, avg_perc, _ in courses
+            ],
+        }
+
+    def refresh(self, db: Session = None) -> dict:
+        """Rebuild now, in `db` or a session of its own."""
+        own = db is None
+        db = db or SessionLocal()
+        try:
+            with self._lock:
+                writes = self._writes
+            data = self.build(db)
+        finally:
+            if own:
+                db.close()
+        snapshot = {"data": data, "generated_at": datetime.now(timezone.utc), "built_at": time.monotonic()}
+        with self._lock:
+            self._snapshot = snapshot
+            # Writes committed while building count towards the next one
+            self._writes -= writes
+        return snapshot
+
+    def _due(self, snapshot) -> bool:
+        if snapshot is None:
+            return True
+        with self._lock:
+            writes = self._writes
+        return (time.monotonic() - snapshot["built_at"] >= self._interval
+                or (self._max_writes > 0 and writes >= self._max_writes))
+
+    def get(self, db: Session) -> dict:
+        """
+        The current snapshot with its age. Built inline the first time, and
+        whenever a rebuild is due but the refresh thread isn't running
+        (interval 0, or a process that never started it).
+        """
+        snapshot = self._snapshot
+        running = self._thread is not None and self._thread.is_alive()
+        if snapshot is None or (not running and self._due(snapshot)):
+            snapshot = self.refresh(db)
+        with self._lock:
+            pending = self._writes
+        return {
+            **snapshot["data"],
+            "snapshot": {
+                "generated_at": snapshot["generated_at"].isoformat(),
+                "age_seconds": round(time.monotonic() - snapshot["built_at"], 1),
+                "pending_writes": pending,
+            },
+        }
+
+    def note_writes(self, db: Session, count: int = 1):
+        """Count `count` writes towards the next rebuild once the caller commits."""
+        db.info["admin_snapshot_writes"] = db.info.get("admin_snapshot_writes", 0) + count
+
+    def _commit(self, session):
+        count = session.info.pop("admin_snapshot_writes", 0)
+        if not count:
+            return
+        with self._lock:
+            self._writes += count
+            due = self._max_writes > 0 and self._writes >= self._max_writes
+        if due:
+            self._wake.set()
+
+    def _discard(self, session):
+        session.info.pop("admin_snapshot_writes", None)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception:
+                traceback.print_exc()
+                continue
+            # Don't rebuild back to back under a steady write load
+            self._stop.wait(max(0.0, 1.0 - (time.monotonic() - started)))
+
+    def start(self):
+        """Start the refresh thread (no-op when the interval is 0)."""
+        if self._interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="admin-snapshot", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+admin_snapshot = AdminDashboardSnapshot(settings.ADMIN_SNAPSHOT_INTERVAL_SECONDS, settings.ADMIN_SNAPSHOT_MAX_WRITES)
+event.listen(Session, "after_commit", admin_snapshot._commit)
+event.listen(Session, "after_rollback", admin_snapshot._discard)
+
+
+def _row_written(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        admin_snapshot.note_writes(session)
+
+for _model in (Student, Faculty, Course, CourseEnrollment):
+    for _event in ("after_insert", "after_delete"):
+        event.listen(_model, _event, _row_written)
@@ -1,63 +1,384 @@
-from sqlalchemy.orm import Session
-from uuid import UUID
-from datetime import date
-from typing import List
-from app.models.attendance import AttendanceRecord
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import Date, String, Uuid, case, event, literal, select
+from sqlalchemy.orm import Session, aliased
+from uuid import UUID, uuid4
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from app.database import clock_now, dialect_insert, lock_for_write, new_uuid_expr
+from app.models.attendance import AttendanceRecord, AttendanceSummary, ShortageReport
 from app.models.course import CourseEnrollment
 from app.schemas.attendance import AttendanceMark
+from app.services.admin_snapshot import admin_snapshot
+from app.services.cube_service import cohort_cube
+from app.services.dashboard_cache import student_dashboard_cache
+from app.services.distribution_service import distribution_service
+from app.services.live_feed import live_feed
+from app.services.rollup_service import daily_rollup
+from app.services.summary_service import RecordChange, summary_maintainer
+from app.services.version_service import COURSE, STUDENT, entity_versions
+
+OUTCOME_INSERTED = "inserted"
+OUTCOME_UPDATED = "updated"
+OUTCOME_UNCHANGED = "unchanged"
+OUTCOME_CONFLICT = "conflict"
+OUTCOME_NOT_ENROLLED = "skipped_not_enrolled"
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+IDEMPOTENCY_MAX_KEYS = 10000
+
+
+class IdempotencyKeyConflict(Exception):
+    """Raised when an idempotency key is reused for a different submission."""
+
+
+class IdempotencyStore:
+    """
+    Remembers the result of each keyed submission for a day.
+
+    Entries are staged on the session and only become visible once the
+    transaction commits, so a failed write can be retried with the same key.
+    This is per process; a retry that lands on another worker is still
+    cheap because unchanged rows are never rewritten.
+    """
+
+    def __init__(self, ttl_seconds: int, max_keys: int):
+        self._ttl = ttl_seconds
+        self._max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope_key, fingerprint):
+        with self._lock:
+            entry = self._entries.get(scope_key)
+            if entry is None:
+                return None
+            stored_at, stored_fingerprint, result = entry
+            if time.monotonic() - stored_at > self._ttl:
+                del self._entries[scope_key]
+                return None
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyKeyConflict("Idempotency key was already used for a different submission")
+        return result
+
+    def stage(self, db: Session, scope_key, fingerprint, result):
+        db.info.setdefault("pending_idempotency", []).append((scope_key, fingerprint, result))
+
+    def _commit(self, session):
+        pending = session.info.pop("pending_idempotency", None)
+        if not pending:
+            return
+        with self._lock:
+            for scope_key, fingerprint, result in pending:
+                self._entries[scope_key] = (time.monotonic(), fingerprint, result)
+                self._entries.move_to_end(scope_key)
+            while len(self._entries) > self._max_keys:
+                self._entries.popitem(last=False)
+
+    def _discard(self, session):
+        session.info.pop("pending_idempotency", None)
+
+idempotency_store = IdempotencyStore(IDEMPOTENCY_TTL_SECONDS, IDEMPOTENCY_MAX_KEYS)
+event.listen(Session, "after_commit", idempotency_store._commit)
+event.listen(Session, "after_rollback", idempotency_store._discard)
+
+
+def _read_mark(record):
+    # Handle decoded compact tuples, dicts and objects
+    if isinstance(record, tuple):
+        return record
+    if isinstance(record, dict):
+        return record.get('student_id'), record.get('status'), record.get('remarks')
+    return (
+        getattr(record, 'student_id', None),
+        getattr(record, 'status', None),
+        getattr(record, 'remarks', None),
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive UTC timestamps; treat naive input the same way
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _fingerprint(course_id, class_date, marks):
+    digest = hashlib.sha256(f"{course_id}|{class_date}".encode())
+    for student_id in sorted(marks, key=str):
+        status, remarks = marks[student_id]
+        digest.update(f"|{student_id}:{status}:{remarks}".encode())
+    return digest.hexdigest()
+
 
 class AttendanceService:
     @staticmethod
     def mark_attendance(
-        db: Session, 
-        course_id: UUID, 
-        class_date: date, 
+        db: Session,
+        course_id: UUID,
+        class_date: date,
         attendance_data: List[AttendanceMark],
-        marked_by: UUID
+        marked_by: UUID,
+        commit: bool = True,
+        idempotency_key: Optional[str] = None,
+        if_unmodified_since: Optional[datetime] = None,
+        submitted_by: Optional[UUID] = None
     ):
         """
         Mark attendance for a list of students in a course.
-        Note: Percentage calculation is handled by DB triggers.
+
+        Set-based: enrollments for the course are resolved in one query, the
+        current rows for the date in another, and only rows whose status or
+        remarks actually change are written, with a single batched upsert on
+        uq_enrollment_date. Summaries are updated by the DB triggers, or by
+        the summary maintainer in the same transaction where those are
+        unavailable.
+        A repeated idempotency_key for the same submission returns the first
+        result without touching the database; keys are scoped to the
+        submitting user (submitted_by), since marked_by is None for admins.
+        With if_unmodified_since, rows changed on the server after that time
+        are left alone and reported as conflicts (offline sync).
+        With commit=False the caller owns the transaction (group commit).
         """
+        course_id = UUID(str(course_id))
+
+        # Normalise the payload; a student listed twice keeps the last mark
+        marks = {}
         for record in attendance_data:
-            # Handle both dict and object
-            s_id = record.get('student_id') if isinstance(record, dict) else getattr(record, 'student_id', None)
-            status = record.get('status') if isinstance(record, dict) else getattr(record, 'status', None)
-            remarks = record.get('remarks') if isinstance(record, dict) else getattr(record, 'remarks', None)
-            
+            s_id, status, remarks = _read_mark(record)
             if not s_id:
                 continue
+            marks[UUID(str(s_id))] = (status, remarks)
 
-            # Find enrollment
-            enrollment = db.query(CourseEnrollment).filter(
-                CourseEnrollment.student_id == s_id,
-                CourseEnrollment.course_id == course_id
-            ).first()
-            
-            if not enrollment:
-                continue
-                
-            # Check if record already exists for this date and enrollment
-            db_record = db.query(AttendanceRecord).filter(
-                AttendanceRecord.enrollment_id == enrollment.enrollment_id,
+        scope_key = fingerprint = None
+        if idempotency_key:
+            scope_key = (str(submitted_by), idempotency_key)
+            fingerprint = _fingerprint(course_id, class_date, marks)
+            replay = idempotency_store.get(scope_key, fingerprint)
+            if replay is not None:
+                return dict(replay, replayed=True)
+
+        # One query for every enrollment in the course (latest academic year wins)
+        enrollment_by_student = {}
+        if marks:
+            enrollment_by_student = {
+                student_id: enrollment_id
+                for student_id, enrollment_id in db.query(
+                    CourseEnrollment.student_id, CourseEnrollment.enrollment_id
+                ).filter(
+                    CourseEnrollment.course_id == course_id
+                ).order_by(CourseEnrollment.academic_year).all()
+            }
+
+        # One query for the rows already marked on this date, read under the
+        # write lock for the session: the deltas and outcomes below are
+        # computed from it, so a concurrent submission must not slip in between
+        existing = {}
+        marked_at = {}
+        if enrollment_by_student:
+            lock_for_write(db, AttendanceRecord, [f"{course_id}:{class_date}"])
+            for enrollment_id, status, remarks, at in db.query(
+                AttendanceRecord.enrollment_id, AttendanceRecord.status,
+                AttendanceRecord.remarks, AttendanceRecord.marked_at
+            ).join(
+                CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+            ).filter(
+                CourseEnrollment.course_id == course_id,
                 AttendanceRecord.class_date == class_date
-            ).first()
-            
-            if db_record:
-                db_record.status = status
-                db_record.remarks = remarks
-                db_record.marked_by = marked_by
-            else:
-                db_record = AttendanceRecord(
-                    enrollment_id=enrollment.enrollment_id,
-                    class_date=class_date,
-                    status=status,
-                    marked_by=marked_by,
-                    remarks=remarks
-                )
-                db.add(db_record)
-        
+            ).all():
+                existing[enrollment_id] = (status, remarks)
+                marked_at[enrollment_id] = at
+
+        since = _as_utc(if_unmodified_since) if if_unmodified_since else None
+
+        rows = []
+        changes = []
+        results = []
+        written_students = []
+        written_marks = []
+        for student_id, (status, remarks) in marks.items():
+            enrollment_id = enrollment_by_student.get(student_id)
+            if enrollment_id is None:
+                results.append({"student_id": str(student_id), "outcome": OUTCOME_NOT_ENROLLED})
+                continue
+            current = existing.get(enrollment_id)
+            if current == (status, remarks):
+                results.append({"student_id": str(student_id), "outcome": OUTCOME_UNCHANGED})
+                continue
+            if current and since and marked_at[enrollment_id] and _as_utc(marked_at[enrollment_id]) > since:
+                results.append({
+                    "student_id": str(student_id),
+                    "outcome": OUTCOME_CONFLICT,
+                    "server_status": current[0],
+                    "server_remarks": current[1],
+                    "server_marked_at": _as_utc(marked_at[enrollment_id]).isoformat(),
+                })
+                continue
+            rows.append({
+                "attendance_id": uuid4(),
+                "enrollment_id": enrollment_id,
+                "class_date": class_date,
+                "status": status,
+                "marked_by": marked_by,
+                "remarks": remarks,
+            })
+            changes.append(RecordChange(enrollment_id, current[0] if current else None, status, course_id, class_date))
+            written_students.append(student_id)
+            written_marks.append((student_id, status))
+            outcome = OUTCOME_UPDATED if current else OUTCOME_INSERTED
+            results.append({"student_id": str(student_id), "outcome": outcome})
+
+        if rows:
+            # Stamped with the write time, not the transaction start, so a
+            # sync checked against marked_at sees changes committed after it
+            stmt = dialect_insert(db, AttendanceRecord).values(marked_at=clock_now(db))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[AttendanceRecord.enrollment_id, AttendanceRecord.class_date],
+                set_={
+                    "status": stmt.excluded.status,
+                    "remarks": stmt.excluded.remarks,
+                    "marked_by": stmt.excluded.marked_by,
+                    "marked_at": stmt.excluded.marked_at,
+                },
+            )
+            captured = cohort_cube.capture(db, [c.enrollment_id for c in changes])
+            db.execute(stmt, rows)
+            summary_maintainer.apply(db, changes)
+            daily_rollup.apply(db, changes)
+            cohort_cube.apply(db, captured)
+            distribution_service.invalidate(db, [course_id])
+            student_dashboard_cache.invalidate(db, written_students)
+            admin_snapshot.note_writes(db, len(rows))
+            entity_versions.bump(db, COURSE, [course_id])
+            entity_versions.bump(db, STUDENT, written_students)
+            live_feed.publish_marking(db, course_id, class_date, written_marks)
+
+        counts = {OUTCOME_INSERTED: 0, OUTCOME_UPDATED: 0, OUTCOME_UNCHANGED: 0, OUTCOME_CONFLICT: 0, OUTCOME_NOT_ENROLLED: 0}
+        for r in results:
+            counts[r["outcome"]] += 1
+        result = {
+            "message": "Attendance marked successfully",
+            "inserted": counts[OUTCOME_INSERTED],
+            "updated": counts[OUTCOME_UPDATED],
+            "unchanged": counts[OUTCOME_UNCHANGED],
+            "conflicts": counts[OUTCOME_CONFLICT],
+            "skipped": counts[OUTCOME_NOT_ENROLLED],
+            "results": results,
+        }
+
+        if scope_key:
+            idempotency_store.stage(db, scope_key, fingerprint, result)
+        if commit:
+            db.commit()
+        return result
+
+    @staticmethod
+    def quick_mark(
+        db: Session,
+        course_id: UUID,
+        class_date: date,
+        marked_by: UUID,
+        absentees: Optional[List[UUID]] = None
+    ):
+        """
+        Marks every enrolled student present (absentees absent) with a single
+        INSERT ... SELECT from course_enrollments, whatever the class size.
+        A student enrolled in several academic years is marked once, on the
+        latest enrollment, as mark_attendance() does. Students already marked
+        for the date are left as they are, so on a partially marked date
+        only the missing students are filled in.
+        Returns the (enrollment_id, status) of the rows written.
+        """
+        course_id = UUID(str(course_id))
+        absentees = [UUID(str(a)) for a in absentees or []]
+
+        status_expr = literal("present", String)
+        if absentees:
+            status_expr = case(
+                (CourseEnrollment.student_id.in_(absentees), literal("absent", String)),
+                else_=literal("present", String),
+            )
+        later = aliased(CourseEnrollment)
+        roster = select(
+            new_uuid_expr(db),
+            CourseEnrollment.enrollment_id,
+            literal(class_date, Date),
+            status_expr,
+            literal(marked_by, Uuid(as_uuid=True)),
+            clock_now(db),
+        ).where(
+            CourseEnrollment.course_id == course_id,
+            # Latest academic year wins
+            ~select(later.enrollment_id).where(
+                later.course_id == CourseEnrollment.course_id,
+                later.student_id == CourseEnrollment.student_id,
+                later.academic_year > CourseEnrollment.academic_year,
+            ).exists(),
+        )
+
+        stmt = dialect_insert(db, AttendanceRecord).from_select(
+            ["attendance_id", "enrollment_id", "class_date", "status", "marked_by", "marked_at"],
+            roster,
+        ).on_conflict_do_nothing(
+            index_elements=[AttendanceRecord.enrollment_id, AttendanceRecord.class_date]
+        ).returning(AttendanceRecord.enrollment_id, AttendanceRecord.status)
+
+        written = db.execute(stmt).all()
+        changes = [
+            RecordChange(enrollment_id, None, status, course_id, class_date)
+            for enrollment_id, status in written
+        ]
+        # Rows were just inserted, so these summaries are still as before
+        captured = cohort_cube.capture(db, [c.enrollment_id for c in changes])
+        summary_maintainer.apply(db, changes)
+        daily_rollup.apply(db, changes)
+        cohort_cube.apply(db, captured)
+        if written:
+            student_of = dict(db.query(
+                CourseEnrollment.enrollment_id, CourseEnrollment.student_id
+            ).filter(CourseEnrollment.course_id == course_id).all())
+            written_students = [student_of[enrollment_id] for enrollment_id, _ in written]
+            distribution_service.invalidate(db, [course_id])
+            student_dashboard_cache.invalidate(db, written_students)
+            admin_snapshot.note_writes(db, len(written))
+            entity_versions.bump(db, COURSE, [course_id])
+            entity_versions.bump(db, STUDENT, written_students)
+            live_feed.publish_marking(
+                db, course_id, class_date, [(student_of[enrollment_id], status) for enrollment_id, status in written]
+            )
         db.commit()
-        return {"message": "Attendance marked successfully"}
+        return written
+
+    @staticmethod
+    def clear_enrollment_attendance(db: Session, enrollment: CourseEnrollment):
+        """
+        Deletes an enrollment's attendance records, summary and shortage
+        reports ahead of the enrollment itself. Records and summary go while
+        the course and student can still be resolved, so the daily rollup and
+        the cohort cube drop their counts; shortage reports would otherwise
+        block the enrollment delete on Postgres. The caller commits.
+        """
+        records = db.query(AttendanceRecord.class_date, AttendanceRecord.status).filter(
+            AttendanceRecord.enrollment_id == enrollment.enrollment_id
+        ).all()
+        if records:
+            db.query(AttendanceRecord).filter(
+                AttendanceRecord.enrollment_id == enrollment.enrollment_id
+            ).delete(synchronize_session=False)
+            daily_rollup.apply(db, [
+                RecordChange(enrollment.enrollment_id, status, None, enrollment.course_id, class_date)
+                for class_date, status in records
+            ])
+        captured = cohort_cube.capture(db, [enrollment.enrollment_id])
+        db.query(AttendanceSummary).filter(
+            AttendanceSummary.enrollment_id == enrollment.enrollment_id
+        ).delete(synchronize_session=False)
+        cohort_cube.apply(db, captured)
+        distribution_service.invalidate(db, [enrollment.course_id])
+        db.query(ShortageReport).filter(
+            ShortageReport.enrollment_id == enrollment.enrollment_id
+        ).delete(synchronize_session=False)
 
 attendance_service = AttendanceService()
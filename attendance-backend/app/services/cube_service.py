@@ -0,0 +1,271 @@
+from sqlalchemy import case, event, func, insert, inspect, select, text
+from sqlalchemy.orm import Session
+from app.database import chunks, dialect_insert
+from app.models.attendance import AttendanceCohortCube, AttendanceSummary
+from app.models.course import Course, CourseEnrollment
+from app.models.student import Student
+from app.services.summary_service import summary_maintainer
+
+# Query name -> cube column, in key order
+CUBE_DIMENSIONS = {
+    "student_department": AttendanceCohortCube.student_department,
+    "semester": AttendanceCohortCube.semester,
+    "batch_year": AttendanceCohortCube.batch_year,
+    "course_department": AttendanceCohortCube.course_department,
+    "academic_year": AttendanceCohortCube.academic_year,
+}
+
+CUBE_MEASURES = [
+    "enrollments",
+    "total_classes",
+    "classes_attended",
+    "classes_late",
+    "classes_absent",
+    "classes_excused",
+    "percentage_sum",
+    "shortage_count",
+]
+
+# Attributes of each dimension table that key a cube cell
+MOVING_ATTRIBUTES = {
+    Student: ("department", "semester", "batch_year"),
+    Course: ("department",),
+}
+
+
+def _contribution(summary):
+    """What one attendance_summary row adds to its cube cell."""
+    held = (summary.total_classes or 0) > 0
+    return {
+        "enrollments": 1 if held else 0,
+        "total_classes": summary.total_classes or 0,
+        "classes_attended": summary.classes_attended or 0,
+        "classes_late": summary.classes_late or 0,
+        "classes_absent": summary.classes_absent or 0,
+        "classes_excused": summary.classes_excused or 0,
+        "percentage_sum": (summary.attendance_percentage or 0) if held else 0,
+        "shortage_count": 1 if summary.shortage_status else 0,
+    }
+
+
+class CohortCubeMaintainer:
+    """
+    Keeps attendance_cohort_cube (attendance_summary totals per student
+    department, semester, batch year, course department and academic year)
+    in step with attendance_summary, so department/semester/batch analytics
+    roll up a few hundred cube rows instead of every summary.
+
+    On Postgres the statement-level trigger from app/schema_patches.py does
+    this; elsewhere the marking paths bracket the summary update with
+    capture() and apply(). Which one is active follows SUMMARY_MAINTENANCE.
+    When a student's department, semester or batch year or a course's
+    department changes, the enrollments' contributions move from the old
+    cell to the new one (the listeners below, or the same trigger on
+    students and courses). Bulk UPDATEs that bypass the ORM on SQLite still
+    need backfill_cohort_cube.py.
+    """
+
+    @staticmethod
+    def enabled(db: Session) -> bool:
+        return summary_maintainer.enabled(db)
+
+    @staticmethod
+    def _contributions(db, enrollment_ids):
+        # Takes a Session or, from the mapper listeners, the flush's Connection
+        contributions = {}
+        for chunk in chunks(enrollment_ids):
+            # Plain columns rather than entities, so the second read is not
+            # answered from the identity map after a Core upsert
+            rows = db.execute(select(
+                AttendanceSummary.enrollment_id,
+                AttendanceSummary.total_classes,
+                AttendanceSummary.classes_attended,
+                AttendanceSummary.classes_late,
+                AttendanceSummary.classes_absent,
+                AttendanceSummary.classes_excused,
+                AttendanceSummary.attendance_percentage,
+                AttendanceSummary.shortage_status,
+                Student.department, Student.semester, Student.batch_year,
+                Course.department, CourseEnrollment.academic_year,
+            ).select_from(AttendanceSummary).join(
+                CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
+            ).join(
+                Student, CourseEnrollment.student_id == Student.student_id
+            ).join(
+                Course, CourseEnrollment.course_id == Course.course_id
+            ).where(AttendanceSummary.enrollment_id.in_(chunk))).all()
+            contributions.update((row[0], (tuple(row[8:]), _contribution(row))) for row in rows)
+        return contributions
+
+    def capture(self, db: Session, enrollment_ids):
+        """
+        Cube contributions of `enrollment_ids` before a summary write, for
+        apply(). Returns None when the trigger maintains the cube.
+        """
+        if not self.enabled(db):
+            return None
+        enrollment_ids = list(set(enrollment_ids))
+        if not enrollment_ids:
+            return {}
+        return {"before": self._contributions(db, enrollment_ids), "enrollment_ids": enrollment_ids}
+
+    def apply(self, db, captured):
+        """
+        Adds the difference between the captured contributions and the
+        current ones to the cube, inside the caller's transaction.
+        """
+        if not captured:
+            return
+        after = self._contributions(db, captured["enrollment_ids"])
+
+        deltas = {}
+        for contributions, sign in ((after, 1), (captured["before"], -1)):
+            for cell, contribution in contributions.values():
+                d = deltas.setdefault(cell, dict.fromkeys(CUBE_MEASURES, 0))
+                for measure, value in contribution.items():
+                    d[measure] += sign * value
+        self._add(db, {cell: d for cell, d in deltas.items() if any(d.values())})
+
+    def apply_shortage(self, db: Session, changed):
+        """Moves shortage_count for (enrollment_id, shortage_status) pairs just flipped."""
+        if not self.enabled(db) or not changed:
+            return
+        status = dict(changed)
+        deltas = {}
+        for enrollment_id, (cell, _) in self._contributions(db, list(status)).items():
+            d = deltas.setdefault(cell, dict.fromkeys(CUBE_MEASURES, 0))
+            d["shortage_count"] += 1 if status[enrollment_id] else -1
+        self._add(db, {cell: d for cell, d in deltas.items() if any(d.values())})
+
+    @staticmethod
+    def _add(db, deltas):
+        if not deltas:
+            return
+        stmt = dialect_insert(db, AttendanceCohortCube)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(CUBE_DIMENSIONS.values()),
+            set_={
+                **{
+                    measure: getattr(AttendanceCohortCube, measure) + getattr(excluded, measure)
+                    for measure in CUBE_MEASURES
+                },
+                "last_updated": func.now(),
+            },
+        )
+        db.execute(stmt, [
+            {**dict(zip(CUBE_DIMENSIONS, cell)), **d}
+            for cell, d in deltas.items()
+        ])
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        Recompute the whole cube from attendance_summary (backfill, repair or
+        after dimension changes). Writers are blocked on Postgres until the
+        caller commits.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE attendance_summary IN SHARE MODE"))
+        db.query(AttendanceCohortCube).delete(synchronize_session=False)
+
+        held = AttendanceSummary.total_classes > 0
+        cells = db.query(
+            Student.department, Student.semester, Student.batch_year,
+            Course.department, CourseEnrollment.academic_year,
+            func.sum(case((held, 1), else_=0)),
+            func.sum(func.coalesce(AttendanceSummary.total_classes, 0)),
+            func.sum(func.coalesce(AttendanceSummary.classes_attended, 0)),
+            func.sum(func.coalesce(AttendanceSummary.classes_late, 0)),
+            func.sum(func.coalesce(AttendanceSummary.classes_absent, 0)),
+            func.sum(func.coalesce(AttendanceSummary.classes_excused, 0)),
+            func.sum(case((held, func.coalesce(AttendanceSummary.attendance_percentage, 0)), else_=0)),
+            func.sum(case((AttendanceSummary.shortage_status == True, 1), else_=0)),
+        ).select_from(AttendanceSummary).join(
+            CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
+        ).join(
+            Student, CourseEnrollment.student_id == Student.student_id
+        ).join(
+            Course, CourseEnrollment.course_id == Course.course_id
+        ).group_by(
+            Student.department, Student.semester, Student.batch_year,
+            Course.department, CourseEnrollment.academic_year
+        )
+
+        result = db.execute(insert(AttendanceCohortCube).from_select(
+            [*CUBE_DIMENSIONS, *CUBE_MEASURES], cells.statement
+        ))
+        return result.rowcount
+
+    @staticmethod
+    def query(db: Session, group_by=(), filters=None):
+        """
+        Rolls the cube up to `group_by` (any subset of CUBE_DIMENSIONS; none
+        gives the institution total), restricted by `filters`
+        ({dimension: value}).
+        """
+        group_columns = [CUBE_DIMENSIONS[name] for name in group_by]
+        query = db.query(
+            *group_columns,
+            *[func.sum(getattr(AttendanceCohortCube, measure)).label(measure) for measure in CUBE_MEASURES],
+        )
+        for name, value in (filters or {}).items():
+            query = query.filter(CUBE_DIMENSIONS[name] == value)
+        if group_columns:
+            query = query.group_by(*group_columns).order_by(*group_columns)
+
+        cells = []
+        for row in query.all():
+            totals = {measure: getattr(row, measure) or 0 for measure in CUBE_MEASURES}
+            enrollments = int(totals["enrollments"])
+            if not enrollments and group_columns:
+                continue
+            total = int(totals["total_classes"])
+            attended = int(totals["classes_attended"]) + int(totals["classes_late"])
+            cells.append({
+                **{name: row[i] for i, name in enumerate(group_by)},
+                "enrollments": enrollments,
+                "total_classes": total,
+                "classes_attended": int(totals["classes_attended"]),
+                "classes_late": int(totals["classes_late"]),
+                "classes_absent": int(totals["classes_absent"]),
+                "classes_excused": int(totals["classes_excused"]),
+                "shortage_count": int(totals["shortage_count"]),
+                "attendance_rate": round(attended * 100 / total, 2) if total else 0.0,
+                "average_percentage": round(float(totals["percentage_sum"]) / enrollments, 2) if enrollments else 0.0,
+            })
+        return cells
+
+cohort_cube = CohortCubeMaintainer()
+
+
+# Dimension changes made through the ORM (e.g. PUT /api/faculty/courses/{id})
+def _moving(target):
+    state = inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in MOVING_ATTRIBUTES[type(target)])
+
+
+def _dimensions_changing(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None or not _moving(target) or not cohort_cube.enabled(session):
+        return
+    # The row still has the old values: capture the cells being left
+    column = CourseEnrollment.student_id if isinstance(target, Student) else CourseEnrollment.course_id
+    key = target.student_id if isinstance(target, Student) else target.course_id
+    enrollment_ids = list(connection.execute(
+        select(CourseEnrollment.enrollment_id).where(column == key)
+    ).scalars())
+    session.info.setdefault("cohort_cube_moves", {})[id(target)] = {
+        "before": cohort_cube._contributions(connection, enrollment_ids),
+        "enrollment_ids": enrollment_ids,
+    }
+
+
+def _dimensions_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    captured = session.info.get("cohort_cube_moves", {}).pop(id(target), None) if session is not None else None
+    cohort_cube.apply(connection, captured)
+
+for _model in MOVING_ATTRIBUTES:
+    event.listen(_model, "before_update", _dimensions_changing)
+    event.listen(_model, "after_update", _dimensions_changed)
@@ -0,0 +1,262 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import chunks
+from app.models.course import Course, CourseEnrollment
+from app.models.student import Student
+
+settings = get_settings()
+
+# Views cached per student (/api/dashboard/student, /api/students/dashboard)
+DASHBOARD_VIEWS = ("dashboard", "students")
+
+
+class MemoryCacheBackend:
+    """In-process LRU with a per-entry expiry; the default backend."""
+
+    # Safe to call from the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Backend shared by every worker, so an invalidation in one process is seen
+    by all. Values are stored as JSON under `prefix`; needs the `redis`
+    package.
+    """
+
+    # Network round trips: the async routes call it from the threadpool
+    blocking = True
+
+    def __init__(self, url: str, prefix: str = "dashboard:"):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self._prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl_seconds: int):
+        self._client.set(self._prefix + key, json.dumps(value), ex=ttl_seconds)
+
+    def delete(self, keys):
+        keys = [self._prefix + key for key in keys]
+        if keys:
+            self._client.delete(*keys)
+
+    def clear(self):
+        keys = list(self._client.scan_iter(match=self._prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(match=self._prefix + "*"))
+
+
+class StudentDashboardCache:
+    """
+    Caches the student dashboard responses per student and view.
+
+    Write paths stage the students whose enrollments they touch (marking,
+    enrollment, unenrollment, shortage status, course and profile edits);
+    their entries are dropped once that transaction commits, and never on
+    rollback. Enrollment, student and course changes made through the ORM
+    are picked up by the listeners below; the set-based marking paths call
+    invalidate() / invalidate_enrollments() themselves. The TTL bounds
+    staleness for writes this process does not see (other workers with the
+    in-process backend, direct SQL).
+    """
+
+    def __init__(self, backend, ttl_seconds: int, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._ttl = ttl_seconds
+        # Bumped per student on invalidation, so a response built from data
+        # read before a commit is not stored after it
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(view: str, student_id) -> str:
+        return f"{view}:{student_id}"
+
+    def get_or_build(self, view: str, student_id, build):
+        """
+        The cached `view` for `student_id`, else build() (a JSON-compatible
+        copy of which is stored). Callers must not mutate the result.
+        """
+        if not self.enabled:
+            return build()
+        key = self._key(view, student_id)
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        generation = self._generations.get(str(student_id), 0)
+        value = jsonable_encoder(build())
+        self._store(key, str(student_id), generation, value)
+        return value
+
+    async def get_or_build_async(self, view: str, student_id, build):
+        """
+        get_or_build() for the async routes: build() returns an awaitable
+        (e.g. AsyncSession.run_sync), and a blocking backend is called from
+        the threadpool so a Redis round trip never stalls the event loop.
+        """
+        if not self.enabled:
+            return await build()
+        key = self._key(view, student_id)
+        value = await self._call(self.backend.get, key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        generation = self._generations.get(str(student_id), 0)
+        value = jsonable_encoder(await build())
+        await self._call(self._store, key, str(student_id), generation, value)
+        return value
+
+    async def _call(self, method, *args):
+        if self.backend.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    def _store(self, key: str, student_key: str, generation: int, value):
+        with self._lock:
+            if self._generations.get(student_key, 0) == generation:
+                self.backend.set(key, value, self._ttl)
+
+    def invalidate(self, db: Session, student_ids):
+        """Drop the students' dashboards once the caller's transaction commits."""
+        db.info.setdefault("dashboard_students", set()).update(str(s) for s in student_ids)
+
+    def invalidate_enrollments(self, db: Session, enrollment_ids):
+        """invalidate() for the students owning `enrollment_ids`."""
+        for chunk in chunks(list(enrollment_ids)):
+            self.invalidate(db, [
+                student_id for (student_id,) in db.query(CourseEnrollment.student_id).filter(
+                    CourseEnrollment.enrollment_id.in_(chunk)
+                ).all()
+            ])
+
+    def forget(self, student_keys):
+        with self._lock:
+            for key in student_keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self.backend.delete([self._key(view, key) for key in student_keys for view in DASHBOARD_VIEWS])
+            self.invalidations += len(student_keys)
+
+    def clear(self):
+        with self._lock:
+            for key in self._generations:
+                self._generations[key] += 1
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+    def _commit(self, session):
+        students = session.info.pop("dashboard_students", None)
+        if students:
+            self.forget(students)
+
+    def _discard(self, session):
+        session.info.pop("dashboard_students", None)
+
+def _backend():
+    if settings.DASHBOARD_CACHE_URL:
+        return RedisCacheBackend(settings.DASHBOARD_CACHE_URL)
+    return MemoryCacheBackend(settings.DASHBOARD_CACHE_MAX_ENTRIES)
+
+student_dashboard_cache = StudentDashboardCache(
+    _backend(), settings.DASHBOARD_CACHE_TTL_SECONDS, settings.DASHBOARD_CACHE_ENABLED
+)
+event.listen(Session, "after_commit", student_dashboard_cache._commit)
+event.listen(Session, "after_rollback", student_dashboard_cache._discard)
+
+
+# ORM writes touching a student's dashboard
+def _stage(target, student_ids):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("dashboard_students", set()).update(str(s) for s in student_ids if s is not None)
+
+
+def _enrollment_changed(mapper, connection, target):
+    _stage(target, [target.student_id])
+
+
+def _student_changed(mapper, connection, target):
+    _stage(target, [target.student_id])
+
+
+def _course_changed(mapper, connection, target):
+    # Before delete: the enrollments are still there to resolve
+    _stage(target, connection.execute(
+        select(CourseEnrollment.student_id).where(CourseEnrollment.course_id == target.course_id)
+    ).scalars().all())
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(CourseEnrollment, _event, _enrollment_changed)
+for _event in ("after_update", "after_delete"):
+    event.listen(Student, _event, _student_changed)
+for _event in ("after_update", "before_delete"):
+    event.listen(Course, _event, _course_changed)
@@ -0,0 +1,246 @@
+import threading
+import time
+from collections import namedtuple
+from uuid import UUID
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import text_id
+from app.models.attendance import AttendanceSummary
+from app.models.course import Course, CourseEnrollment
+from app.models.student import Student
+
+settings = get_settings()
+
+QUARTILES = (25, 50, 75)
+
+# One course's attendance percentages in ascending order, with the students
+# they belong to and each one's percentile rank
+CourseDistribution = namedtuple(
+    "CourseDistribution", ["percentages", "student_keys", "roll_numbers", "percentile_ranks", "loaded_at"]
+)
+
+
+def group_statistics(groups, percentages):
+    """
+    Sorts parallel arrays of group index and percentage by (group, percentage)
+    and returns (order, starts, counts, percentile_ranks): `order` sorts the
+    input, `starts`/`counts` delimit each group in sorted order and
+    percentile_ranks (in sorted order) is the mid-rank percentile, i.e. the
+    share of the group strictly below plus half of the ties.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    percentages = np.asarray(percentages, dtype=np.float64)
+    order = np.lexsort((percentages, groups))
+    g, x = groups[order], percentages[order]
+    size = len(x)
+
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]]) if size else np.zeros(0, dtype=np.int64)
+    counts = np.diff(np.r_[starts, size])
+
+    # Runs of equal values within a group
+    run_starts = np.flatnonzero(np.r_[True, (g[1:] != g[:-1]) | (x[1:] != x[:-1])]) if size else starts
+    run_lengths = np.diff(np.r_[run_starts, size])
+    run_first = np.repeat(run_starts, run_lengths)
+    tied = np.repeat(run_lengths, run_lengths)
+    group_start = np.repeat(starts, counts)
+    group_size = np.repeat(counts, counts)
+    ranks = (run_first - group_start + 0.5 * tied) / np.maximum(group_size, 1) * 100.0
+    return order, starts, counts, ranks
+
+
+def quantile(sorted_values, q):
+    """Linear-interpolation quantile (numpy's default) of an ascending array."""
+    position = (len(sorted_values) - 1) * q / 100.0
+    low = int(np.floor(position))
+    high = min(low + 1, len(sorted_values) - 1)
+    return float(sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low))
+
+
+def histogram(sorted_values, bin_width: int):
+    """Counts per [from, to) bin over 0-100; 100% falls in the last bin."""
+    edges = np.arange(0, 100 + bin_width, bin_width, dtype=np.float64)
+    edges[-1] = max(edges[-1], 100.0)
+    counts = np.bincount(
+        np.clip(np.searchsorted(edges, sorted_values, side="right") - 1, 0, len(edges) - 2),
+        minlength=len(edges) - 1,
+    )
+    return [
+        {"from": float(edges[i]), "to": float(min(edges[i + 1], 100.0)), "count": int(counts[i])}
+        for i in range(len(edges) - 1)
+    ]
+
+
+class DistributionService:
+    """
+    Per-course distribution of attendance_percentage (histogram, quartiles,
+    each student's percentile rank) over enrollments with at least one class
+    held.
+
+    Computed courses are kept in memory until a transaction that marks
+    attendance for the course commits (the write paths call invalidate()),
+    or DISTRIBUTION_CACHE_TTL_SECONDS pass, which covers writes made by other
+    workers. Missing courses are loaded together in one query over
+    attendance_summary, so the all-courses view costs one pass when cold.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self._ttl = ttl_seconds
+        self._entries = {}
+        # Bumped per course on invalidation, so a load that raced with a
+        # commit is not stored
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, db: Session, course_ids):
+        """Drop `course_ids` once the caller's transaction commits."""
+        db.info.setdefault("distribution_courses", set()).update(str(c) for c in course_ids)
+
+    def forget(self, course_keys=None):
+        """Drop cached courses now (all when `course_keys` is None)."""
+        with self._lock:
+            keys = list(self._entries) if course_keys is None else course_keys
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _commit(self, session):
+        courses = session.info.pop("distribution_courses", None)
+        if courses:
+            self.forget(courses)
+
+    def _discard(self, session):
+        session.info.pop("distribution_courses", None)
+
+    def _cached(self, course_keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in course_keys:
+                entry = self._entries.get(key)
+                if entry is not None and now - entry.loaded_at < self._ttl:
+                    found[key] = entry
+        return found
+
+    def _load(self, db: Session, course_keys, scan_all: bool = False):
+        """
+        One pass over attendance_summary for `course_keys`; with scan_all the
+        whole table is read instead of filtering on a long IN list.
+        """
+        with self._lock:
+            generations = dict(self._generations)
+
+        query = db.query(
+            text_id(CourseEnrollment.course_id),
+            text_id(CourseEnrollment.student_id),
+            Student.roll_number,
+            AttendanceSummary.attendance_percentage,
+        ).join(
+            CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
+        ).join(
+            Student, CourseEnrollment.student_id == Student.student_id
+        ).filter(AttendanceSummary.total_classes > 0)
+        if not scan_all:
+            query = query.filter(CourseEnrollment.course_id.in_([UUID(k) for k in course_keys]))
+        rows = db.connection().execute(query.statement).all()
+
+        raw_courses, student_keys, roll_numbers, percentages = (
+            zip(*rows) if rows else ([] for _ in range(4))
+        )
+        # Course ids come back as 32 hex digits on SQLite
+        course_index, groups = np.unique(np.array(raw_courses, dtype=str), return_inverse=True)
+        percentages = np.nan_to_num(np.array(percentages, dtype=np.float64))
+        order, starts, counts, ranks = group_statistics(groups, percentages)
+        student_keys = np.array(student_keys, dtype=str)[order]
+        roll_numbers = np.array(roll_numbers, dtype=object)[order]
+        percentages = percentages[order]
+
+        now = time.monotonic()
+        loaded = {
+            str(UUID(raw)): CourseDistribution(
+                percentages[start:start + count],
+                student_keys[start:start + count],
+                roll_numbers[start:start + count],
+                ranks[start:start + count],
+                now,
+            )
+            for raw, start, count in zip(course_index.tolist(), starts.tolist(), counts.tolist())
+        }
+        empty = CourseDistribution(np.zeros(0), np.zeros(0, dtype=str), np.zeros(0, dtype=object), np.zeros(0), now)
+        for key in course_keys:
+            loaded.setdefault(key, empty)
+
+        with self._lock:
+            for key, entry in loaded.items():
+                if self._generations.get(key, 0) == generations.get(key, 0):
+                    self._entries[key] = entry
+        return loaded
+
+    def distributions(self, db: Session, course_ids=None):
+        """{course key: CourseDistribution} for `course_ids` (every course when None)."""
+        if course_ids is None:
+            course_keys = [str(c) for (c,) in db.query(Course.course_id).all()]
+        else:
+            course_keys = [str(c) for c in course_ids]
+        found = self._cached(course_keys)
+        missing = [key for key in course_keys if key not in found]
+        if missing:
+            # Cold start for most of the institution: one scan beats a huge IN list
+            loaded = self._load(db, missing, scan_all=course_ids is None and len(missing) > len(course_keys) // 2)
+            found.update((key, loaded[key]) for key in missing)
+        return found
+
+    def course_report(self, db: Session, course_ids=None, bin_width: int = 10, include_students: bool = True,
+                      student_id=None):
+        """
+        Statistics per course; with include_students every student's
+        percentage and percentile rank, with student_id only that student's.
+        """
+        found = self.distributions(db, course_ids)
+        details = {
+            str(course_id): (code, name)
+            for course_id, code, name in db.query(Course.course_id, Course.course_code, Course.course_name).filter(
+                Course.course_id.in_([UUID(key) for key in found])
+            ).all()
+        } if found else {}
+        student_hex = UUID(str(student_id)).hex if student_id is not None else None
+
+        courses = []
+        for key, d in found.items():
+            if key not in details:
+                continue
+            values = d.percentages
+            report = {
+                "course_id": key,
+                "course_code": details[key][0],
+                "course_name": details[key][1],
+                "students": len(values),
+                "mean": round(float(values.mean()), 2) if len(values) else None,
+                "min": float(values[0]) if len(values) else None,
+                "max": float(values[-1]) if len(values) else None,
+                "quartiles": {
+                    f"p{q}": round(quantile(values, q), 2) for q in QUARTILES
+                } if len(values) else None,
+                "histogram": histogram(values, bin_width),
+            }
+            if include_students or student_hex is not None:
+                report["ranks"] = [
+                    {
+                        "student_id": str(UUID(student_key)),
+                        "roll_number": roll_number,
+                        "percentage": float(percentage),
+                        "percentile_rank": round(float(rank), 2),
+                    }
+                    for student_key, roll_number, percentage, rank in zip(
+                        d.student_keys.tolist(), d.roll_numbers.tolist(), values.tolist(), d.percentile_ranks.tolist()
+                    )
+                    if student_hex is None or UUID(student_key).hex == student_hex
+                ]
+            courses.append(report)
+        courses.sort(key=lambda c: c["course_code"])
+        return courses
+
+distribution_service = DistributionService(settings.DISTRIBUTION_CACHE_TTL_SECONDS)
+event.listen(Session, "after_commit", distribution_service._commit)
+event.listen(Session, "after_rollback", distribution_service._discard)
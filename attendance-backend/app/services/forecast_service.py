@@ -0,0 +1,223 @@
+import datetime
+import numpy as np
+from uuid import UUID
+from sqlalchemy import case, insert
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import text_id
+from app.models.attendance import AttendanceRecord, ShortageForecast
+from app.models.course import Course, CourseEnrollment
+from app.models.student import Student
+from app.services.threshold_service import DEFAULT_RULE, threshold_resolver
+from app.services.version_service import FORECASTS, entity_versions
+
+settings = get_settings()
+
+# Records per fetch while streaming attendance_records
+STREAM_CHUNK = 200_000
+# Sentinel for "does not cross within the horizon"
+NEVER = -1
+EPSILON = 1e-9
+
+
+def window_stats(keys, attended, window: int):
+    """
+    Per-enrollment statistics for one chunk of records sorted by enrollment
+    and date, holding whole enrollments only. `keys` are enrollment keys and
+    `attended` 1 for present/late, 0 otherwise.
+
+    Returns (group_keys, held, attended_total, recent_n, recent_rate, slope):
+    over the last `window` sessions (recent_n of them), the attendance rate
+    and the least-squares slope of attended-vs-session, per session.
+    """
+    size = len(keys)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    held = np.diff(np.r_[starts, size])
+    group = np.repeat(np.arange(len(starts)), held)
+    x = np.asarray(attended, dtype=np.float64)
+
+    attended_total = np.add.reduceat(x, starts) if size else np.zeros(0)
+    from_end = np.repeat(starts + held, held) - np.arange(size) - 1
+    recent_n = np.minimum(held, window)
+    in_window = from_end < window
+    # Session index within the window, 0 = oldest
+    t = (recent_n[group] - 1 - from_end)[in_window].astype(np.float64)
+    g = group[in_window]
+    xw = x[in_window]
+
+    n_groups = len(starts)
+    sum_x = np.bincount(g, weights=xw, minlength=n_groups)
+    sum_t = np.bincount(g, weights=t, minlength=n_groups)
+    sum_tx = np.bincount(g, weights=t * xw, minlength=n_groups)
+    sum_tt = np.bincount(g, weights=t * t, minlength=n_groups)
+
+    rate = sum_x / recent_n
+    denominator = recent_n * sum_tt - sum_t ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(denominator > 0, (recent_n * sum_tx - sum_t * sum_x) / denominator, 0.0)
+    return keys[starts], held, attended_total, recent_n, rate, slope
+
+
+def forecast(held, attended, recent_n, rate, slope, warning, horizon: int):
+    """
+    Extends each enrollment's recent trend line over the next `horizon`
+    sessions (attendance probability clipped to [0, 1]) and finds the first
+    session at which the running percentage falls below `warning`.
+
+    Returns current_percentage, projected_percentage (after `horizon`) and
+    sessions_to_warning (0 if already below, NEVER if not within the horizon).
+    """
+    held = np.asarray(held, dtype=np.float64)
+    attended = np.asarray(attended, dtype=np.float64)
+    warning = np.asarray(warning, dtype=np.float64)
+    steps = np.arange(1, horizon + 1, dtype=np.float64)
+
+    # Trend line evaluated at the sessions after the window
+    future = np.clip(rate[:, None] + slope[:, None] * ((recent_n[:, None] - 1) / 2 + steps), 0.0, 1.0)
+    percentage = (attended[:, None] + np.cumsum(future, axis=1)) / (held[:, None] + steps) * 100.0
+    current = attended / held * 100.0
+
+    crosses = percentage < warning[:, None] - EPSILON
+    first = np.where(crosses.any(axis=1), crosses.argmax(axis=1) + 1, NEVER)
+    sessions = np.where(current < warning - EPSILON, 0, first)
+    projected = percentage[:, -1] if horizon else current
+    return current, projected, sessions
+
+
+def whole_enrollments(chunks):
+    """
+    Re-cuts (keys, attended) chunks of a stream sorted by enrollment so no
+    enrollment is split across two of them: each chunk's last enrollment
+    is held back and prepended to the next.
+    """
+    carry_keys, carry_x = np.array([], dtype=str), np.array([], dtype=np.int8)
+    for keys, attended in chunks:
+        keys = np.concatenate([carry_keys, keys])
+        attended = np.concatenate([carry_x, attended])
+        cut = np.flatnonzero(keys != keys[-1])
+        cut = cut[-1] + 1 if len(cut) else 0
+        carry_keys, carry_x = keys[cut:], attended[cut:]
+        if cut:
+            yield keys[:cut], attended[:cut]
+    if len(carry_keys):
+        yield carry_keys, carry_x
+
+
+class ShortageForecaster:
+    """
+    Nightly early-warning pass: streams attendance_records once, ordered by
+    enrollment and date, computes recent-window rates and trend slopes with
+    NumPy a chunk at a time, and stores in shortage_forecasts the enrollments
+    still at or above their minimum that are projected to fall below
+    warning_percentage within SHORTAGE_FORECAST_HORIZON sessions.
+    Enrollments already below the minimum are left to the shortage sweep.
+    """
+
+    @staticmethod
+    def _thresholds(db: Session):
+        """(warning, minimum) per enrollment key, from the cached threshold rules."""
+        resolve = threshold_resolver.lookup(db)
+        rules = {}
+        for key, course_id, department in db.query(
+            text_id(CourseEnrollment.enrollment_id), CourseEnrollment.course_id, Student.department
+        ).join(Student, CourseEnrollment.student_id == Student.student_id).all():
+            rule = resolve(course_id, department)
+            rules[key] = (float(rule.warning), float(rule.minimum))
+        return rules
+
+    @staticmethod
+    def stream(db: Session, chunk: int = STREAM_CHUNK):
+        """Yields (keys, attended) arrays of whole enrollments, in order."""
+        query = db.query(
+            text_id(AttendanceRecord.enrollment_id),
+            case((AttendanceRecord.status.in_(["present", "late"]), 1), else_=0),
+        ).order_by(AttendanceRecord.enrollment_id, AttendanceRecord.class_date)
+        # Server-side cursor on Postgres fetching `chunk` rows per round trip,
+        # so memory stays bounded by the chunk
+        result = db.connection().execute(query.statement.execution_options(yield_per=chunk))
+
+        return whole_enrollments(
+            (np.array(keys), np.array(attended, dtype=np.int8))
+            for keys, attended in (zip(*rows) for rows in result.partitions())
+        )
+
+    def run(self, db: Session, today: datetime.date = None, window: int = None, horizon: int = None) -> dict:
+        """Recompute shortage_forecasts in the caller's transaction; the caller commits."""
+        today = today or datetime.date.today()
+        window = window or settings.SHORTAGE_FORECAST_WINDOW
+        horizon = horizon or settings.SHORTAGE_FORECAST_HORIZON
+        rules = self._thresholds(db)
+        default = (float(DEFAULT_RULE.warning), float(DEFAULT_RULE.minimum))
+
+        scanned, flagged = 0, []
+        for keys, attended in self.stream(db):
+            group_keys, held, attended_total, recent_n, rate, slope = window_stats(keys, attended, window)
+            scanned += len(group_keys)
+            warning, minimum = np.array(
+                [rules.get(key, default) for key in group_keys], dtype=np.float64
+            ).reshape(-1, 2).T
+            current, projected, sessions = forecast(held, attended_total, recent_n, rate, slope, warning, horizon)
+            hit = np.flatnonzero((sessions != NEVER) & (current >= minimum - EPSILON))
+            flagged.extend(
+                {
+                    "enrollment_id": UUID(group_keys[i]),
+                    "forecast_date": today,
+                    "classes_held": int(held[i]),
+                    "current_percentage": round(float(current[i]), 2),
+                    "recent_rate": round(float(rate[i]) * 100, 2),
+                    "trend_slope": round(float(slope[i]) * 100, 2),
+                    "projected_percentage": round(float(projected[i]), 2),
+                    "warning_percentage": float(warning[i]),
+                    "sessions_to_warning": int(sessions[i]),
+                }
+                for i in hit.tolist()
+            )
+
+        db.query(ShortageForecast).delete(synchronize_session=False)
+        if flagged:
+            db.execute(insert(ShortageForecast), flagged)
+        entity_versions.stage(db, [FORECASTS])
+        return {"forecast_date": today.isoformat(), "enrollments": scanned, "flagged": len(flagged)}
+
+    @staticmethod
+    def forecasts(db: Session, course_id=None, faculty_id=None, limit: int = None):
+        """Stored forecasts, soonest crossing first."""
+        query = db.query(
+            ShortageForecast, CourseEnrollment.student_id, Student.roll_number,
+            Course.course_id, Course.course_code, Course.course_name
+        ).join(
+            CourseEnrollment, ShortageForecast.enrollment_id == CourseEnrollment.enrollment_id
+        ).join(
+            Student, CourseEnrollment.student_id == Student.student_id
+        ).join(
+            Course, CourseEnrollment.course_id == Course.course_id
+        )
+        if course_id is not None:
+            query = query.filter(CourseEnrollment.course_id == course_id)
+        if faculty_id is not None:
+            query = query.filter(CourseEnrollment.faculty_id == faculty_id)
+        query = query.order_by(ShortageForecast.sessions_to_warning, ShortageForecast.projected_percentage)
+        if limit is not None:
+            query = query.limit(limit)
+
+        return [
+            {
+                "enrollment_id": str(f.enrollment_id),
+                "student_id": str(student_id),
+                "roll_number": roll_number,
+                "course_id": str(c_id),
+                "course_code": code,
+                "course_name": name,
+                "forecast_date": f.forecast_date.isoformat(),
+                "classes_held": f.classes_held,
+                "current_percentage": float(f.current_percentage),
+                "recent_rate": float(f.recent_rate),
+                "trend_slope": float(f.trend_slope),
+                "projected_percentage": float(f.projected_percentage),
+                "warning_percentage": float(f.warning_percentage),
+                "sessions_to_warning": f.sessions_to_warning,
+            }
+            for f, student_id, roll_number, c_id, code, name in query.all()
+        ]
+
+shortage_forecaster = ShortageForecaster()
@@ -0,0 +1,216 @@
+import csv
+import io
+from datetime import date
+from uuid import UUID, uuid4
+from sqlalchemy import Uuid, bindparam, text, tuple_
+from sqlalchemy.orm import Session
+from app.database import clock_now, dialect_insert, lock_for_write
+from app.models.attendance import AttendanceRecord
+from app.models.course import Course, CourseEnrollment
+from app.models.student import Student
+from app.services.admin_snapshot import admin_snapshot
+from app.services.cube_service import cohort_cube
+from app.services.dashboard_cache import student_dashboard_cache
+from app.services.distribution_service import distribution_service
+from app.services.live_feed import live_feed
+from app.services.rollup_service import daily_rollup
+from app.services.summary_service import RecordChange, summary_maintainer
+from app.services.version_service import COURSE, STUDENT, entity_versions
+
+IMPORT_COLUMNS = ["roll_number", "course_code", "date", "status"]
+VALID_STATUSES = {"present", "absent", "late", "excused"}
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class AttendanceImporter:
+    """
+    Streams an attendance CSV (roll_number, course_code, date, status) into
+    attendance_records without holding the file in memory.
+
+    Resolution follows bulk_attendance_update() in
+    database_setup/03_procedures_views.sql: a row is matched to the
+    enrollment of that roll number in that course, and an existing record for
+    the date gets its status and marked_by replaced (remarks are kept).
+    Roll numbers and course codes are resolved through an index built once
+    per import; rows are written and committed in chunks, with COPY into a
+    staging table on Postgres and a batched upsert elsewhere.
+    """
+
+    def __init__(self, db: Session, marked_by: UUID = None, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None):
+        self.db = db
+        self.marked_by = marked_by
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = {"processed": 0, "written": 0, "rejected": 0, "chunks": 0}
+        self._index = None
+        self._course_of = None
+        self._student_of = None
+
+    def _build_index(self):
+        # (course_code, roll_number) -> enrollment_id; latest academic year wins
+        rows = self.db.query(
+            Course.course_code, Student.roll_number, CourseEnrollment.enrollment_id,
+            CourseEnrollment.course_id, CourseEnrollment.student_id
+        ).join(
+            Course, CourseEnrollment.course_id == Course.course_id
+        ).join(
+            Student, CourseEnrollment.student_id == Student.student_id
+        ).order_by(CourseEnrollment.academic_year).all()
+        self._course_of = {enrollment_id: course_id for _, _, enrollment_id, course_id, _ in rows}
+        self._student_of = {enrollment_id: student_id for _, _, enrollment_id, _, student_id in rows}
+        return {(code, roll): enrollment_id for code, roll, enrollment_id, _, _ in rows}
+
+    def _resolve(self, row):
+        """Returns ((enrollment_id, class_date), status) or a rejection reason."""
+        missing = [c for c in IMPORT_COLUMNS if not (row.get(c) or "").strip()]
+        if missing:
+            return None, f"missing {', '.join(missing)}"
+        status = row["status"].strip().lower()
+        if status not in VALID_STATUSES:
+            return None, f"invalid status '{row['status'].strip()}'"
+        try:
+            class_date = date.fromisoformat(row["date"].strip())
+        except ValueError:
+            return None, f"invalid date '{row['date'].strip()}'"
+        enrollment_id = self._index.get((row["course_code"].strip(), row["roll_number"].strip()))
+        if enrollment_id is None:
+            return None, "student not enrolled in course"
+        return ((enrollment_id, class_date), status), None
+
+    def run(self, stream, rejects=None):
+        """
+        Import from a text stream. Rejected rows are written to `rejects`
+        (a csv.writer-compatible object) with the line number and reason.
+        """
+        reader = csv.DictReader(stream)
+        fields = [f.strip().lower() for f in reader.fieldnames or []]
+        missing = [c for c in IMPORT_COLUMNS if c not in fields]
+        if missing:
+            raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+        reader.fieldnames = fields
+        if rejects is not None:
+            rejects.writerow(["line"] + IMPORT_COLUMNS + ["reason"])
+
+        self._index = self._build_index()
+        chunk = {}
+        for row in reader:
+            self.stats["processed"] += 1
+            resolved, reason = self._resolve(row)
+            if reason:
+                self.stats["rejected"] += 1
+                if rejects is not None:
+                    rejects.writerow([reader.line_num] + [row.get(c) for c in IMPORT_COLUMNS] + [reason])
+                continue
+            key, status = resolved
+            # A repeated (enrollment, date) within a chunk keeps the last row
+            chunk[key] = status
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = {}
+        if chunk:
+            self._flush(chunk)
+        return self.stats
+
+    def _flush(self, chunk):
+        changes = captured = None
+        if summary_maintainer.enabled(self.db):
+            changes = self._changes(chunk)
+            captured = cohort_cube.capture(self.db, [c.enrollment_id for c in changes])
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            self._copy_chunk(chunk)
+        else:
+            self._upsert_chunk(chunk)
+
+        if changes:
+            summary_maintainer.apply(self.db, changes)
+            daily_rollup.apply(self.db, changes)
+            cohort_cube.apply(self.db, captured)
+        distribution_service.invalidate(self.db, {self._course_of[enrollment_id] for enrollment_id, _ in chunk})
+        student_dashboard_cache.invalidate(self.db, {self._student_of[enrollment_id] for enrollment_id, _ in chunk})
+        admin_snapshot.note_writes(self.db, len(chunk))
+        entity_versions.bump(self.db, COURSE, {self._course_of[enrollment_id] for enrollment_id, _ in chunk})
+        entity_versions.bump(self.db, STUDENT, {self._student_of[enrollment_id] for enrollment_id, _ in chunk})
+        sessions = {}
+        for (enrollment_id, class_date), status in chunk.items():
+            sessions.setdefault((self._course_of[enrollment_id], class_date), []).append(
+                (self._student_of[enrollment_id], status)
+            )
+        for (course_id, class_date), marks in sessions.items():
+            live_feed.publish_marking(self.db, course_id, class_date, marks)
+        self.db.commit()
+
+        self.stats["written"] += len(chunk)
+        self.stats["chunks"] += 1
+        if self.progress:
+            self.progress(dict(self.stats))
+
+    def _changes(self, chunk):
+        # Read under the same write lock as mark_attendance(), so the deltas
+        # can't be computed from rows a concurrent submission is replacing
+        lock_for_write(self.db, AttendanceRecord, {
+            f"{self._course_of[enrollment_id]}:{class_date}" for enrollment_id, class_date in chunk
+        })
+        existing = dict(
+            ((enrollment_id, class_date), status)
+            for enrollment_id, class_date, status in self.db.query(
+                AttendanceRecord.enrollment_id, AttendanceRecord.class_date, AttendanceRecord.status
+            ).filter(
+                tuple_(AttendanceRecord.enrollment_id, AttendanceRecord.class_date).in_(list(chunk))
+            ).all()
+        )
+        return [
+            RecordChange(
+                enrollment_id, existing.get((enrollment_id, class_date)), status,
+                self._course_of[enrollment_id], class_date
+            )
+            for (enrollment_id, class_date), status in chunk.items()
+        ]
+
+    def _upsert_chunk(self, chunk):
+        stmt = dialect_insert(self.db, AttendanceRecord).values(marked_at=clock_now(self.db))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AttendanceRecord.enrollment_id, AttendanceRecord.class_date],
+            set_={
+                "status": stmt.excluded.status,
+                "marked_by": stmt.excluded.marked_by,
+                "marked_at": stmt.excluded.marked_at,
+            },
+        )
+        self.db.execute(stmt, [
+            {
+                "attendance_id": uuid4(),
+                "enrollment_id": enrollment_id,
+                "class_date": class_date,
+                "status": status,
+                "marked_by": self.marked_by,
+            }
+            for (enrollment_id, class_date), status in chunk.items()
+        ])
+
+    def _copy_chunk(self, chunk):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for (enrollment_id, class_date), status in chunk.items():
+            writer.writerow([enrollment_id, class_date.isoformat(), status])
+        buffer.seek(0)
+
+        self.db.execute(text(
+            "CREATE TEMP TABLE attendance_import_staging "
+            "(enrollment_id UUID, class_date DATE, status VARCHAR(10)) ON COMMIT DROP"
+        ))
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert("COPY attendance_import_staging FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+        self.db.execute(text("""
+            INSERT INTO attendance_records (attendance_id, enrollment_id, class_date, status, marked_by, marked_at)
+            SELECT gen_random_uuid(), enrollment_id, class_date, status, :marked_by, clock_timestamp()
+            FROM attendance_import_staging
+            ON CONFLICT (enrollment_id, class_date)
+            DO UPDATE SET
+                status = EXCLUDED.status,
+                marked_by = EXCLUDED.marked_by,
+                marked_at = EXCLUDED.marked_at
+        """).bindparams(bindparam("marked_by", type_=Uuid(as_uuid=True))), {"marked_by": self.marked_by})
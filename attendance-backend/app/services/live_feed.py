@@ -0,0 +1,312 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+from uuid import UUID
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models.course import CourseEnrollment
+from app.models.notification import Notification
+
+settings = get_settings()
+
+# Event types
+NOTIFICATION = "notification"
+ATTENDANCE_MARKED = "attendance_marked"
+# Sent instead of the missed events when a resume point is no longer
+# buffered: the client should refetch once and carry on from this event
+RESET = "reset"
+
+# One published event; data is the JSON payload, encoded once for every
+# subscriber
+FeedEvent = namedtuple("FeedEvent", ["seq", "topic", "type", "data"])
+
+
+def _id(value) -> str:
+    # Ids arrive as UUIDs, dashed strings or (SQLite) 32 hex digits
+    return str(value if isinstance(value, UUID) else UUID(str(value)))
+
+
+def user_topic(user_id) -> str:
+    return f"user:{_id(user_id)}"
+
+
+def student_topic(student_id) -> str:
+    return f"student:{_id(student_id)}"
+
+
+def course_topic(course_id) -> str:
+    return f"course:{_id(course_id)}"
+
+
+class Subscription:
+    """
+    One connection's view of the feed. Created, read and closed on the event
+    loop; the feed hands it events from any thread via call_soon_threadsafe,
+    so an idle connection costs a parked coroutine and nothing else.
+    """
+
+    def __init__(self, feed, topics, loop, max_pending: int):
+        self.topics = frozenset(topics)
+        self.last_seq = 0
+        self.closed = False
+        self._feed = feed
+        self._loop = loop
+        self._max_pending = max_pending
+        self._pending = deque()
+        self._overflowed = False
+        self._ready = asyncio.Event()
+
+    def _put(self, events):
+        # On the loop
+        if len(self._pending) + len(events) > self._max_pending:
+            self._overflowed = True
+            self._pending.clear()
+        elif not self._overflowed:
+            self._pending.extend(events)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next(self, timeout: float):
+        """
+        Events not yet delivered, oldest first: [] after `timeout` seconds
+        without any, None once closed.
+        """
+        if not self._pending and not self._overflowed and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        self._ready.clear()
+        if self.closed:
+            return None
+        if self._overflowed:
+            # Fell too far behind: catch up from the buffer instead
+            self._overflowed = False
+            self._pending.clear()
+            events = self._feed.replay(self.topics, self.last_seq)
+        else:
+            events = list(self._pending)
+            self._pending.clear()
+        # Events handed over while replaying can arrive twice
+        events = [e for e in events if e.seq > self.last_seq or e.type == RESET]
+        if events:
+            self.last_seq = max(self.last_seq, events[-1].seq)
+        return events
+
+
+class LiveFeed:
+    """
+    In-process publish/subscribe for the live change feed.
+
+    Write paths stage events on the session with publish() (or
+    publish_marking()); they are numbered and delivered once the transaction
+    commits, and dropped on rollback. New Notification rows are picked up by
+    the listener below. Each event goes to one topic (a user, a student or a
+    course) and every connection subscribes to the topics of its user.
+
+    The last LIVE_FEED_BUFFER_SIZE events are kept so a reconnecting client
+    can resume from its Last-Event-ID. Event ids carry this process's start
+    time, so an id from another worker or before a restart is answered with
+    a reset event rather than silently skipping events.
+    """
+
+    def __init__(self, buffer_size: int, max_pending: int, max_connections: int):
+        self._epoch = format(time.time_ns() // 1000, "x")
+        self._seq = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._max_pending = max_pending
+        self._max_connections = max_connections
+        self._subscribers = {}
+        self._connections = 0
+        self._lock = threading.Lock()
+        self.published = 0
+        self.resets = 0
+
+    def event_id(self, seq: int) -> str:
+        return f"{self._epoch}-{seq}"
+
+    def _parse(self, event_id):
+        epoch, _, seq = (event_id or "").partition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    # Publishing
+    @staticmethod
+    def publish(db: Session, topic: str, event_type: str, data):
+        """Deliver `data` to `topic` once the caller's transaction commits."""
+        db.info.setdefault("live_events", []).append((topic, event_type, data))
+
+    def publish_marking(self, db: Session, course_id, class_date, marks):
+        """
+        Stage the events for attendance written on `class_date`: each
+        student's own status, and the course's totals for its faculty.
+        `marks` is [(student_id, status)].
+        """
+        if not marks:
+            return
+        course_id = _id(course_id)
+        counts = {}
+        for student_id, status in marks:
+            counts[status] = counts.get(status, 0) + 1
+            self.publish(db, student_topic(student_id), ATTENDANCE_MARKED, {
+                "course_id": course_id, "class_date": class_date, "status": status,
+            })
+        self.publish(db, course_topic(course_id), ATTENDANCE_MARKED, {
+            "course_id": course_id, "class_date": class_date, "marked": len(marks), "counts": counts,
+        })
+
+    def publish_notification(self, db: Session, user_id, notification_id, title, message, notification_type,
+                             created_at=None):
+        self.publish(db, user_topic(user_id), NOTIFICATION, {
+            "notification_id": str(notification_id),
+            "title": title,
+            "message": message,
+            "type": notification_type,
+            "is_read": False,
+            "created_at": created_at or datetime.now(timezone.utc),
+        })
+
+    def emit(self, staged):
+        """Number, buffer and deliver [(topic, type, data)] now."""
+        encoded = [(topic, event_type, json.dumps(jsonable_encoder(data))) for topic, event_type, data in staged]
+        deliveries = {}
+        with self._lock:
+            for topic, event_type, data in encoded:
+                self._seq += 1
+                feed_event = FeedEvent(self._seq, topic, event_type, data)
+                self._buffer.append(feed_event)
+                for subscription in self._subscribers.get(topic, ()):
+                    deliveries.setdefault(subscription, []).append(feed_event)
+            self.published += len(encoded)
+        for subscription, events in deliveries.items():
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._put, events)
+            except RuntimeError:
+                # Its event loop has shut down
+                pass
+
+    def _commit(self, session):
+        staged = session.info.pop("live_events", None)
+        if staged:
+            self.emit(staged)
+
+    def _discard(self, session):
+        session.info.pop("live_events", None)
+
+    # Subscribing
+    def replay(self, topics, after_seq: int):
+        """Buffered events for `topics` after `after_seq`, or a reset event if some have been dropped."""
+        with self._lock:
+            return self._replay(topics, after_seq)
+
+    def _replay(self, topics, after_seq: int):
+        if (self._buffer and self._buffer[0].seq > after_seq + 1) or after_seq > self._seq:
+            self.resets += 1
+            return [FeedEvent(self._seq, None, RESET, "{}")]
+        events = []
+        for feed_event in reversed(self._buffer):
+            if feed_event.seq <= after_seq:
+                break
+            if feed_event.topic in topics:
+                events.append(feed_event)
+        events.reverse()
+        return events
+
+    def subscribe(self, topics, last_event_id: str = None) -> Subscription:
+        """
+        Subscribe the calling event loop to `topics`. With last_event_id the
+        events published since are queued first.
+        """
+        subscription = Subscription(self, topics, asyncio.get_running_loop(), self._max_pending)
+        with self._lock:
+            self._connections += 1
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+            if last_event_id:
+                seq = self._parse(last_event_id)
+                if seq is None:
+                    self.resets += 1
+                    backlog = [FeedEvent(self._seq, None, RESET, "{}")]
+                else:
+                    backlog = self._replay(subscription.topics, seq)
+                subscription.last_seq = min(seq or 0, self._seq)
+            else:
+                backlog = []
+                subscription.last_seq = self._seq
+        if backlog:
+            subscription._put(backlog)
+        return subscription
+
+    def full(self) -> bool:
+        """True once LIVE_FEED_MAX_CONNECTIONS subscriptions are open."""
+        return self._connections >= self._max_connections
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self._lock:
+            self._connections -= 1
+            for topic in subscription.topics:
+                subscribers = self._subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[topic]
+
+    @staticmethod
+    def topics_for(db: Session, user) -> set:
+        """A user's own notifications, plus their marks (students) or their courses' marking (faculty)."""
+        topics = {user_topic(user.user_id)}
+        # student_id / faculty_id are resolved along with the user by get_current_user
+        if user.role == "student" and user.student_id:
+            topics.add(student_topic(user.student_id))
+        elif user.role == "faculty" and user.faculty_id:
+            topics.update(
+                course_topic(course_id) for (course_id,) in db.query(CourseEnrollment.course_id).filter(
+                    CourseEnrollment.faculty_id == user.faculty_id
+                ).distinct().all()
+            )
+        return topics
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connections": self._connections,
+                "topics": len(self._subscribers),
+                "published": self.published,
+                "buffered": len(self._buffer),
+                "last_event_id": self.event_id(self._seq),
+                "resets": self.resets,
+            }
+
+    @staticmethod
+    def format_sse(feed_event: FeedEvent, event_id: str) -> str:
+        return f"id: {event_id}\nevent: {feed_event.type}\ndata: {feed_event.data}\n\n"
+
+    @staticmethod
+    def format_json(feed_event: FeedEvent, event_id: str) -> str:
+        return f'{{"id": "{event_id}", "type": "{feed_event.type}", "data": {feed_event.data}}}'
+
+live_feed = LiveFeed(settings.LIVE_FEED_BUFFER_SIZE, settings.LIVE_FEED_MAX_PENDING, settings.LIVE_FEED_MAX_CONNECTIONS)
+event.listen(Session, "after_commit", live_feed._commit)
+event.listen(Session, "after_rollback", live_feed._discard)
+
+
+# Notifications added through the ORM
+def _notification_added(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None and target.user_id is not None:
+        live_feed.publish_notification(
+            session, target.user_id, target.notification_id, target.title, target.message, target.type,
+            target.__dict__.get("created_at"),
+        )
+
+event.listen(Notification, "after_insert", _notification_added)
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import traceback
+from datetime import date
+from uuid import UUID
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from sqlalchemy import and_
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord
+from app.models.course import CourseEnrollment
+from app.models.student import Student
+from app.models.user import User
+from app.schemas.attendance import COMPACT_STATUSES, AttendanceMark
+from app.services.attendance_service import attendance_service
+
+settings = get_settings()
+
+# Attempts at the final flush once the last participant has left
+CLOSE_FLUSH_ATTEMPTS = 3
+
+# Failures worth retrying (connection lost, lock or pool timeout); anything
+# else is the row's fault and retrying it would fail the same way
+TRANSIENT_ERRORS = (OperationalError, PoolTimeoutError)
+
+
+class LiveMarkingSession:
+    """
+    The authoritative roster for one (course_id, class_date) while it is
+    being marked live. Participants send individual status changes; each is
+    applied here, broadcast to every participant as a delta, and written to
+    attendance_records by a flush at most every LIVE_MARKING_FLUSH_MS (and
+    when the last participant leaves), so several markers cost one batched
+    write per interval instead of one full-roster write each.
+
+    Runs on the event loop; only the roster load and the flush touch the
+    database, in the threadpool. Sessions live in one process: markers of
+    the same class connected to different workers each get their own
+    session, and the later flush wins per student.
+    """
+
+    def __init__(self, course_id: UUID, class_date: date, roster: dict, flush_seconds: float):
+        self.course_id = course_id
+        self.class_date = class_date
+        # student key -> {"student_id", "roll_number", "full_name", "status", "remarks"}
+        self.roster = roster
+        self.version = 0
+        self.flushed_version = 0
+        self._flush_seconds = flush_seconds
+        # student key -> (status, remarks, marked_by, version), not yet written
+        self._dirty = {}
+        self._participants = {}
+        self._timer = None
+        self._flushing = asyncio.Lock()
+
+    @property
+    def key(self):
+        return (self.course_id, self.class_date)
+
+    def participants(self):
+        return sorted(name for _, name in self._participants.values())
+
+    async def _broadcast(self, message: dict):
+        text = json.dumps(jsonable_encoder(message))
+        sends = [send(text) for send, _ in list(self._participants.values())]
+        # A participant that has gone away is dropped when its socket closes
+        await asyncio.gather(*sends, return_exceptions=True)
+
+    async def join(self, participant, send, name: str):
+        self._participants[participant] = (send, name)
+        await send(json.dumps(jsonable_encoder({
+            "type": "snapshot",
+            "course_id": self.course_id,
+            "class_date": self.class_date,
+            "version": self.version,
+            "flushed_version": self.flushed_version,
+            "participants": self.participants(),
+            "roster": list(self.roster.values()),
+        })))
+        await self._broadcast({"type": "participants", "participants": self.participants()})
+
+    async def leave(self, participant) -> bool:
+        """Drop `participant`; the last one out flushes. True once the session is empty."""
+        self._participants.pop(participant, None)
+        if self._participants:
+            await self._broadcast({"type": "participants", "participants": self.participants()})
+            return False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for attempt in range(CLOSE_FLUSH_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(self._flush_seconds)
+            await self.flush()
+            if not self._dirty or self._participants:
+                break
+        else:
+            print(f"ERROR: live marking for {self.course_id} on {self.class_date} closed with "
+                  f"{len(self._dirty)} unsaved changes")
+        return not self._participants
+
+    async def apply(self, changes, marked_by, name: str):
+        """
+        Apply [{"student_id", "status", "remarks"?}] and broadcast the
+        accepted ones; omitted remarks are kept. Returns the rejected ones
+        with a reason.
+        """
+        accepted, rejected = [], []
+        for change in changes:
+            if not isinstance(change, dict):
+                rejected.append({"student_id": None, "detail": "changes must be objects"})
+                continue
+            # Same rules as a marking request
+            try:
+                mark = AttendanceMark.model_validate(change)
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(part) for part in error["loc"])
+                rejected.append({"student_id": change.get("student_id"), "detail": f"invalid {field}: {error['msg']}"})
+                continue
+            student_key = str(mark.student_id)
+            entry = self.roster.get(student_key)
+            status = mark.status
+            if entry is None:
+                rejected.append({"student_id": student_key, "detail": "student not enrolled in course"})
+                continue
+            if status not in COMPACT_STATUSES:
+                rejected.append({"student_id": student_key, "detail": f"invalid status '{status}'"})
+                continue
+            remarks = mark.remarks if "remarks" in change else entry["remarks"]
+            if (status, remarks) == (entry["status"], entry["remarks"]):
+                continue
+            self.version += 1
+            entry["status"], entry["remarks"] = status, remarks
+            self._dirty[student_key] = (status, remarks, marked_by, self.version)
+            accepted.append({"student_id": student_key, "status": status, "remarks": remarks})
+
+        if accepted:
+            await self._broadcast({"type": "delta", "version": self.version, "by": name, "changes": accepted})
+            if self._timer is None:
+                self._timer = asyncio.ensure_future(self._flush_later())
+        return rejected
+
+    async def _flush_later(self):
+        await asyncio.sleep(self._flush_seconds)
+        self._timer = None
+        await self.flush()
+
+    def _write(self, batch) -> int:
+        db = SessionLocal()
+        try:
+            written = 0
+            # One call per marker so marked_by stays right, one transaction
+            for marked_by, marks in batch.items():
+                result = attendance_service.mark_attendance(
+                    db, self.course_id, self.class_date, marks, marked_by, commit=False
+                )
+                written += result["inserted"] + result["updated"]
+            db.commit()
+            return written
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _batch(dirty) -> dict:
+        batch = {}
+        for student_key, (status, remarks, marked_by, _) in dirty.items():
+            batch.setdefault(marked_by, []).append((student_key, status, remarks))
+        return batch
+
+    def _write_each(self, dirty):
+        """
+        Write the changes one per transaction: (written, {student key:
+        error} for rows the database refused, {student key: change} to retry).
+        """
+        written, dropped, retry = 0, {}, {}
+        for student_key, change in dirty.items():
+            try:
+                written += self._write(self._batch({student_key: change}))
+            except TRANSIENT_ERRORS:
+                retry[student_key] = change
+            except Exception as e:
+                dropped[student_key] = str(e)
+        return written, dropped, retry
+
+    def _retry(self, changes):
+        # Keep what hasn't been changed again since, for the next try
+        for student_key, change in changes.items():
+            self._dirty.setdefault(student_key, change)
+        if changes and self._timer is None and self._participants:
+            self._timer = asyncio.ensure_future(self._flush_later())
+
+    async def flush(self):
+        """
+        Write every change not yet written, in one transaction. If the
+        database refuses it, the changes are written one at a time and the
+        rows it refuses are dropped, so one bad row can't hold back the rest.
+        """
+        async with self._flushing:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, {}
+            dropped, retry = {}, {}
+            try:
+                written = await run_in_threadpool(self._write, self._batch(dirty))
+            except TRANSIENT_ERRORS as e:
+                traceback.print_exc()
+                self._retry(dirty)
+                await self._broadcast({"type": "error", "detail": f"Saving attendance failed, will retry: {e}"})
+                return
+            except Exception:
+                traceback.print_exc()
+                written, dropped, retry = await run_in_threadpool(self._write_each, dirty)
+                self._retry(retry)
+            if dropped:
+                await self._broadcast({
+                    "type": "error",
+                    "detail": "Some changes could not be saved and were dropped",
+                    "dropped": [{"student_id": key, "detail": error} for key, error in dropped.items()],
+                })
+            saved = [version for key, (_, _, _, version) in dirty.items() if key not in retry]
+            if not saved:
+                return
+            self.flushed_version = max(self.flushed_version, max(saved))
+            await self._broadcast({
+                "type": "flushed",
+                "version": self.flushed_version,
+                "written": written,
+                "pending": len(self._dirty),
+            })
+
+
+class LiveMarkingSessions:
+    """Open live marking sessions of this process, by (course_id, class_date)."""
+
+    def __init__(self, flush_ms: int):
+        self._flush_seconds = flush_ms / 1000
+        self._sessions = {}
+        self._opening = asyncio.Lock()
+
+    @staticmethod
+    def _load_roster(course_id: UUID, class_date: date) -> dict:
+        db = SessionLocal()
+        try:
+            rows = db.query(
+                CourseEnrollment.student_id, Student.roll_number, User.full_name,
+                AttendanceRecord.status, AttendanceRecord.remarks,
+            ).join(
+                Student, CourseEnrollment.student_id == Student.student_id
+            ).join(
+                User, Student.user_id == User.user_id
+            ).outerjoin(
+                AttendanceRecord, and_(
+                    AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id,
+                    AttendanceRecord.class_date == class_date,
+                )
+            ).filter(
+                CourseEnrollment.course_id == course_id
+            ).order_by(CourseEnrollment.academic_year).all()
+        finally:
+            db.close()
+        # Latest academic year wins, as when marking
+        roster = {}
+        for student_id, roll_number, full_name, status, remarks in rows:
+            roster[str(student_id)] = {
+                "student_id": str(student_id),
+                "roll_number": roll_number,
+                "full_name": full_name,
+                "status": status,
+                "remarks": remarks,
+            }
+        return dict(sorted(roster.items(), key=lambda item: item[1]["roll_number"] or ""))
+
+    async def join(self, course_id: UUID, class_date: date, participant, send, name: str) -> LiveMarkingSession:
+        """Join the session for (course_id, class_date), opening it if needed."""
+        key = (course_id, class_date)
+        async with self._opening:
+            session = self._sessions.get(key)
+            if session is None:
+                roster = await run_in_threadpool(self._load_roster, course_id, class_date)
+                session = LiveMarkingSession(course_id, class_date, roster, self._flush_seconds)
+                self._sessions[key] = session
+        await session.join(participant, send, name)
+        return session
+
+    async def leave(self, session: LiveMarkingSession, participant):
+        if await session.leave(participant) and self._sessions.get(session.key) is session:
+            del self._sessions[session.key]
+
+    def stats(self) -> list:
+        return [
+            {
+                "course_id": str(session.course_id),
+                "class_date": session.class_date.isoformat(),
+                "participants": session.participants(),
+                "version": session.version,
+                "flushed_version": session.flushed_version,
+            }
+            for session in self._sessions.values()
+        ]
+
+live_marking = LiveMarkingSessions(settings.LIVE_MARKING_FLUSH_MS)
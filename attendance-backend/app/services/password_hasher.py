@@ -0,0 +1,156 @@
+import asyncio
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from app.config import get_settings
+from app.utils.security import get_password_hash, verify_password
+
+settings = get_settings()
+
+# Recent calls kept for the queue wait / hash time percentiles
+METRIC_SAMPLES = 2000
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when hashing is at its queue limit or a call waited past the timeout."""
+
+
+class PasswordHasher:
+    """
+    bcrypt on a dedicated, bounded thread pool.
+
+    bcrypt holds a CPU for the whole hash and would otherwise run on the
+    request threadpool, so a burst of logins left every other request
+    queued behind it. Here at most `workers` hashes run at once (bcrypt
+    releases the GIL, so threads are enough), at most `queue_limit` more
+    wait, and a call that hasn't finished within `timeout_seconds` is given
+    up on; both cases raise PasswordHasherBusy and the caller should answer
+    503. Routes await verify() / hash() from the event loop.
+
+    Hashes made at a cost other than `rounds` are reported by needs_rehash()
+    so login can upgrade them while it has the plain password.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, timeout_seconds: float, rounds: int):
+        self.rounds = rounds
+        self._workers = workers or os.cpu_count() or 1
+        self._queue_limit = queue_limit
+        self._timeout = timeout_seconds
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        # (queue wait ms, hash ms) of recent calls
+        self._samples = deque(maxlen=METRIC_SAMPLES)
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.rehashed = 0
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _timed(self, submitted: float, fn, *args):
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._samples.append(((started - submitted) * 1000, (finished - started) * 1000))
+                self.completed += 1
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self._workers + self._queue_limit:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+        future = self._pool().submit(self._timed, time.monotonic(), fn, *args)
+        future.add_done_callback(self._done)
+        try:
+            # A call still queued at the timeout is cancelled with it
+            return await asyncio.wait_for(asyncio.wrap_future(future), self._timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise PasswordHasherBusy()
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(verify_password, password, hashed)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password, self.rounds)
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """True for a bcrypt hash ($2b$<cost>$...) made at a cost other than `rounds`."""
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (AttributeError, IndexError, ValueError):
+            return False
+
+    async def rehash(self, password: str, hashed: str):
+        """
+        A new hash of `password` at the configured cost if `hashed` needs
+        one, else None. Also None when the pool is busy: the upgrade is
+        retried on a later login rather than failing this one.
+        """
+        if not self.needs_rehash(hashed):
+            return None
+        try:
+            new_hash = await self.hash(password)
+        except PasswordHasherBusy:
+            return None
+        with self._lock:
+            self.rehashed += 1
+        return new_hash
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return {"p50": None, "p99": None, "max": None}
+        if len(values) == 1:
+            return {"p50": round(values[0], 1), "p99": round(values[0], 1), "max": round(values[0], 1)}
+        cuts = statistics.quantiles(values, n=100, method="inclusive")
+        return {"p50": round(cuts[49], 1), "p99": round(cuts[98], 1), "max": round(max(values), 1)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            samples = list(self._samples)
+            pending = self._pending
+        return {
+            "rounds": self.rounds,
+            "workers": self._workers,
+            "queue_limit": self._queue_limit,
+            "timeout_seconds": self._timeout,
+            "in_flight": min(pending, self._workers),
+            "queued": max(pending - self._workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "rehashed": self.rehashed,
+            "queue_wait_ms": self._percentiles([wait for wait, _ in samples]),
+            "hash_ms": self._percentiles([elapsed for _, elapsed in samples]),
+        }
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_QUEUE_LIMIT,
+    settings.PASSWORD_HASH_TIMEOUT_SECONDS,
+    settings.BCRYPT_ROUNDS,
+)
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import OrderedDict
+from jose import JWTError, jwt
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.config import get_settings
+from app.models.faculty import Faculty
+from app.models.student import Student
+from app.models.user import User
+
+settings = get_settings()
+
+_USER_COLUMNS = [attr.key for attr in inspect(User).column_attrs]
+
+
+class PrincipalCache:
+    """
+    Resolves a bearer token to its User for get_current_user without
+    touching the database on repeat requests.
+
+    Decoded claims are memoized per token (until the token expires), and
+    each subject's user row is kept, together with its student_id and
+    faculty_id, in an LRU bounded by PRINCIPAL_CACHE_MAX_ENTRIES and
+    PRINCIPAL_CACHE_TTL_SECONDS. A hit comes back as a detached User
+    without a query; routes read it, and load the row themselves to change it.
+
+    Updates and deletes of users, and any change to a student or faculty
+    profile, committed through this process drop the user's entry (password
+    change, deactivation, profile edits); the TTL bounds staleness for
+    changes made by other workers or in SQL.
+    """
+
+    def __init__(self, ttl_seconds: int, max_entries: int, enabled: bool = True):
+        self.enabled = enabled
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        # subject -> (expires_at, user key, column values, student_id, faculty_id)
+        self._entries = OrderedDict()
+        # token -> (subject, exp)
+        self._claims = OrderedDict()
+        # Bumped on every invalidation, so a user read before a commit is not
+        # stored after it
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.claim_hits = 0
+        self.claim_misses = 0
+        self.invalidations = 0
+
+    def subject(self, token: str):
+        """The token's subject, or None; raises JWTError for a bad or expired token."""
+        now = time.time()
+        with self._lock:
+            claims = self._claims.get(token)
+            if claims is not None:
+                self._claims.move_to_end(token)
+        if claims is not None:
+            subject, expires = claims
+            if expires is None or now < expires:
+                self.claim_hits += 1
+                return subject
+            with self._lock:
+                self._claims.pop(token, None)
+            raise JWTError("Signature has expired.")
+
+        self.claim_misses += 1
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        subject = payload.get("sub")
+        if self.enabled:
+            with self._lock:
+                self._claims[token] = (subject, payload.get("exp"))
+                while len(self._claims) > self._max_entries:
+                    self._claims.popitem(last=False)
+        return subject
+
+    async def resolve(self, db: AsyncSession, token: str):
+        """
+        The User for `token`, with student_id and faculty_id set (None
+        without that profile), or None if the subject has no user. Raises
+        JWTError for a bad or expired token.
+        """
+        subject = self.subject(token)
+        if subject is None:
+            return None
+
+        entry = None
+        if self.enabled:
+            with self._lock:
+                entry = self._entries.get(subject)
+                if entry is not None and time.monotonic() >= entry[0]:
+                    del self._entries[subject]
+                    entry = None
+                if entry is not None:
+                    self._entries.move_to_end(subject)
+                generation = self._generation
+        if entry is not None:
+            self.hits += 1
+            _, _, values, student_id, faculty_id = entry
+            user = User(**values)
+            make_transient_to_detached(user)
+        else:
+            self.misses += 1
+            row = (await db.execute(
+                select(User, Student.student_id, Faculty.faculty_id).outerjoin(
+                    Student, Student.user_id == User.user_id
+                ).outerjoin(
+                    Faculty, Faculty.user_id == User.user_id
+                ).filter(User.email == subject)
+            )).first()
+            if row is None:
+                return None
+            user, student_id, faculty_id = row
+            if self.enabled:
+                values = {key: getattr(user, key) for key in _USER_COLUMNS}
+                with self._lock:
+                    if self._generation == generation:
+                        expires_at = time.monotonic() + self._ttl
+                        self._entries[subject] = (expires_at, str(user.user_id), values, student_id, faculty_id)
+                        while len(self._entries) > self._max_entries:
+                            self._entries.popitem(last=False)
+
+        user.student_id = student_id
+        user.faculty_id = faculty_id
+        return user
+
+    def invalidate(self, db: Session, user_ids):
+        """Drop the users' entries once the caller's transaction commits."""
+        db.info.setdefault("principal_users", set()).update(str(u) for u in user_ids if u is not None)
+
+    def forget(self, user_keys):
+        with self._lock:
+            self._generation += 1
+            stale = [subject for subject, entry in self._entries.items() if entry[1] in user_keys]
+            for subject in stale:
+                del self._entries[subject]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._claims.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        claim_lookups = self.claim_hits + self.claim_misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "claims_cached": len(self._claims),
+            "claim_hit_rate": round(self.claim_hits / claim_lookups, 4) if claim_lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+    def _commit(self, session):
+        users = session.info.pop("principal_users", None)
+        if users:
+            self.forget(users)
+
+    def _discard(self, session):
+        session.info.pop("principal_users", None)
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_TTL_SECONDS, settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_ENABLED
+)
+event.listen(Session, "after_commit", principal_cache._commit)
+event.listen(Session, "after_rollback", principal_cache._discard)
+
+
+# ORM writes to a user or their profile
+def _user_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        principal_cache.invalidate(session, [target.user_id])
+
+for _event in ("after_update", "after_delete"):
+    event.listen(User, _event, _user_changed)
+for _model in (Student, Faculty):
+    for _event in ("after_insert", "after_update", "after_delete"):
+        event.listen(_model, _event, _user_changed)
@@ -0,0 +1,180 @@
+from uuid import UUID
+import numpy as np
+from sqlalchemy.orm import Session
+from app.database import chunks, text_id
+from app.models.attendance import AttendanceSummary
+from app.models.course import Course, CourseEnrollment
+from app.models.student import Student
+from app.services.threshold_service import threshold_resolver
+
+# Guards ceil/floor against float noise (e.g. 0.75 * 4 - 3 = 4e-16)
+EPSILON = 1e-9
+# Sentinel in integer results for "never" / "unlimited"
+UNBOUNDED = -1
+
+
+def project(held, attended, planned, threshold):
+    """
+    Vectorised projection over parallel arrays, one element per enrollment:
+    classes held so far, classes attended (present + late), planned sessions
+    (Course.total_classes, 0 when unknown) and the minimum percentage.
+
+    Returns a dict of arrays:
+      current_percentage       attended / held
+      below_threshold          currently under the minimum
+      remaining                planned sessions left (UNBOUNDED if unknown)
+      classes_needed           consecutive classes to attend to get back to
+                               the threshold (0 if already there, UNBOUNDED
+                               if it can never be reached)
+      can_miss                 classes that can still be missed and end at or
+                               above the threshold: over the remaining planned
+                               sessions when known, otherwise from now on
+                               (UNBOUNDED for a 0% threshold)
+      recoverable              classes_needed fits in the remaining sessions
+      max_possible_percentage  attending every remaining session (NaN if unknown)
+    """
+    held = np.asarray(held, dtype=np.float64)
+    attended = np.asarray(attended, dtype=np.float64)
+    planned = np.asarray(planned, dtype=np.float64)
+    p = np.asarray(threshold, dtype=np.float64) / 100.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        current = np.where(held > 0, attended / held * 100.0, 0.0)
+
+        shortfall = p * held - attended
+        below = shortfall > EPSILON
+        needed = np.ceil(shortfall / (1.0 - p) - EPSILON)
+        never = below & (p >= 1.0)
+        needed = np.where(below & ~never, needed, 0.0)
+
+        known = planned > 0
+        final_total = np.maximum(planned, held)
+        remaining = np.where(known, final_total - held, 0.0)
+
+        miss_planned = np.clip(np.floor(attended + remaining - p * final_total + EPSILON), 0.0, remaining)
+        miss_open = np.maximum(np.floor(attended / p - held + EPSILON), 0.0)
+        can_miss = np.where(known, miss_planned, np.where(p > 0, miss_open, UNBOUNDED))
+
+        recoverable = ~never & (~known | (needed <= remaining))
+        max_possible = np.where(known & (final_total > 0), (attended + remaining) / final_total * 100.0, np.nan)
+
+    return {
+        "current_percentage": current,
+        "below_threshold": below,
+        "remaining": np.where(known, remaining, UNBOUNDED).astype(np.int64),
+        "classes_needed": np.where(never, UNBOUNDED, needed).astype(np.int64),
+        "can_miss": can_miss.astype(np.int64),
+        "recoverable": recoverable,
+        "max_possible_percentage": max_possible,
+    }
+
+
+class ProjectionService:
+    @staticmethod
+    def projections(db: Session, student_id=None, course_id=None, at_risk_only: bool = False, limit: int = None):
+        """
+        Recovery projection for every summary row matching the filters (all
+        enrollments when none are given), computed in one NumPy pass.
+        Rows are returned most-at-risk first; `totals` covers every match.
+        """
+        query = db.query(
+            text_id(AttendanceSummary.enrollment_id),
+            text_id(CourseEnrollment.course_id),
+            Student.department,
+            AttendanceSummary.total_classes,
+            AttendanceSummary.classes_attended,
+            AttendanceSummary.classes_late
+        ).join(
+            CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
+        ).join(
+            Student, CourseEnrollment.student_id == Student.student_id
+        )
+        if student_id is not None:
+            query = query.filter(CourseEnrollment.student_id == student_id)
+        if course_id is not None:
+            query = query.filter(CourseEnrollment.course_id == course_id)
+        # Plain columns: run on the connection and skip ORM row loading
+        rows = db.connection().execute(query.statement).all()
+
+        resolve = threshold_resolver.lookup(db)
+        courses = {
+            key: (code, name, planned, course)
+            for key, course, code, name, planned in db.query(
+                text_id(Course.course_id), Course.course_id, Course.course_code, Course.course_name, Course.total_classes
+            ).all()
+        }
+
+        _, course_keys, departments, held, attended, late = (
+            zip(*rows) if rows else ([] for _ in range(6))
+        )
+        held = np.nan_to_num(np.array(held, dtype=np.float64))
+        attended = np.nan_to_num(np.array(attended, dtype=np.float64)) + np.nan_to_num(np.array(late, dtype=np.float64))
+        planned = np.array([courses[key][2] or 0 for key in course_keys], dtype=np.float64)
+        threshold = np.array([
+            resolve(courses[key][3], department).minimum
+            for key, department in zip(course_keys, departments)
+        ], dtype=np.float64)
+        result = project(held, attended, planned, threshold)
+
+        below = result["below_threshold"]
+        totals = {
+            "enrollments": len(rows),
+            "below_threshold": int(below.sum()),
+            "unrecoverable": int((below & ~result["recoverable"]).sum()),
+        }
+
+        # Most classes needed first, unreachable ones on top
+        needed = result["classes_needed"]
+        order = np.lexsort((-needed, needed != UNBOUNDED))
+        if at_risk_only:
+            order = order[below[order]]
+        if limit is not None:
+            order = order[:limit]
+
+        def optional(value):
+            return None if value == UNBOUNDED else int(value)
+
+        # Student details only for the rows going out
+        selected = order.tolist()
+        students = {}
+        keys = [rows[i][0] for i in selected]
+        for chunk in chunks(keys):
+            students.update(
+                (key, (student_key, roll_number))
+                for key, student_key, roll_number in db.query(
+                    text_id(CourseEnrollment.enrollment_id), text_id(CourseEnrollment.student_id), Student.roll_number
+                ).join(
+                    Student, CourseEnrollment.student_id == Student.student_id
+                ).filter(
+                    CourseEnrollment.enrollment_id.in_([UUID(k) for k in chunk])
+                ).all()
+            )
+
+        projections = []
+        for i in selected:
+            enrollment_key, course_key = rows[i][:2]
+            student_key, roll_number = students[enrollment_key]
+            code, name, _, _ = courses[course_key]
+            max_possible = result["max_possible_percentage"][i]
+            projections.append({
+                "enrollment_id": str(UUID(enrollment_key)),
+                "student_id": str(UUID(student_key)),
+                "roll_number": roll_number,
+                "course_id": str(UUID(course_key)),
+                "course_code": code,
+                "course_name": name,
+                "classes_held": int(held[i]),
+                "classes_attended": int(attended[i]),
+                "planned_classes": int(planned[i]) or None,
+                "remaining_classes": optional(result["remaining"][i]),
+                "threshold": float(threshold[i]),
+                "current_percentage": round(float(result["current_percentage"][i]), 2),
+                "below_threshold": bool(below[i]),
+                "classes_needed": optional(needed[i]),
+                "can_miss": optional(result["can_miss"][i]),
+                "recoverable": bool(result["recoverable"][i]),
+                "max_possible_percentage": None if np.isnan(max_possible) else round(float(max_possible), 2),
+            })
+        return {"totals": totals, "projections": projections}
+
+projection_service = ProjectionService()
@@ -0,0 +1,123 @@
+from sqlalchemy import case, func, insert, text
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models.attendance import AttendanceRecord, CourseDailyAttendance
+from app.models.course import CourseEnrollment
+from app.services.summary_service import summary_maintainer
+
+ROLLUP_COUNTERS = {
+    "present": "present_count",
+    "late": "late_count",
+    "absent": "absent_count",
+    "excused": "excused_count",
+}
+
+
+class DailyRollupMaintainer:
+    """
+    Keeps course_daily_attendance (one row per course and class date) in step
+    with attendance_records, so date-series views read a row per day instead
+    of aggregating raw records.
+
+    On Postgres the statement-level trigger from app/schema_patches.py does
+    this; elsewhere the marking paths call apply() in their own transaction.
+    Which one is active follows SUMMARY_MAINTENANCE, like the summaries.
+    """
+
+    @staticmethod
+    def enabled(db: Session) -> bool:
+        return summary_maintainer.enabled(db)
+
+    @staticmethod
+    def compute_deltas(changes):
+        deltas = {}
+        for change in changes:
+            if change.old_status == change.new_status:
+                continue
+            d = deltas.setdefault((change.course_id, change.class_date), dict.fromkeys(ROLLUP_COUNTERS.values(), 0))
+            if change.old_status in ROLLUP_COUNTERS:
+                d[ROLLUP_COUNTERS[change.old_status]] -= 1
+            if change.new_status in ROLLUP_COUNTERS:
+                d[ROLLUP_COUNTERS[change.new_status]] += 1
+        return {key: d for key, d in deltas.items() if any(d.values())}
+
+    def apply(self, db: Session, changes):
+        """
+        Apply the deltas for `changes` (which must carry course_id and
+        class_date) inside the caller's transaction.
+        """
+        if not self.enabled(db):
+            return
+        deltas = self.compute_deltas(changes)
+        if not deltas:
+            return
+
+        stmt = dialect_insert(db, CourseDailyAttendance)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CourseDailyAttendance.course_id, CourseDailyAttendance.class_date],
+            set_={
+                **{
+                    column: getattr(CourseDailyAttendance, column) + getattr(excluded, column)
+                    for column in ROLLUP_COUNTERS.values()
+                },
+                "last_updated": func.now(),
+            },
+        )
+        db.execute(stmt, [
+            {"course_id": course_id, "class_date": class_date, **d}
+            for (course_id, class_date), d in deltas.items()
+        ])
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """
+        Recompute the whole rollup from attendance_records (backfill or
+        repair). Writers are blocked on Postgres until the caller commits.
+        """
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE attendance_records IN SHARE MODE"))
+        db.query(CourseDailyAttendance).delete(synchronize_session=False)
+
+        counts = db.query(
+            CourseEnrollment.course_id,
+            AttendanceRecord.class_date,
+            *[
+                func.sum(case((AttendanceRecord.status == status, 1), else_=0))
+                for status in ROLLUP_COUNTERS
+            ],
+        ).join(
+            CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+        ).group_by(CourseEnrollment.course_id, AttendanceRecord.class_date)
+
+        result = db.execute(insert(CourseDailyAttendance).from_select(
+            ["course_id", "class_date", *ROLLUP_COUNTERS.values()], counts.statement
+        ))
+        return result.rowcount
+
+    @staticmethod
+    def daily_counts(db: Session, course_ids, start, end):
+        """Status counts per class date in [start, end], summed over `course_ids`."""
+        if not course_ids:
+            return {}
+        rows = db.query(
+            CourseDailyAttendance.class_date,
+            func.sum(CourseDailyAttendance.present_count).label("present"),
+            func.sum(CourseDailyAttendance.late_count).label("late"),
+            func.sum(CourseDailyAttendance.absent_count).label("absent"),
+            func.sum(CourseDailyAttendance.excused_count).label("excused"),
+        ).filter(
+            CourseDailyAttendance.course_id.in_(course_ids),
+            CourseDailyAttendance.class_date.between(start, end)
+        ).group_by(CourseDailyAttendance.class_date).all()
+        return {
+            r.class_date: {
+                "present": int(r.present or 0),
+                "late": int(r.late or 0),
+                "absent": int(r.absent or 0),
+                "excused": int(r.excused or 0),
+            }
+            for r in rows
+        }
+
+daily_rollup = DailyRollupMaintainer()
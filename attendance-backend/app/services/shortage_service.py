@@ -0,0 +1,220 @@
+import datetime
+import threading
+import time
+import traceback
+from uuid import uuid4
+from sqlalchemy import and_, case, delete, false, insert, literal, select, text, update
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal, chunks, dialect_insert, new_uuid_expr
+from app.models.attendance import AttendanceSummary, ShortageReport
+from app.models.course import Course, CourseEnrollment
+from app.models.notification import Notification
+from app.models.student import Student
+from app.services.admin_snapshot import admin_snapshot
+from app.services.cube_service import cohort_cube
+from app.services.dashboard_cache import student_dashboard_cache
+from app.services.live_feed import live_feed
+from app.services.threshold_service import DEFAULT_RULE, threshold_resolver
+
+settings = get_settings()
+
+# Points below the minimum at which a shortage is reported as critical
+CRITICAL_MARGIN = 10
+
+
+class ShortageSweep:
+    """
+    Recomputes attendance_summary.shortage_status for every enrollment,
+    upserts today's shortage_reports and notifies the students whose status
+    changed, in a handful of set-based statements.
+
+    This replaces the per-row check_attendance_shortage / notify_shortage
+    triggers: marking only records attendance, and shortage state catches
+    up on the next sweep (every SHORTAGE_SWEEP_INTERVAL_SECONDS, or on
+    demand via POST /api/reports/shortage-sweep or run_shortage_sweep.py).
+    """
+
+    def __init__(self, interval_seconds: int):
+        self._interval = interval_seconds
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _minimum(db: Session):
+        """Per-row minimum percentage as a CASE over the cached threshold rules."""
+        by_course, by_department, _ = threshold_resolver.snapshot(db)
+        minimum = literal(DEFAULT_RULE.minimum)
+        if by_department:
+            minimum = case(
+                {department: rule.minimum for department, rule in by_department.items()},
+                value=Student.department, else_=minimum
+            )
+        if by_course:
+            minimum = case(
+                {course_id: rule.minimum for course_id, rule in by_course.items()},
+                value=CourseEnrollment.course_id, else_=minimum
+            )
+        return minimum
+
+    def run(self, db: Session, today: datetime.date = None) -> dict:
+        """
+        One sweep inside the caller's transaction; the caller commits.
+        Returns counts, or {"skipped": True} when another sweep holds the
+        lock (Postgres).
+        """
+        today = today or datetime.date.today()
+        if db.get_bind().dialect.name == "postgresql":
+            if not db.execute(text("SELECT pg_try_advisory_xact_lock(hashtext('shortage_sweep'))")).scalar():
+                return {"skipped": True}
+
+        minimum = self._minimum(db)
+        joined = and_(
+            AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id,
+            CourseEnrollment.student_id == Student.student_id,
+        )
+        short = and_(AttendanceSummary.total_classes > 0, AttendanceSummary.attendance_percentage < minimum)
+
+        # 1. Flip shortage_status where it no longer matches
+        changed = db.execute(
+            update(AttendanceSummary)
+            .where(joined, AttendanceSummary.shortage_status.is_distinct_from(short))
+            .values(shortage_status=short)
+            .returning(AttendanceSummary.enrollment_id, AttendanceSummary.shortage_status,
+                       AttendanceSummary.attendance_percentage)
+        ).all()
+        cohort_cube.apply_shortage(db, [(row.enrollment_id, row.shortage_status) for row in changed])
+        student_dashboard_cache.invalidate_enrollments(db, [row.enrollment_id for row in changed])
+        admin_snapshot.note_writes(db, len(changed))
+
+        # 2. Notify only those enrollments
+        notifications = self._notifications(db, changed)
+        if notifications:
+            db.execute(insert(Notification), notifications)
+            for n in notifications:
+                live_feed.publish_notification(
+                    db, n["user_id"], n["notification_id"], n["title"], n["message"], n["type"]
+                )
+
+        # 3. Today's report for every enrollment currently short; only those
+        # alerted in step 2 are flagged notification_sent
+        stmt = dialect_insert(db, ShortageReport)
+        stmt = stmt.from_select(
+            ["report_id", "enrollment_id", "report_date", "attendance_percentage", "shortage_type", "notification_sent"],
+            select(
+                new_uuid_expr(db),
+                AttendanceSummary.enrollment_id,
+                literal(today),
+                AttendanceSummary.attendance_percentage,
+                case((AttendanceSummary.attendance_percentage < minimum - CRITICAL_MARGIN, "critical"), else_="warning"),
+                false(),
+            ).where(joined, AttendanceSummary.shortage_status == True)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ShortageReport.enrollment_id, ShortageReport.report_date],
+            set_={
+                "attendance_percentage": stmt.excluded.attendance_percentage,
+                "shortage_type": stmt.excluded.shortage_type,
+            },
+        )
+        reports = db.execute(stmt).rowcount
+        alerted = [row.enrollment_id for row in changed if row.shortage_status]
+        for chunk in chunks(alerted):
+            db.execute(
+                update(ShortageReport)
+                .where(ShortageReport.report_date == today, ShortageReport.enrollment_id.in_(chunk))
+                .values(notification_sent=True)
+            )
+
+        # 4. Drop today's reports for enrollments that have recovered
+        cleared_reports = db.execute(
+            delete(ShortageReport).where(
+                ShortageReport.report_date == today,
+                ShortageReport.enrollment_id.in_(
+                    select(AttendanceSummary.enrollment_id).where(AttendanceSummary.shortage_status == False)
+                ),
+            )
+        ).rowcount
+
+        return {
+            "entered_shortage": sum(1 for row in changed if row.shortage_status),
+            "left_shortage": sum(1 for row in changed if not row.shortage_status),
+            "notifications": len(notifications),
+            "reports": reports,
+            "reports_cleared": cleared_reports,
+        }
+
+    @staticmethod
+    def _notifications(db: Session, changed):
+        ids = [row.enrollment_id for row in changed]
+        details = {}
+        for chunk in chunks(ids):
+            details.update(
+                (enrollment_id, (user_id, course_name))
+                for enrollment_id, user_id, course_name in db.query(
+                    CourseEnrollment.enrollment_id, Student.user_id, Course.course_name
+                ).join(
+                    Student, CourseEnrollment.student_id == Student.student_id
+                ).join(
+                    Course, CourseEnrollment.course_id == Course.course_id
+                ).filter(CourseEnrollment.enrollment_id.in_(chunk)).all()
+            )
+
+        notifications = []
+        for enrollment_id, is_short, percentage in changed:
+            user_id, course_name = details[enrollment_id]
+            if is_short:
+                notifications.append({
+                    "notification_id": uuid4(),
+                    "user_id": user_id,
+                    "title": "Attendance Shortage Alert",
+                    "message": f"Your attendance in {course_name} is {percentage:.2f}%, which is below the required threshold.",
+                    "type": "shortage_alert",
+                })
+            else:
+                notifications.append({
+                    "notification_id": uuid4(),
+                    "user_id": user_id,
+                    "title": "Attendance Shortage Cleared",
+                    "message": f"Your attendance in {course_name} is back to {percentage:.2f}%, above the required threshold.",
+                    "type": "info",
+                })
+        return notifications
+
+    def sweep(self) -> dict:
+        """Runs and commits one sweep in its own session."""
+        db = SessionLocal()
+        try:
+            result = self.run(db)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _loop(self):
+        while not self._stop.wait(self._interval):
+            started = time.monotonic()
+            try:
+                result = self.sweep()
+                print(f"Shortage sweep: {result} in {time.monotonic() - started:.2f}s")
+            except Exception:
+                traceback.print_exc()
+
+    def start(self):
+        """Start the periodic sweep thread (no-op when the interval is 0)."""
+        if self._interval <= 0:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, name="shortage-sweep", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+shortage_sweep = ShortageSweep(settings.SHORTAGE_SWEEP_INTERVAL_SECONDS)
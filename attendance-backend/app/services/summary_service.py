@@ -0,0 +1,116 @@
+from collections import namedtuple
+from decimal import Decimal
+from uuid import uuid4
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import dialect_insert
+from app.models.attendance import AttendanceSummary
+
+settings = get_settings()
+
+# One written attendance row: old_status is None when the row was inserted,
+# new_status None when it was deleted. course_id/class_date feed the daily rollup.
+RecordChange = namedtuple(
+    "RecordChange",
+    ["enrollment_id", "old_status", "new_status", "course_id", "class_date"],
+    defaults=(None, None),
+)
+
+STATUS_COUNTERS = {
+    "present": "classes_attended",
+    "absent": "classes_absent",
+    "late": "classes_late",
+    "excused": "classes_excused",
+}
+
+
+class SummaryMaintainer:
+    """
+    Keeps attendance_summary in step with attendance_records from the
+    application, for backends without the plpgsql summary trigger.
+
+    Each write is turned into per-enrollment counter deltas which are applied
+    with one upsert, so the cost depends on the rows written and never on
+    the enrollment's history. shortage_status is left to the shortage sweep
+    (app/services/shortage_service.py).
+    """
+
+    @staticmethod
+    def enabled(db: Session) -> bool:
+        mode = settings.SUMMARY_MAINTENANCE
+        if mode == "auto":
+            return db.get_bind().dialect.name == "sqlite"
+        return mode == "app"
+
+    @staticmethod
+    def compute_deltas(changes):
+        deltas = {}
+        for change in changes:
+            if change.old_status == change.new_status:
+                continue
+            d = deltas.setdefault(change.enrollment_id, {
+                "total_classes": 0,
+                "classes_attended": 0,
+                "classes_absent": 0,
+                "classes_late": 0,
+                "classes_excused": 0,
+            })
+            if change.old_status is None:
+                d["total_classes"] += 1
+            elif change.old_status in STATUS_COUNTERS:
+                d[STATUS_COUNTERS[change.old_status]] -= 1
+            if change.new_status is None:
+                d["total_classes"] -= 1
+            elif change.new_status in STATUS_COUNTERS:
+                d[STATUS_COUNTERS[change.new_status]] += 1
+        return {e: d for e, d in deltas.items() if any(d.values())}
+
+    def apply(self, db: Session, changes):
+        """
+        Apply the deltas for `changes` inside the caller's transaction.
+        """
+        if not self.enabled(db):
+            return
+        deltas = self.compute_deltas(changes)
+        if not deltas:
+            return
+
+        rows = []
+        for enrollment_id, d in deltas.items():
+            # Values for an enrollment that has no summary row yet
+            attended = d["classes_attended"] + d["classes_late"]
+            percentage = round(Decimal(attended * 100) / d["total_classes"], 2) if d["total_classes"] > 0 else Decimal("0.00")
+            rows.append({
+                "summary_id": uuid4(),
+                "enrollment_id": enrollment_id,
+                **d,
+                "attendance_percentage": percentage,
+            })
+
+        stmt = dialect_insert(db, AttendanceSummary)
+        excluded = stmt.excluded
+        total = AttendanceSummary.total_classes + excluded.total_classes
+        attended = (
+            AttendanceSummary.classes_attended + excluded.classes_attended
+            + AttendanceSummary.classes_late + excluded.classes_late
+        )
+        percentage = case(
+            (total > 0, func.round(attended * 100.0 / total, 2)),
+            else_=0,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AttendanceSummary.enrollment_id],
+            set_={
+                "total_classes": total,
+                "classes_attended": AttendanceSummary.classes_attended + excluded.classes_attended,
+                "classes_absent": AttendanceSummary.classes_absent + excluded.classes_absent,
+                "classes_late": AttendanceSummary.classes_late + excluded.classes_late,
+                "classes_excused": AttendanceSummary.classes_excused + excluded.classes_excused,
+                "attendance_percentage": percentage,
+                "last_updated": func.now(),
+            },
+        )
+        db.execute(stmt, rows)
+
+summary_maintainer = SummaryMaintainer()
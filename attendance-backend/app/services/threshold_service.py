@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models.attendance import ShortageThreshold
+
+settings = get_settings()
+
+ThresholdRule = namedtuple("ThresholdRule", ["minimum", "warning"])
+
+# Column defaults of shortage_threshold; used when no row applies
+DEFAULT_RULE = ThresholdRule(Decimal("75.00"), Decimal("80.00"))
+
+ThresholdSnapshot = namedtuple("ThresholdSnapshot", ["by_course", "by_department", "loaded_at"])
+
+
+class ThresholdResolver:
+    """
+    In-memory copy of the active shortage_threshold rows, resolved as the
+    course's row, else the student's department row (course_id NULL), else
+    DEFAULT_RULE.
+
+    The table is loaded once and reused until a session commits a change to
+    ShortageThreshold (see the listeners below) or `ttl_seconds` pass, which
+    covers edits made by other workers or directly in SQL.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self._ttl = ttl_seconds
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def snapshot(self, db: Session) -> ThresholdSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self._ttl:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or time.monotonic() - snapshot.loaded_at >= self._ttl:
+                snapshot = self._load(db)
+                self._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def _load(db: Session) -> ThresholdSnapshot:
+        by_course, by_department = {}, {}
+        for course_id, department, minimum, warning in db.query(
+            ShortageThreshold.course_id,
+            ShortageThreshold.department,
+            ShortageThreshold.minimum_percentage,
+            ShortageThreshold.warning_percentage
+        ).filter(ShortageThreshold.is_active == True).all():
+            rule = ThresholdRule(Decimal(minimum), Decimal(warning if warning is not None else minimum))
+            if course_id is not None:
+                by_course[course_id] = rule
+            elif department is not None:
+                by_department[department] = rule
+        return ThresholdSnapshot(by_course, by_department, time.monotonic())
+
+    def lookup(self, db: Session):
+        """
+        Returns resolve(course_id, department) -> ThresholdRule bound to the
+        current snapshot, for resolving many rows with plain dict lookups.
+        """
+        by_course, by_department, _ = self.snapshot(db)
+
+        def resolve(course_id, department=None) -> ThresholdRule:
+            rule = by_course.get(course_id)
+            if rule is None:
+                rule = by_department.get(department, DEFAULT_RULE)
+            return rule
+        return resolve
+
+    def rule(self, db: Session, course_id, department=None) -> ThresholdRule:
+        return self.lookup(db)(course_id, department)
+
+    def highest_minimum(self, db: Session) -> Decimal:
+        """Upper bound on any resolved minimum, for pre-filtering in SQL."""
+        by_course, by_department, _ = self.snapshot(db)
+        rules = [DEFAULT_RULE, *by_course.values(), *by_department.values()]
+        return max(rule.minimum for rule in rules)
+
+threshold_resolver = ThresholdResolver(settings.THRESHOLD_CACHE_TTL_SECONDS)
+
+
+# Invalidate once a change to shortage_threshold is committed
+def _threshold_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info["thresholds_changed"] = True
+
+
+def _threshold_bulk_changed(orm_execute_state):
+    mapper = orm_execute_state.bind_mapper
+    if (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert) \
+            and mapper is not None and mapper.class_ is ShortageThreshold:
+        orm_execute_state.session.info["thresholds_changed"] = True
+
+
+def _after_commit(session):
+    if session.info.pop("thresholds_changed", False):
+        threshold_resolver.invalidate()
+
+
+def _after_rollback(session):
+    session.info.pop("thresholds_changed", None)
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(ShortageThreshold, _event, _threshold_changed)
+event.listen(Session, "do_orm_execute", _threshold_bulk_changed)
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
@@ -0,0 +1,135 @@
+import datetime
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models.attendance import AttendanceRecord
+from app.models.course import Course, CourseEnrollment
+
+settings = get_settings()
+
+TREND_WINDOWS = {"7": 7, "30": 30, "90": 90, "semester": None}
+TREND_GRANULARITIES = ("day", "week", "month")
+
+LABEL_FORMATS = {"day": "%b %d", "week": "%b %d", "month": "%b %Y"}
+
+
+def semester_start(today: datetime.date) -> datetime.date:
+    """First day of the semester containing `today` (see SEMESTER_START_MONTHS)."""
+    months = sorted(settings.SEMESTER_START_MONTHS)
+    started = [m for m in months if m <= today.month]
+    if started:
+        return datetime.date(today.year, started[-1], 1)
+    return datetime.date(today.year - 1, months[-1], 1)
+
+
+def bucket_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def bucket_range(start: datetime.date, end: datetime.date, granularity: str):
+    """Every bucket between start and end, so days without classes still get a point."""
+    buckets = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        buckets.append(current)
+        if granularity == "day":
+            current += datetime.timedelta(days=1)
+        elif granularity == "week":
+            current += datetime.timedelta(days=7)
+        else:
+            current = (current + datetime.timedelta(days=32)).replace(day=1)
+    return buckets
+
+
+class TrendService:
+    @staticmethod
+    def window_start(window: str, today: datetime.date) -> datetime.date:
+        days = TREND_WINDOWS[window]
+        if days is None:
+            return semester_start(today)
+        return today - datetime.timedelta(days=days - 1)
+
+    @staticmethod
+    def student_trends(db: Session, student_id, window: str = "30", granularity: str = "day", today: datetime.date = None):
+        """
+        Attendance percentage per bucket over the window, overall and per
+        course, from one grouped query. Buckets without classes are filled in
+        with 0% and classes 0.
+        """
+        today = today or datetime.date.today()
+        start = TrendService.window_start(window, today)
+
+        # Outer join so enrolled courses with no classes in the window still
+        # come back (with a NULL class_date)
+        rows = db.query(
+            Course.course_id,
+            Course.course_code,
+            Course.course_name,
+            AttendanceRecord.class_date,
+            func.count(AttendanceRecord.attendance_id).label("total"),
+            func.sum(case((AttendanceRecord.status.in_(["present", "late"]), 1), else_=0)).label("attended")
+        ).select_from(CourseEnrollment).join(
+            Course, CourseEnrollment.course_id == Course.course_id
+        ).outerjoin(
+            AttendanceRecord,
+            and_(
+                AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id,
+                AttendanceRecord.class_date.between(start, today)
+            )
+        ).filter(
+            CourseEnrollment.student_id == student_id
+        ).group_by(
+            Course.course_id, Course.course_code, Course.course_name, AttendanceRecord.class_date
+        ).all()
+
+        buckets = bucket_range(start, today, granularity)
+        overall = {b: [0, 0] for b in buckets}
+        courses = {}
+        for course_id, code, name, class_date, total, attended in rows:
+            course = courses.setdefault(course_id, {
+                "course_id": str(course_id),
+                "course_code": code,
+                "course_name": name,
+                "counts": {b: [0, 0] for b in buckets},
+            })
+            if class_date is None:
+                continue
+            key = bucket_start(class_date, granularity)
+            for counts in (course["counts"][key], overall[key]):
+                counts[0] += total
+                counts[1] += int(attended or 0)
+
+        def series(counts):
+            fmt = LABEL_FORMATS[granularity]
+            return [
+                {
+                    "name": b.strftime(fmt),
+                    "attendance": round(attended / total * 100, 1) if total > 0 else 0,
+                    "classes": total,
+                    "fullDate": b.isoformat(),
+                }
+                for b, (total, attended) in counts.items()
+            ]
+
+        return {
+            "window": window,
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": today.isoformat(),
+            "overall": series(overall),
+            "courses": [
+                {
+                    "course_id": c["course_id"],
+                    "course_code": c["course_code"],
+                    "course_name": c["course_name"],
+                    "series": series(c["counts"]),
+                }
+                for c in courses.values()
+            ],
+        }
+
+trend_service = TrendService()
@@ -0,0 +1,152 @@
+import hashlib
+from fastapi import Request, Response
+from sqlalchemy import event, func, select, tuple_
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models.course import Course, CourseEnrollment
+from app.models.entity_version import EntityVersion
+from app.models.faculty import Faculty
+from app.models.student import Student
+from app.models.user import User
+
+# Version kinds. COURSE_LIST is a single counter for the set of courses and
+# enrollments, bumped whenever any course or enrollment is added, edited or
+# removed.
+COURSE = "course"
+STUDENT = "student"
+USER = "user"
+COURSE_LIST = ("course", "*")
+FORECASTS = ("forecast", "*")
+
+
+class EntityVersions:
+    """
+    Monotonic version per course, student and user in entity_versions, so a
+    GET can derive its ETag from a primary-key lookup and answer
+    If-None-Match with 304 without running its main query.
+
+    Write paths stage the entities they change with bump(); the counters are
+    incremented in one upsert just before the transaction commits, so every
+    worker sees the new versions as soon as the data. ORM writes to courses,
+    enrollments, students, faculty and users are staged by the listeners
+    below; the set-based marking paths call bump() themselves.
+    """
+
+    @staticmethod
+    def stage(db: Session, keys):
+        """Bump the (kind, entity_id) `keys` once the caller's transaction commits."""
+        db.info.setdefault("entity_versions", set()).update(
+            (kind, str(entity_id)) for kind, entity_id in keys if entity_id is not None
+        )
+
+    def bump(self, db: Session, kind: str, entity_ids):
+        self.stage(db, [(kind, entity_id) for entity_id in entity_ids])
+
+    @staticmethod
+    def _flush(session):
+        # Pending ORM changes stage their own bumps while flushing
+        session.flush()
+        keys = session.info.pop("entity_versions", None)
+        if not keys:
+            return
+        stmt = dialect_insert(session, EntityVersion)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[EntityVersion.kind, EntityVersion.entity_id],
+            set_={"version": EntityVersion.version + 1, "updated_at": func.now()},
+        )
+        # Sorted, so concurrent commits lock the rows in the same order
+        session.execute(stmt, [{"kind": kind, "entity_id": entity_id, "version": 1} for kind, entity_id in sorted(keys)])
+
+    @staticmethod
+    def _discard(session):
+        session.info.pop("entity_versions", None)
+
+    @staticmethod
+    def versions(db: Session, keys):
+        """{(kind, entity_id): version} for `keys`, 0 for entities never bumped."""
+        keys = [(kind, str(entity_id)) for kind, entity_id in keys]
+        found = dict(
+            ((kind, entity_id), version)
+            for kind, entity_id, version in db.execute(
+                select(EntityVersion.kind, EntityVersion.entity_id, EntityVersion.version).where(
+                    tuple_(EntityVersion.kind, EntityVersion.entity_id).in_(keys)
+                )
+            ).all()
+        ) if keys else {}
+        return {key: found.get(key, 0) for key in keys}
+
+    def etag(self, db: Session, keys, *extra) -> str:
+        """Weak ETag over the versions of `keys` plus anything else the body depends on."""
+        versions = self.versions(db, keys)
+        digest = hashlib.sha1(repr((sorted(versions.items()), extra)).encode()).hexdigest()[:20]
+        return f'W/"{digest}"'
+
+    def conditional(self, request: Request, response: Response, db: Session, keys, *extra):
+        """
+        Sets the ETag on `response` and returns a 304 response when the
+        client's If-None-Match already matches it, else None.
+        """
+        etag = self.etag(db, keys, *extra)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return None
+
+entity_versions = EntityVersions()
+event.listen(Session, "before_commit", entity_versions._flush)
+event.listen(Session, "after_rollback", entity_versions._discard)
+
+
+# ORM writes
+def _stage(target, keys):
+    session = Session.object_session(target)
+    if session is not None:
+        entity_versions.stage(session, keys)
+
+
+def _course_changed(mapper, connection, target):
+    _stage(target, [(COURSE, target.course_id), COURSE_LIST])
+
+
+def _enrollment_changed(mapper, connection, target):
+    _stage(target, [(COURSE, target.course_id), (STUDENT, target.student_id), COURSE_LIST])
+
+
+def _courses_of_students(connection, condition):
+    # Rosters show the student's name and roll number
+    return [
+        (COURSE, course_id) for (course_id,) in connection.execute(
+            select(CourseEnrollment.course_id).join(
+                Student, CourseEnrollment.student_id == Student.student_id
+            ).where(condition).distinct()
+        ).all()
+    ]
+
+
+def _student_changed(mapper, connection, target):
+    _stage(target, [
+        (STUDENT, target.student_id), (USER, target.user_id),
+        *_courses_of_students(connection, Student.student_id == target.student_id),
+    ])
+
+
+def _faculty_changed(mapper, connection, target):
+    _stage(target, [(USER, target.user_id)])
+
+
+def _user_changed(mapper, connection, target):
+    keys = [(USER, target.user_id)]
+    if target.role == "student":
+        keys += _courses_of_students(connection, Student.user_id == target.user_id)
+    _stage(target, keys)
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Course, _event, _course_changed)
+    event.listen(CourseEnrollment, _event, _enrollment_changed)
+for _event in ("after_update", "after_delete"):
+    event.listen(Student, _event, _student_changed)
+    event.listen(User, _event, _user_changed)
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Faculty, _event, _faculty_changed)
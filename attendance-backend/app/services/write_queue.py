@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from app.config import get_settings
+from app.database import SessionLocal
+from app.schemas.attendance import AttendanceSubmission
+from app.services.attendance_service import attendance_service
+
+settings = get_settings()
+
+# Finished jobs kept around for the status endpoint
+MAX_TRACKED_JOBS = 10000
+
+
+class WriteQueueFull(Exception):
+    """Raised when the writer has fallen behind and the queue is at capacity."""
+
+
+class AttendanceWriteQueue:
+    """
+    Group-commit writer for attendance submissions.
+
+    Requests are acknowledged once enqueued; a single background thread
+    drains the queue and writes up to `batch_size` submissions per
+    transaction, so a burst of faculty submissions costs a handful of
+    commits instead of one each. The queue is bounded: when it is full,
+    submit() raises WriteQueueFull and the caller should back off.
+    """
+
+    def __init__(self, maxsize: int, batch_size: int, max_wait_ms: int):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+                self._thread.start()
+
+    def _now(self):
+        return datetime.now(timezone.utc).isoformat()
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, data: AttendanceSubmission, marked_by, idempotency_key=None, submitted_by=None) -> dict:
+        self._ensure_writer()
+        job_id = str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "submitted_by": str(submitted_by),
+            "course_id": str(data.course_id),
+            "class_date": data.class_date.isoformat(),
+            "submitted_at": self._now(),
+            "committed_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                self._jobs.popitem(last=False)
+        try:
+            self._queue.put_nowait((job_id, data, marked_by, idempotency_key, submitted_by))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            raise WriteQueueFull()
+        return dict(job, queue_depth=self.depth())
+
+    def status(self, job_id: str, submitted_by):
+        """The job, or None if it is unknown or was submitted by another user."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["submitted_by"] != str(submitted_by):
+                return None
+            return dict(job)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                traceback.print_exc()
+
+    def _write_one(self, db, job):
+        job_id, data, marked_by, idempotency_key, submitted_by = job
+        return attendance_service.mark_attendance(
+            db=db,
+            course_id=data.course_id,
+            class_date=data.class_date,
+            attendance_data=data.attendance_data,
+            marked_by=marked_by,
+            commit=False,
+            idempotency_key=idempotency_key,
+            submitted_by=submitted_by
+        )
+
+    def _write(self, batch):
+        for job_id, *_ in batch:
+            self._update(job_id, status="writing")
+
+        db = SessionLocal()
+        try:
+            results = [self._write_one(db, job) for job in batch]
+            db.commit()
+            committed_at = self._now()
+            for (job_id, *_), result in zip(batch, results):
+                self._update(job_id, status="committed", committed_at=committed_at, result=result)
+            return
+        except Exception:
+            db.rollback()
+        finally:
+            db.close()
+
+        # One bad submission must not sink the rest: retry them one by one
+        for job in batch:
+            db = SessionLocal()
+            try:
+                result = self._write_one(db, job)
+                db.commit()
+                self._update(job[0], status="committed", committed_at=self._now(), result=result)
+            except Exception as e:
+                db.rollback()
+                self._update(job[0], status="failed", error=str(e))
+            finally:
+                db.close()
+
+attendance_write_queue = AttendanceWriteQueue(
+    maxsize=settings.ATTENDANCE_QUEUE_MAXSIZE,
+    batch_size=settings.ATTENDANCE_QUEUE_BATCH_SIZE,
+    max_wait_ms=settings.ATTENDANCE_QUEUE_MAX_WAIT_MS,
+)
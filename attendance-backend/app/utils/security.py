@@ -4,10 +4,11 @@ from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.async_database import AsyncSessionLocal
 from app.config import get_settings
-from app.database import get_db
 from app.models.user import User
+from app.services.principal_cache import principal_cache
 
 settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
@@ -15,8 +16,9 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
-def get_password_hash(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    salt = bcrypt.gensalt(rounds or settings.BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -28,21 +30,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # Own short-lived session, closed before the route runs: most routes
+    # still take a sync get_db session, and a request-scoped AsyncSession
+    # would hold a second pooled connection until teardown on a cache miss
+    async with AsyncSessionLocal() as db:
+        return await user_from_token(token, db)
+
+async def user_from_token(token: str, db: AsyncSession) -> User:
+    """
+    The user a bearer token was issued to, with its student_id and
+    faculty_id; 401 if the token is invalid or the user is gone.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        # Claims and user come from the principal cache when it has them
+        user = await principal_cache.resolve(db, token)
     except JWTError:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
     if user is None:
         raise credentials_exception
     return user
@@ -0,0 +1,26 @@
+"""
+Install or upgrade the Postgres triggers (attendance summary, course daily
+rollup, cohort cube) and the other versioned schema patches.
+
+    python apply_schema_patches.py
+
+app/schema_patches.py is the only definition of these triggers. Run this
+after database_setup/01_schema.sql when setting up a database by hand; the
+API applies any pending patch on startup too. Safe to re-run: a patch runs
+again only when its version is bumped.
+"""
+from app.database import engine
+from app.schema_patches import apply_schema_patches
+
+
+def main():
+    if engine.url.get_backend_name() != "postgresql":
+        print("Schema patches are for Postgres; nothing to do")
+        return
+    with engine.begin() as conn:
+        apply_schema_patches(conn)
+    print("Schema patches up to date")
+
+
+if __name__ == "__main__":
+    main()
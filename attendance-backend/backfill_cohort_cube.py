@@ -0,0 +1,35 @@
+"""
+Rebuild attendance_cohort_cube from attendance_summary.
+
+    python backfill_cohort_cube.py
+
+Run once after upgrading a SQLite database (Postgres fills it when the
+cube trigger patch is applied), and after deleting students or courses or
+updating them with bulk SQL on SQLite, which the backend does not see.
+Safe to re-run: the table is recomputed in a single transaction.
+"""
+import time
+from app.database import SessionLocal, engine
+from app.models.user import User
+from app.models.student import Student
+from app.models.faculty import Faculty
+from app.models.course import Course, CourseEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceSummary, AttendanceCohortCube
+from app.services.cube_service import cohort_cube
+
+
+def main():
+    AttendanceCohortCube.__table__.create(bind=engine, checkfirst=True)
+
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        rows = cohort_cube.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt {rows} cohort cells in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
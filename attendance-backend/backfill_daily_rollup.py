@@ -0,0 +1,34 @@
+"""
+Rebuild course_daily_attendance from attendance_records.
+
+    python backfill_daily_rollup.py
+
+Run once after upgrading a SQLite database (Postgres fills it when the
+rollup trigger patch is applied), or any time the rollup needs repairing.
+Safe to re-run: the table is recomputed in a single transaction.
+"""
+import time
+from app.database import SessionLocal, engine
+from app.models.user import User
+from app.models.student import Student
+from app.models.faculty import Faculty
+from app.models.course import Course, CourseEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceSummary, CourseDailyAttendance
+from app.services.rollup_service import daily_rollup
+
+
+def main():
+    CourseDailyAttendance.__table__.create(bind=engine, checkfirst=True)
+
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        rows = daily_rollup.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Rebuilt {rows} course/day rows in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Read-heavy load benchmark (app/async_database.py).
+
+Starts the API with uvicorn in a subprocess (one worker), then has
+--concurrency clients in a second process call the read endpoints below in
+turn for --seconds, as bench students and a bench faculty member.
+Reports requests per second overall and p50/p99 per endpoint. Bench data
+(bench-load-* users, one course of --students enrollments, --days of
+attendance and a few notifications each) is created on first run and kept.
+
+Usage (from attendance-backend/):
+    python -m benchmarks.bench_async_load --database-url postgresql://... \
+        [--concurrency 50] [--seconds 20] [--students 200] [--port 8766]
+
+Server settings are passed on from the environment as usual; run with
+DASHBOARD_CACHE_ENABLED=false to time the dashboard queries rather than the
+cache. To compare against another revision, run this file from a checkout
+of it (e.g. a `git worktree`) against the same database.
+"""
+import argparse
+import asyncio
+import datetime
+import multiprocessing
+import os
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+from benchmarks.bench_login_burst import serve
+
+FACULTY = "bench-load-faculty@example.edu"
+COURSE_CODE = "BENCH-LOAD"
+STUDENT_ENDPOINTS = [
+    "/api/auth/me",
+    "/api/dashboard/student",
+    "/api/students/dashboard",
+    "/api/students/trends?window=30",
+    "/api/notifications/?limit=20",
+]
+FACULTY_ENDPOINTS = ["/api/dashboard/faculty"]
+
+
+def percentiles(values):
+    if len(values) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return f"p50 {cuts[49]:7.1f}  p99 {cuts[98]:7.1f} ms"
+
+
+def seed(students, days):
+    from app.database import SessionLocal
+    from app.models.course import Course, CourseEnrollment
+    from app.models.faculty import Faculty
+    from app.models.notification import Notification
+    from app.models.student import Student
+    from app.models.user import User
+    from app.schemas.attendance import AttendanceMark
+    from app.services.attendance_service import attendance_service
+    from app.utils.security import get_password_hash
+
+    emails = [f"bench-load-{n}@example.edu" for n in range(students)]
+    db = SessionLocal()
+    try:
+        if db.query(Course.course_id).filter(Course.course_code == COURSE_CODE).first():
+            return emails
+        password_hash = get_password_hash("bench-password")
+        faculty_user = User(email=FACULTY, password_hash=password_hash, role="faculty", full_name="Bench Load")
+        db.add(faculty_user)
+        db.flush()
+        faculty = Faculty(user_id=faculty_user.user_id, employee_id="BENCH-LOAD", department="CS")
+        course = Course(course_code=COURSE_CODE, course_name="Bench Load", department="CS", semester=1,
+                        credits=3, total_classes=days)
+        db.add_all([faculty, course])
+        db.flush()
+        student_ids = []
+        for n, email in enumerate(emails):
+            user = User(email=email, password_hash=password_hash, role="student", full_name=f"Bench Load {n}")
+            db.add(user)
+            db.flush()
+            student = Student(user_id=user.user_id, roll_number=f"BL{n:05d}", department="CS", semester=1,
+                              batch_year=2024, enrollment_date=datetime.date.today())
+            db.add(student)
+            db.flush()
+            student_ids.append(student.student_id)
+            db.add(CourseEnrollment(student_id=student.student_id, course_id=course.course_id,
+                                    faculty_id=faculty.faculty_id, academic_year="2025-2026"))
+            db.add_all(Notification(user_id=user.user_id, title="Bench", message=f"Reminder {k}", type="info")
+                       for k in range(5))
+        db.commit()
+
+        today = datetime.date.today()
+        for day in range(days):
+            marks = [
+                AttendanceMark(student_id=student_id, status="absent" if (n + day) % 4 == 0 else "present")
+                for n, student_id in enumerate(student_ids)
+            ]
+            attendance_service.mark_attendance(
+                db, course.course_id, today - datetime.timedelta(days=day), marks, faculty.faculty_id
+            )
+    finally:
+        db.close()
+    return emails
+
+
+async def client_loop(client, headers, endpoints, until, results):
+    while time.monotonic() < until:
+        for url in endpoints:
+            start = time.perf_counter()
+            try:
+                status = (await client.get(url, headers=headers)).status_code
+            except httpx.TimeoutException:
+                status = "timeout"
+            results.append((url, (time.perf_counter() - start) * 1000, status))
+
+
+async def load(base_url, tokens, concurrency, seconds):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        results = []
+        # Warm up the server's pools and caches before timing
+        await client_loop(client, tokens[0][0], tokens[0][1], time.monotonic() + 1, [])
+        started = time.perf_counter()
+        until = time.monotonic() + seconds
+        await asyncio.gather(*(
+            client_loop(client, *tokens[n % len(tokens)], until, results) for n in range(concurrency)
+        ))
+    return time.perf_counter() - started, results
+
+
+def load_process(base_url, tokens, concurrency, seconds, results):
+    results.put(asyncio.run(load(base_url, tokens, concurrency, seconds)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    # Read by the settings here and in the server
+    os.environ["DATABASE_URL"] = args.database_url
+    from app.utils.security import create_access_token
+
+    # Seeded once the server has created its tables
+    server, base_url = serve(args.port)
+    try:
+        emails = seed(args.students, args.days)
+        # One faculty client in ten, the rest students
+        tokens = []
+        for n in range(args.concurrency):
+            if n % 10 == 9:
+                tokens.append(({"Authorization": "Bearer " + create_access_token({"sub": FACULTY})}, FACULTY_ENDPOINTS))
+            else:
+                email = emails[n % len(emails)]
+                tokens.append(({"Authorization": "Bearer " + create_access_token({"sub": email})}, STUDENT_ENDPOINTS))
+
+        results = multiprocessing.Queue()
+        worker = multiprocessing.Process(
+            target=load_process, args=(base_url, tokens, args.concurrency, args.seconds, results)
+        )
+        worker.start()
+        wall, requests = results.get()
+        worker.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    codes = Counter(code for _, _, code in requests)
+    print(f"{len(requests)} requests in {wall:.1f}s from {args.concurrency} clients: "
+          f"{len(requests) / wall:.1f} req/s, status codes {dict(sorted(codes.items(), key=str))}")
+    for url in STUDENT_ENDPOINTS + FACULTY_ENDPOINTS:
+        print(f"  {url:<32} {percentiles([elapsed for u, elapsed, _ in requests if u == url])}")
+
+
+if __name__ == "__main__":
+    main()
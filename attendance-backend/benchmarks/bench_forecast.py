@@ -0,0 +1,138 @@
+"""
+Shortage forecaster benchmark (app/services/forecast_service.py).
+
+Streams generated attendance histories through the same chunking and
+NumPy kernels the nightly job uses (whole_enrollments -> window_stats ->
+forecast) and reports records/second, so the full-institution run time can
+be estimated. A per-enrollment Python loop runs on the smallest size for
+comparison and an agreement check. With --database-url it also times
+ShortageForecaster.run() end to end against that database (rolled back).
+
+Usage (from attendance-backend/):
+    python -m benchmarks.bench_forecast [--records 1000000 5000000 10000000] \
+        [--sessions 60] [--chunk 200000] [--database-url postgresql://...]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.forecast_service import EPSILON, NEVER, forecast, whole_enrollments, window_stats
+
+WINDOW = 10
+HORIZON = 10
+WARNING = 80.0
+
+
+def generated_chunks(records, sessions, chunk, seed=0):
+    """(keys, attended) chunks of `records` rows, ~`sessions` per enrollment, sorted by enrollment."""
+    rng = np.random.default_rng(seed)
+    enrollments = max(1, records // sessions)
+    lengths = np.maximum(rng.poisson(sessions, enrollments), 1)
+    lengths[-1] += max(records - lengths.sum(), 0)
+    # Each enrollment drifts from its own starting rate, so some slopes are steep
+    base = rng.uniform(0.7, 1.0, enrollments)
+    drift = rng.normal(0.0, 0.004, enrollments)
+
+    enrollment = np.repeat(np.arange(enrollments), lengths)[:records]
+    position = np.arange(len(enrollment)) - np.repeat(np.cumsum(lengths) - lengths, lengths)[:records]
+    for start in range(0, len(enrollment), chunk):
+        e = enrollment[start:start + chunk]
+        p = np.clip(base[e] + drift[e] * position[start:start + chunk], 0.0, 1.0)
+        keys = np.char.add("enrollment-", e.astype(str))
+        yield keys, (rng.random(len(e)) < p).astype(np.int8)
+
+
+def run_vectorised(chunks):
+    flagged = 0
+    sessions_all = []
+    for keys, attended in whole_enrollments(chunks):
+        _, held, total, recent_n, rate, slope = window_stats(keys, attended, WINDOW)
+        current, _, sessions = forecast(held, total, recent_n, rate, slope, np.full(len(held), WARNING), HORIZON)
+        flagged += int((sessions != NEVER).sum())
+        sessions_all.append(sessions)
+    return flagged, np.concatenate(sessions_all)
+
+
+def run_loop(chunks):
+    """One enrollment at a time in plain Python, for comparison."""
+    keys = np.concatenate([k for k, _ in chunks]).tolist()
+    attended = np.concatenate([a for _, a in chunks]).tolist()
+    sessions_all = []
+    start = 0
+    while start < len(keys):
+        end = start
+        while end < len(keys) and keys[end] == keys[start]:
+            end += 1
+        history = attended[start:end]
+        held, total = len(history), sum(history)
+        recent = history[-WINDOW:]
+        n = len(recent)
+        rate = sum(recent) / n
+        t_mean = (n - 1) / 2
+        var = sum((t - t_mean) ** 2 for t in range(n))
+        slope = sum((t - t_mean) * (x - rate) for t, x in enumerate(recent)) / var if var else 0.0
+
+        result = NEVER
+        if total / held * 100 < WARNING - EPSILON:
+            result = 0
+        else:
+            cumulative = total
+            for step in range(1, HORIZON + 1):
+                cumulative += min(max(rate + slope * (t_mean + step), 0.0), 1.0)
+                if cumulative / (held + step) * 100 < WARNING - EPSILON:
+                    result = step
+                    break
+        sessions_all.append(result)
+        start = end
+    return np.array(sessions_all)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[1_000_000, 5_000_000, 10_000_000])
+    parser.add_argument("--sessions", type=int, default=60, help="average sessions per enrollment")
+    parser.add_argument("--chunk", type=int, default=200_000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    print(f"{'records':>11} {'enrollments':>11} {'flagged':>8} {'seconds':>8} {'records/s':>11}")
+    for records in args.records:
+        started = time.perf_counter()
+        flagged, sessions = run_vectorised(generated_chunks(records, args.sessions, args.chunk))
+        elapsed = time.perf_counter() - started
+        print(f"{records:>11} {len(sessions):>11} {flagged:>8} {elapsed:>8.2f} {records / elapsed:>11.0f}")
+
+    # Loop comparison on a smaller sample (the loop is slow)
+    sample = min(args.records[0], 200_000)
+    chunks = list(generated_chunks(sample, args.sessions, args.chunk))
+    started = time.perf_counter()
+    _, vector_sessions = run_vectorised(iter(chunks))
+    vector_s = time.perf_counter() - started
+    started = time.perf_counter()
+    loop_sessions = run_loop(chunks)
+    loop_s = time.perf_counter() - started
+    agree = np.array_equal(vector_sessions, loop_sessions)
+    print(f"\nloop vs numpy on {sample} records: {loop_s:.2f}s vs {vector_s:.2f}s "
+          f"({loop_s / vector_s:.1f}x), results {'agree' if agree else 'DIFFER'}")
+
+    if args.database_url:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.models.user import User
+        from app.models.faculty import Faculty
+        from app.services.forecast_service import shortage_forecaster
+
+        db = sessionmaker(bind=create_engine(args.database_url))()
+        try:
+            started = time.perf_counter()
+            result = shortage_forecaster.run(db)
+            elapsed = time.perf_counter() - started
+            db.rollback()
+        finally:
+            db.close()
+        print(f"\nend to end: {result['enrollments']} enrollments, {result['flagged']} flagged in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
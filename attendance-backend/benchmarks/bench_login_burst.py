@@ -0,0 +1,169 @@
+"""
+Login burst benchmark (app/services/password_hasher.py).
+
+Starts the API with uvicorn in a subprocess, then fires --logins
+concurrent POST /api/auth/login requests from a second process while this
+one keeps calling two endpoints that do no hashing (GET /api/auth/me and
+GET /api/courses/). Reports login p50/p99 and status codes, probe latency
+before and during the burst, and the hashing pool's queue wait / hash time
+from GET /api/auth/hasher. Bench users (bench-login-<n>@example.edu) are
+created on first run and kept.
+
+Usage (from attendance-backend/):
+    python -m benchmarks.bench_login_burst --database-url postgresql://... \
+        [--logins 500] [--users 50] [--port 8765]
+
+BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT and
+PASSWORD_HASH_TIMEOUT_SECONDS are passed on to the server from the
+environment as usual.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+PASSWORD = "bench-password"
+ADMIN = "bench-login-admin@example.edu"
+PROBES = ["/api/auth/me", "/api/courses/"]
+
+
+def percentiles(values):
+    if len(values) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return f"p50 {cuts[49]:7.1f}  p99 {cuts[98]:7.1f}  max {max(values):7.1f} ms"
+
+
+def seed_users(count):
+    from app.database import SessionLocal
+    from app.models.user import User
+    from app.utils.security import get_password_hash
+
+    emails = [f"bench-login-{n}@example.edu" for n in range(count)]
+    db = SessionLocal()
+    try:
+        existing = {email for (email,) in db.query(User.email).filter(User.email.in_(emails + [ADMIN])).all()}
+        # One hash for everyone: seeding shouldn't take longer than the run
+        password_hash = get_password_hash(PASSWORD)
+        for email in emails + [ADMIN]:
+            if email not in existing:
+                role = "admin" if email == ADMIN else "faculty"
+                db.add(User(email=email, password_hash=password_hash, role=role, full_name="Bench Login"))
+        db.commit()
+    finally:
+        db.close()
+    return emails
+
+
+def serve(port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(600):
+        try:
+            httpx.get(base_url + "/docs", timeout=1)
+            return server, base_url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("server did not start")
+
+
+async def timed(client, method, url, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    return (time.perf_counter() - start) * 1000, response
+
+
+async def login_burst(base_url, emails, logins):
+    limits = httpx.Limits(max_connections=logins, max_keepalive_connections=logins)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        results = await asyncio.gather(*(
+            timed(client, "POST", "/api/auth/login", data={"username": emails[n % len(emails)], "password": PASSWORD})
+            for n in range(logins)
+        ))
+    return time.perf_counter() - started, [(elapsed, response.status_code) for elapsed, response in results]
+
+
+def burst_process(base_url, emails, logins, results):
+    results.put(asyncio.run(login_burst(base_url, emails, logins)))
+
+
+async def probe(client, headers, until, interval=0.05):
+    """Latency of each probe endpoint, called in turn until `until()` is true."""
+    latencies = {url: [] for url in PROBES}
+    while not until():
+        for url in PROBES:
+            elapsed, _ = await timed(client, "GET", url, headers=headers)
+            latencies[url].append(elapsed)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def token(client, email):
+    response = await client.post("/api/auth/login", data={"username": email, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run(base_url, emails, logins):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        headers = await token(client, emails[0])
+        admin = await token(client, ADMIN)
+
+        idle_until = time.monotonic() + 2
+        baseline = await probe(client, headers, lambda: time.monotonic() >= idle_until)
+
+        results = multiprocessing.Queue()
+        burst = multiprocessing.Process(target=burst_process, args=(base_url, emails, logins, results))
+        burst.start()
+        during = await probe(client, headers, lambda: not burst.is_alive() or not results.empty())
+        wall, logins_done = results.get()
+        burst.join()
+
+        stats = (await client.get("/api/auth/hasher", headers=admin)).json()
+
+    codes = Counter(code for _, code in logins_done)
+    print(f"{logins} logins in {wall:.1f}s, status codes {dict(sorted(codes.items()))}")
+    print(f"  login (200s)        {percentiles([elapsed for elapsed, code in logins_done if code == 200])}")
+    for url in PROBES:
+        print(f"  {url:<19} idle   {percentiles(baseline[url])}")
+        print(f"  {'':<19} burst  {percentiles(during[url])}")
+    print(f"hashing pool: rounds {stats['rounds']}, workers {stats['workers']}, queue limit {stats['queue_limit']}, "
+          f"rejected {stats['rejected']}, timeouts {stats['timeouts']}")
+    for key in ("queue_wait_ms", "hash_ms"):
+        values = stats[key]
+        print(f"  {key:<13} p50 {values['p50']}  p99 {values['p99']}  max {values['max']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--logins", type=int, default=500)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    # Read by the settings here and in the server
+    os.environ["DATABASE_URL"] = args.database_url
+    emails = seed_users(args.users)
+    server, base_url = serve(args.port)
+    try:
+        asyncio.run(run(base_url, emails, args.logins))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Recovery projection benchmark (app/services/projection_service.py).
+
+Times the vectorised project() pass against the equivalent per-row Python
+loop on synthetic enrollments, and checks that both agree. With
+--database-url it also times ProjectionService.projections() end to end
+(query + threshold lookup + projection) over every enrollment in that
+database.
+
+Usage (from attendance-backend/):
+    python -m benchmarks.bench_projection [--sizes 10000 100000 1000000] \
+        [--trials 10] [--database-url postgresql://...]
+"""
+import argparse
+import math
+import statistics
+import time
+
+import numpy as np
+
+from app.services.projection_service import EPSILON, UNBOUNDED, project
+
+
+def synthetic(size, seed=0):
+    rng = np.random.default_rng(seed)
+    held = rng.integers(0, 60, size)
+    attended = (held * rng.uniform(0.4, 1.0, size)).astype(np.int64)
+    planned = np.where(rng.random(size) < 0.8, rng.integers(30, 61, size), 0)
+    threshold = rng.choice([75.0, 80.0, 65.0], size)
+    return held, attended, planned, threshold
+
+
+def project_loop(held, attended, planned, threshold):
+    """Row-at-a-time version of project(), for comparison."""
+    needed, can_miss = [], []
+    for h, a, n, t in zip(held.tolist(), attended.tolist(), planned.tolist(), threshold.tolist()):
+        p = t / 100.0
+        shortfall = p * h - a
+        if shortfall <= EPSILON:
+            needed.append(0)
+        elif p >= 1.0:
+            needed.append(UNBOUNDED)
+        else:
+            needed.append(math.ceil(shortfall / (1.0 - p) - EPSILON))
+        if n > 0:
+            final = max(n, h)
+            remaining = final - h
+            can_miss.append(int(min(max(math.floor(a + remaining - p * final + EPSILON), 0), remaining)))
+        elif p > 0:
+            can_miss.append(max(math.floor(a / p - h + EPSILON), 0))
+        else:
+            can_miss.append(UNBOUNDED)
+    return needed, can_miss
+
+
+def timed(fn, trials):
+    timings = []
+    for _ in range(trials):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    print(f"{'enrollments':>11} {'numpy ms':>9} {'loop ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        arrays = synthetic(size)
+        vector_ms, result = timed(lambda: project(*arrays), args.trials)
+        loop_ms, (needed, can_miss) = timed(lambda: project_loop(*arrays), max(1, args.trials // 5))
+        if needed != result["classes_needed"].tolist() or can_miss != result["can_miss"].tolist():
+            print(f"WARNING: numpy and loop results differ at {size}")
+        print(f"{size:>11} {vector_ms:>9.2f} {loop_ms:>9.2f} {loop_ms / vector_ms:>7.1f}x")
+
+    if args.database_url:
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.models.user import User
+        from app.models.faculty import Faculty
+        from app.services.projection_service import projection_service
+
+        db = sessionmaker(bind=create_engine(args.database_url))()
+        try:
+            total_ms, data = timed(lambda: projection_service.projections(db, limit=500), args.trials)
+        finally:
+            db.close()
+        print(f"end to end over {data['totals']['enrollments']} enrollments: {total_ms:.1f} ms median")
+
+
+if __name__ == "__main__":
+    main()
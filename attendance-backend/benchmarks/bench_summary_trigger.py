@@ -0,0 +1,243 @@
+"""
+Per-row vs per-statement attendance_summary trigger benchmark.
+
+Builds a scratch schema holding N attendance records spread over a fixed
+number of enrollments, then times a 120-row bulk mark (one upsert
+statement, like AttendanceService.mark_attendance) under:
+
+  none       no summary trigger (lower bound)
+  row        the original FOR EACH ROW update_attendance_summary()
+  statement  the transition-table trigger from app/schema_patches.py
+
+Every trial runs in its own transaction and is rolled back, so all trials
+see the same data. Requires Postgres 13+.
+
+Usage (from attendance-backend/):
+    python -m benchmarks.bench_summary_trigger --database-url postgresql://... \
+        [--sizes 10000 100000 1000000] [--enrollments 1000] [--trials 30]
+"""
+import argparse
+import os
+import statistics
+import time
+
+import psycopg2
+
+from app.schema_patches import SUMMARY_DELTA_TRIGGER_SQL
+
+SCHEMA = "bench_summary_trigger"
+BATCH_SIZE = 120
+
+TABLES_SQL = """
+CREATE TABLE course_enrollments (
+    enrollment_id UUID PRIMARY KEY
+);
+CREATE TABLE attendance_records (
+    attendance_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    enrollment_id UUID REFERENCES course_enrollments(enrollment_id) ON DELETE CASCADE,
+    class_date DATE NOT NULL,
+    status VARCHAR(10) NOT NULL,
+    marked_by UUID,
+    marked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    remarks TEXT,
+    CONSTRAINT uq_enrollment_date UNIQUE (enrollment_id, class_date)
+);
+CREATE TABLE attendance_summary (
+    summary_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    enrollment_id UUID UNIQUE REFERENCES course_enrollments(enrollment_id) ON DELETE CASCADE,
+    total_classes INTEGER DEFAULT 0,
+    classes_attended INTEGER DEFAULT 0,
+    classes_absent INTEGER DEFAULT 0,
+    classes_late INTEGER DEFAULT 0,
+    classes_excused INTEGER DEFAULT 0,
+    attendance_percentage DECIMAL(5,2) DEFAULT 0.00,
+    shortage_status BOOLEAN DEFAULT FALSE,
+    last_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# The original per-row trigger (formerly in database_setup/02_triggers.sql), kept verbatim
+ROW_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION update_attendance_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO attendance_summary (
+        enrollment_id, total_classes, classes_attended,
+        classes_absent, classes_late, classes_excused,
+        attendance_percentage, last_updated
+    )
+    SELECT
+        NEW.enrollment_id,
+        COUNT(*) as total_classes,
+        SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END) as classes_attended,
+        SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END) as classes_absent,
+        SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END) as classes_late,
+        SUM(CASE WHEN status = 'excused' THEN 1 ELSE 0 END) as classes_excused,
+        CASE
+            WHEN COUNT(*) > 0 THEN
+                ROUND((SUM(CASE WHEN status IN ('present', 'late') THEN 1 ELSE 0 END)::DECIMAL / COUNT(*)) * 100, 2)
+            ELSE 0
+        END as attendance_percentage,
+        CURRENT_TIMESTAMP
+    FROM attendance_records
+    WHERE enrollment_id = NEW.enrollment_id
+    ON CONFLICT (enrollment_id)
+    DO UPDATE SET
+        total_classes = EXCLUDED.total_classes,
+        classes_attended = EXCLUDED.classes_attended,
+        classes_absent = EXCLUDED.classes_absent,
+        classes_late = EXCLUDED.classes_late,
+        classes_excused = EXCLUDED.classes_excused,
+        attendance_percentage = EXCLUDED.attendance_percentage,
+        last_updated = CURRENT_TIMESTAMP;
+
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_update_attendance_summary
+AFTER INSERT OR UPDATE OR DELETE ON attendance_records
+FOR EACH ROW
+EXECUTE FUNCTION update_attendance_summary();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS trigger_update_attendance_summary ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_attendance_summary_insert ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_attendance_summary_update ON attendance_records;
+DROP TRIGGER IF EXISTS trigger_attendance_summary_delete ON attendance_records;
+"""
+
+# Marks BATCH_SIZE enrollments for one date in a single upsert statement
+MARK_SQL = """
+INSERT INTO attendance_records (enrollment_id, class_date, status)
+SELECT enrollment_id, %(class_date)s, %(status)s FROM bench_batch
+ON CONFLICT (enrollment_id, class_date)
+DO UPDATE SET status = EXCLUDED.status, marked_at = CURRENT_TIMESTAMP
+"""
+
+RECOUNT_MISMATCHES_SQL = """
+SELECT COUNT(*) FROM attendance_summary s
+JOIN (
+    SELECT enrollment_id, COUNT(*) AS total,
+           SUM(CASE WHEN status IN ('present', 'late') THEN 1 ELSE 0 END) AS attended
+    FROM attendance_records GROUP BY enrollment_id
+) r USING (enrollment_id)
+WHERE s.total_classes <> r.total
+   OR s.classes_attended + s.classes_late <> r.attended
+"""
+
+
+def setup_data(cur, records, enrollments):
+    history = max(1, records // enrollments)
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute(TABLES_SQL)
+    cur.execute(
+        "INSERT INTO course_enrollments SELECT gen_random_uuid() FROM generate_series(1, %s)",
+        (enrollments,),
+    )
+    cur.execute("""
+        INSERT INTO attendance_records (enrollment_id, class_date, status)
+        SELECT e.enrollment_id, DATE '2020-01-01' + g,
+               (ARRAY['present', 'present', 'present', 'late', 'absent', 'excused'])[1 + floor(random() * 6)::INT]
+        FROM course_enrollments e CROSS JOIN generate_series(0, %s - 1) g
+    """, (history,))
+    cur.execute("""
+        INSERT INTO attendance_summary (
+            enrollment_id, total_classes, classes_attended, classes_absent,
+            classes_late, classes_excused, attendance_percentage
+        )
+        SELECT enrollment_id, COUNT(*),
+               SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'excused' THEN 1 ELSE 0 END),
+               ROUND((SUM(CASE WHEN status IN ('present', 'late') THEN 1 ELSE 0 END)::DECIMAL / COUNT(*)) * 100, 2)
+        FROM attendance_records GROUP BY enrollment_id
+    """)
+    cur.execute(
+        "CREATE TABLE bench_batch AS SELECT enrollment_id FROM course_enrollments ORDER BY random() LIMIT %s",
+        (BATCH_SIZE,),
+    )
+    cur.execute("ANALYZE")
+    return history
+
+
+def install(cur, variant):
+    cur.execute(DROP_TRIGGERS_SQL)
+    if variant == "row":
+        cur.execute(ROW_TRIGGER_SQL)
+    elif variant == "statement":
+        cur.execute(SUMMARY_DELTA_TRIGGER_SQL)
+
+
+def time_marks(conn, trials, remark):
+    timings = []
+    with conn.cursor() as cur:
+        for i in range(trials):
+            # A fresh date inserts 120 rows; an existing one updates them
+            class_date = "2020-01-01" if remark else f"2030-01-{1 + i % 28:02d}"
+            status = "absent" if i % 2 else "late"
+            start = time.perf_counter()
+            cur.execute(MARK_SQL, {"class_date": class_date, "status": status})
+            timings.append((time.perf_counter() - start) * 1000)
+            conn.rollback()
+    return timings
+
+
+def check_consistency(conn):
+    with conn.cursor() as cur:
+        cur.execute(MARK_SQL, {"class_date": "2031-01-01", "status": "present"})
+        cur.execute(MARK_SQL, {"class_date": "2020-01-01", "status": "absent"})
+        cur.execute(RECOUNT_MISMATCHES_SQL)
+        mismatches = cur.fetchone()[0]
+    conn.rollback()
+    return mismatches
+
+
+def fmt(timings):
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    return f"{statistics.median(timings):9.2f} {p95:9.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--enrollments", type=int, default=1000)
+    parser.add_argument("--trials", type=int, default=30)
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("--database-url or BENCH_DATABASE_URL is required")
+
+    conn = psycopg2.connect(args.database_url)
+    try:
+        print(f"{BATCH_SIZE}-row bulk mark, {args.trials} trials, times in ms")
+        print(f"{'records':>9} {'history':>7} {'trigger':>9} {'op':>6} {'median':>9} {'p95':>9}")
+        for size in args.sizes:
+            with conn.cursor() as cur:
+                history = setup_data(cur, size, args.enrollments)
+            conn.commit()
+            for variant in ("none", "row", "statement"):
+                with conn.cursor() as cur:
+                    install(cur, variant)
+                conn.commit()
+                if variant != "none":
+                    mismatches = check_consistency(conn)
+                    if mismatches:
+                        print(f"WARNING: {variant} trigger left {mismatches} summaries out of step")
+                for op, remark in (("insert", False), ("update", True)):
+                    timings = time_marks(conn, args.trials, remark)
+                    print(f"{size:>9} {history:>7} {variant:>9} {op:>6} {fmt(timings)}")
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
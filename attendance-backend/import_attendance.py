@@ -0,0 +1,68 @@
+"""
+Backfill attendance from a CSV of roll_number, course_code, date, status.
+
+    python import_attendance.py registers.csv [--rejects rejects.csv]
+        [--chunk-size 5000] [--marked-by FAC001]
+
+The file is streamed and committed in chunks; rows that cannot be resolved
+are written to the rejects file with their line number and reason.
+"""
+import argparse
+import csv
+import sys
+import time
+from app.database import SessionLocal
+from app.models.user import User
+from app.models.student import Student
+from app.models.faculty import Faculty
+from app.models.course import Course, CourseEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceSummary
+from app.services.import_service import AttendanceImporter, DEFAULT_CHUNK_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import attendance records from CSV")
+    parser.add_argument("csv_path")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <csv_path>.rejects.csv)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--marked-by", help="employee_id recorded as marked_by")
+    args = parser.parse_args()
+
+    rejects_path = args.rejects or f"{args.csv_path}.rejects.csv"
+    started = time.monotonic()
+
+    def report(stats):
+        rate = stats["processed"] / max(time.monotonic() - started, 1e-6)
+        print(
+            f"chunk {stats['chunks']}: {stats['processed']} rows read, "
+            f"{stats['written']} written, {stats['rejected']} rejected ({rate:.0f} rows/s)"
+        )
+
+    db = SessionLocal()
+    try:
+        marked_by = None
+        if args.marked_by:
+            faculty = db.query(Faculty).filter(Faculty.employee_id == args.marked_by).first()
+            if not faculty:
+                sys.exit(f"No faculty with employee_id {args.marked_by}")
+            marked_by = faculty.faculty_id
+
+        with open(args.csv_path, newline="", encoding="utf-8-sig") as src, \
+                open(rejects_path, "w", newline="", encoding="utf-8") as rej:
+            importer = AttendanceImporter(db, marked_by=marked_by, chunk_size=args.chunk_size, progress=report)
+            stats = importer.run(src, rejects=csv.writer(rej))
+    except ValueError as e:
+        sys.exit(str(e))
+    finally:
+        db.close()
+
+    print(
+        f"Done: {stats['processed']} rows, {stats['written']} written, "
+        f"{stats['rejected']} rejected in {time.monotonic() - started:.1f}s"
+    )
+    if stats["rejected"]:
+        print(f"Rejected rows written to {rejects_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Run one shortage sweep (shortage status, today's shortage reports and
+notifications for students whose status changed).
+
+    python run_shortage_sweep.py
+
+The API already sweeps every SHORTAGE_SWEEP_INTERVAL_SECONDS; use this from
+cron when that is set to 0, or to catch up straight after an upgrade.
+"""
+import time
+from app.models.user import User
+from app.models.student import Student
+from app.models.faculty import Faculty
+from app.models.course import Course, CourseEnrollment
+from app.models.attendance import AttendanceRecord, AttendanceSummary, ShortageReport
+from app.models.notification import Notification
+from app.services.shortage_service import shortage_sweep
+
+
+def main():
+    started = time.monotonic()
+    result = shortage_sweep.sweep()
+    print(f"Shortage sweep: {result} in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
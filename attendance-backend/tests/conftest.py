@@ -0,0 +1,114 @@
+"""
+Fixtures for the API tests: the app on a scratch SQLite database, and a
+fresh course with its own faculty member, admin and enrolled students for
+every test, so tests never share rows (the in-process caches are keyed on
+those ids and are left as they are).
+"""
+import datetime
+import os
+import tempfile
+import uuid
+from types import SimpleNamespace
+
+# Settings are read when app modules are imported: configure them first.
+# Never the DATABASE_URL from .env.
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="attendance-tests-"), "test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "test")
+os.environ["SHORTAGE_SWEEP_INTERVAL_SECONDS"] = "0"
+os.environ["LIVE_MARKING_FLUSH_MS"] = "100"
+# Idle sockets send a ping every second, so a missing event fails a test instead of hanging it
+os.environ["LIVE_FEED_HEARTBEAT_SECONDS"] = "1"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.database import SessionLocal
+from app.models.course import Course, CourseEnrollment
+from app.models.faculty import Faculty
+from app.models.student import Student
+from app.models.user import User
+from app.utils.security import create_access_token, get_password_hash
+
+PASSWORD = "password123"
+STUDENTS = 4
+
+
+def bearer(email):
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})}
+
+
+@pytest.fixture(scope="session")
+def client():
+    # One client (and event loop) for the run, as under uvicorn
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def password_hash():
+    return get_password_hash(PASSWORD)
+
+
+@pytest.fixture
+def roster(password_hash):
+    """A course taught by a new faculty member, with STUDENTS enrolled."""
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        def user(email, role, name):
+            u = User(email=email, password_hash=password_hash, role=role, full_name=name)
+            db.add(u)
+            db.flush()
+            return u
+
+        faculty_user = user(f"faculty-{tag}@example.edu", "faculty", "Faculty")
+        admin_user = user(f"admin-{tag}@example.edu", "admin", "Admin")
+        faculty = Faculty(user_id=faculty_user.user_id, employee_id=f"F-{tag}", department="CS")
+        course = Course(course_code=f"CS-{tag}", course_name="Testing", department="CS", semester=3,
+                        credits=3, total_classes=40)
+        db.add_all([faculty, course])
+        db.flush()
+
+        students = []
+        for n in range(STUDENTS):
+            u = user(f"student-{n}-{tag}@example.edu", "student", f"Student {n}")
+            student = Student(user_id=u.user_id, roll_number=f"R-{tag}-{n}", department="CS", semester=3,
+                               batch_year=2023, enrollment_date=datetime.date.today())
+            db.add(student)
+            db.flush()
+            db.add(CourseEnrollment(student_id=student.student_id, course_id=course.course_id,
+                                    faculty_id=faculty.faculty_id, academic_year="2025-2026"))
+            students.append((u, student))
+        db.commit()
+
+        return SimpleNamespace(
+            course_id=str(course.course_id),
+            course_code=course.course_code,
+            faculty_id=faculty.faculty_id,
+            faculty_email=faculty_user.email,
+            faculty=bearer(faculty_user.email),
+            admin=bearer(admin_user.email),
+            student_ids=[str(student.student_id) for _, student in students],
+            roll_numbers=[student.roll_number for _, student in students],
+            student_emails=[u.email for u, _ in students],
+            students=[bearer(u.email) for u, _ in students],
+        )
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def mark(client, roster):
+    """mark({student index: status}, days_ago=0, headers=faculty) -> response."""
+    def mark(statuses, days_ago=0, headers=None, **kwargs):
+        return client.post("/api/faculty/attendance/mark", json={
+            "course_id": roster.course_id,
+            "class_date": str(datetime.date.today() - datetime.timedelta(days=days_ago)),
+            "attendance_data": [
+                {"student_id": roster.student_ids[n], "status": status} for n, status in statuses.items()
+            ],
+        }, headers=headers or roster.faculty, **kwargs)
+    return mark
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+from app.database import SessionLocal
+from app.services.admin_snapshot import AdminDashboardSnapshot
+
+
+def dashboard(client, roster, **params):
+    response = client.get("/api/dashboard/admin", params=params, headers=roster.admin)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_refresh_rebuilds_from_the_tables(client, roster, mark):
+    mark({0: "present", 1: "absent"})
+    body = dashboard(client, roster, refresh=True)
+    assert body["snapshot"]["pending_writes"] == 0
+
+    db = SessionLocal()
+    try:
+        assert {k: v for k, v in body.items() if k != "snapshot"} == AdminDashboardSnapshot.build(db)
+    finally:
+        db.close()
+    (course,) = [c for c in body["course_performance"] if c["name"] == roster.course_code]
+    assert (course["present"], course["absent"]) == (50.0, 50.0)
+
+
+def test_committed_writes_are_pending_until_the_next_build(client, roster, mark):
+    before = dashboard(client, roster, refresh=True)
+
+    mark({0: "present", 1: "absent"})
+    # Unchanged marks don't count
+    mark({0: "present"})
+    body = dashboard(client, roster)
+    assert body["snapshot"]["pending_writes"] == 2
+    assert body["snapshot"]["generated_at"] == before["snapshot"]["generated_at"]
+    assert roster.course_code not in [c["name"] for c in body["course_performance"]]
+
+    body = dashboard(client, roster, refresh=True)
+    assert body["snapshot"]["pending_writes"] == 0
+    assert roster.course_code in [c["name"] for c in body["course_performance"]]
+
+
+def test_rebuilt_inline_when_due_without_the_refresh_thread(roster):
+    snapshot = AdminDashboardSnapshot(interval_seconds=3600, max_writes=2)
+    db = SessionLocal()
+    try:
+        first = snapshot.get(db)
+        assert snapshot.get(db)["snapshot"]["generated_at"] == first["snapshot"]["generated_at"]
+
+        snapshot._commit(SimpleNamespace(info={"admin_snapshot_writes": 1}))
+        assert snapshot.get(db)["snapshot"]["pending_writes"] == 1
+        snapshot._commit(SimpleNamespace(info={"admin_snapshot_writes": 1}))
+        rebuilt = snapshot.get(db)
+    finally:
+        db.close()
+    assert rebuilt["snapshot"]["pending_writes"] == 0
+    assert rebuilt["snapshot"]["generated_at"] != first["snapshot"]["generated_at"]
+
+
+def test_admins_only(client, roster):
+    assert client.get("/api/dashboard/admin", headers=roster.faculty).status_code == 403
@@ -0,0 +1,50 @@
+from app.async_database import async_engine
+from conftest import PASSWORD
+
+
+def login(client, email, password):
+    return client.post("/api/auth/login", data={"username": email, "password": password})
+
+
+def test_login_issues_a_token_for_the_right_password(client, roster):
+    response = login(client, roster.student_emails[0], PASSWORD)
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+    me = client.get("/api/auth/me", headers={"Authorization": "Bearer " + token})
+    assert me.json()["email"] == roster.student_emails[0]
+
+    assert login(client, roster.student_emails[0], "wrong-password").status_code == 401
+    assert login(client, "nobody@example.edu", PASSWORD).status_code == 401
+
+
+def test_change_password(client, roster):
+    email, headers = roster.student_emails[0], roster.students[0]
+    wrong = client.put("/api/auth/change-password", json={"old_password": "nope", "new_password": "secret99"},
+                       headers=headers)
+    assert wrong.status_code == 400
+    short = client.put("/api/auth/change-password", json={"old_password": PASSWORD, "new_password": "abc"},
+                       headers=headers)
+    assert short.status_code == 400
+
+    changed = client.put("/api/auth/change-password", json={"old_password": PASSWORD, "new_password": "secret99"},
+                         headers=headers)
+    assert changed.status_code == 200
+    assert async_engine.pool.checkedout() == 0
+    assert login(client, email, "secret99").status_code == 200
+    assert login(client, email, PASSWORD).status_code == 401
+
+
+def test_register_creates_the_profile(client, roster):
+    email = "new-" + roster.faculty_email
+    response = client.post("/api/auth/register", json={
+        "email": email, "password": "secret99", "full_name": "New Student", "role": "student",
+    })
+    assert response.status_code == 200, response.text
+    assert response.json()["email"] == email
+    assert client.post("/api/auth/register", json={
+        "email": email, "password": "secret99", "full_name": "Again", "role": "student",
+    }).status_code == 400
+
+    token = login(client, email, "secret99").json()["access_token"]
+    dashboard = client.get("/api/students/dashboard", headers={"Authorization": "Bearer " + token})
+    assert dashboard.status_code == 200
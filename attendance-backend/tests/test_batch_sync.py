@@ -0,0 +1,72 @@
+import datetime
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord
+from app.models.course import CourseEnrollment
+
+
+def now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def sync(client, roster, sessions):
+    response = client.post("/api/faculty/attendance/batch", json={"sessions": [
+        {
+            "course_id": roster.course_id,
+            "class_date": str(datetime.date.today() - datetime.timedelta(days=days_ago)),
+            "last_synced_at": synced_at.isoformat() if synced_at else None,
+            "attendance_data": [
+                {"student_id": roster.student_ids[n], "status": status} for n, status in statuses.items()
+            ],
+        }
+        for days_ago, synced_at, statuses in sessions
+    ]}, headers=roster.faculty)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def status(roster, n, days_ago=0):
+    db = SessionLocal()
+    try:
+        return db.query(AttendanceRecord.status).join(
+            CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+        ).filter(
+            CourseEnrollment.student_id == UUID(roster.student_ids[n]),
+            AttendanceRecord.class_date == datetime.date.today() - datetime.timedelta(days=days_ago),
+        ).scalar()
+    finally:
+        db.close()
+
+
+def test_sessions_share_one_request(client, roster):
+    body = sync(client, roster, [
+        (1, None, {0: "present", 1: "absent"}),
+        (0, None, {0: "late"}),
+    ])
+    assert (body["inserted"], body["conflicts"], body["failed"]) == (3, 0, 0)
+    assert [s["status"] for s in body["sessions"]] == ["ok", "ok"]
+    assert (status(roster, 1, days_ago=1), status(roster, 0)) == ("absent", "late")
+
+
+def test_rows_changed_after_the_last_sync_are_conflicts(client, roster, mark):
+    synced_at = now()
+    # Marked on the server after the tablet pulled, within the same second
+    assert mark({0: "absent"}).status_code == 200
+
+    body = sync(client, roster, [(0, synced_at, {0: "present", 1: "present"})])
+    (result,) = [r for r in body["sessions"][0]["results"] if r["student_id"] == roster.student_ids[0]]
+    assert result["outcome"] == "conflict"
+    assert result["server_status"] == "absent"
+    assert datetime.datetime.fromisoformat(result["server_marked_at"]) > synced_at
+    assert (body["conflicts"], body["inserted"]) == (1, 1)
+    assert status(roster, 0) == "absent"
+
+
+def test_rows_changed_before_the_last_sync_are_overwritten(client, roster, mark):
+    assert mark({0: "absent"}).status_code == 200
+    synced_at = now()
+
+    body = sync(client, roster, [(0, synced_at, {0: "present"})])
+    assert (body["updated"], body["conflicts"]) == (1, 0)
+    assert status(roster, 0) == "present"
+
@@ -0,0 +1,71 @@
+import datetime
+import uuid
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord
+from app.models.course import CourseEnrollment
+
+
+def bulk(client, roster, marks, headers=None):
+    return client.post("/api/attendance/bulk", json={
+        "course_id": roster.course_id,
+        "class_date": str(datetime.date.today()),
+        "attendance_data": marks,
+    }, headers=headers or roster.faculty)
+
+
+def records(roster):
+    db = SessionLocal()
+    try:
+        return {
+            str(student_id): (status, remarks)
+            for student_id, status, remarks in db.query(
+                CourseEnrollment.student_id, AttendanceRecord.status, AttendanceRecord.remarks
+            ).join(
+                AttendanceRecord, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+            ).filter(CourseEnrollment.course_id == UUID(roster.course_id)).all()
+        }
+    finally:
+        db.close()
+
+
+def test_first_marking_inserts_every_row(client, roster):
+    response = bulk(client, roster, [{"student_id": s, "status": "present"} for s in roster.student_ids])
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["inserted"], body["updated"], body["unchanged"], body["skipped"]) == (4, 0, 0, 0)
+    assert {outcome["outcome"] for outcome in body["results"]} == {"inserted"}
+    assert set(records(roster).values()) == {("present", None)}
+
+
+def test_remarking_writes_only_what_changed(client, roster):
+    bulk(client, roster, [{"student_id": s, "status": "present"} for s in roster.student_ids])
+
+    body = bulk(client, roster, [
+        {"student_id": roster.student_ids[0], "status": "absent"},
+        {"student_id": roster.student_ids[1], "status": "present", "remarks": "left early"},
+        {"student_id": roster.student_ids[2], "status": "present"},
+        {"student_id": roster.student_ids[3], "status": "present"},
+    ]).json()
+    assert (body["inserted"], body["updated"], body["unchanged"]) == (0, 2, 2)
+    assert records(roster)[roster.student_ids[0]] == ("absent", None)
+    assert records(roster)[roster.student_ids[1]] == ("present", "left early")
+
+
+def test_unenrolled_students_are_skipped_and_duplicates_keep_the_last(client, roster):
+    stranger = str(uuid.uuid4())
+    body = bulk(client, roster, [
+        {"student_id": roster.student_ids[0], "status": "present"},
+        {"student_id": stranger, "status": "present"},
+        {"student_id": roster.student_ids[0], "status": "late"},
+    ]).json()
+    assert (body["inserted"], body["skipped"]) == (1, 1)
+    assert {"student_id": stranger, "outcome": "skipped_not_enrolled"} in body["results"]
+    assert records(roster) == {roster.student_ids[0]: ("late", None)}
+
+
+def test_students_cannot_mark(client, roster):
+    response = bulk(client, roster, [{"student_id": roster.student_ids[0], "status": "present"}],
+                    headers=roster.students[0])
+    assert response.status_code == 403
+    assert records(roster) == {}
@@ -0,0 +1,77 @@
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.course import Course
+from app.models.student import Student
+from app.services.cube_service import CUBE_DIMENSIONS, cohort_cube
+
+
+def cube():
+    """Every cube cell, as maintained and as rebuilt from attendance_summary."""
+    db = SessionLocal()
+    try:
+        maintained = cohort_cube.query(db, list(CUBE_DIMENSIONS))
+        cohort_cube.rebuild(db)
+        rebuilt = cohort_cube.query(db, list(CUBE_DIMENSIONS))
+        db.rollback()
+        return maintained, rebuilt
+    finally:
+        db.close()
+
+
+def cell(cells, student_department="CS", course_department="CS"):
+    (found,) = [
+        c for c in cells
+        if (c["student_department"], c["course_department"], c["semester"], c["batch_year"], c["academic_year"])
+        == (student_department, course_department, 3, 2023, "2025-2026")
+    ] or [None]
+    return found
+
+
+def test_marks_keep_the_cube_in_step(roster, mark):
+    mark({0: "present", 1: "absent", 2: "late"}, days_ago=1)
+    mark({0: "absent", 1: "absent"})
+    # Re-marking moves counts between measures
+    mark({1: "excused"})
+
+    maintained, rebuilt = cube()
+    assert maintained == rebuilt
+    assert cell(maintained)["enrollments"] >= 3
+
+
+def test_dimension_changes_move_contributions(roster, mark):
+    mark({0: "present", 1: "absent"})
+    db = SessionLocal()
+    try:
+        db.get(Student, UUID(roster.student_ids[0])).department = "EE"
+        db.get(Course, UUID(roster.course_id)).department = "MATH"
+        db.commit()
+    finally:
+        db.close()
+
+    maintained, rebuilt = cube()
+    assert maintained == rebuilt
+    moved = cell(maintained, "EE", "MATH")
+    assert (moved["enrollments"], moved["total_classes"], moved["classes_attended"]) == (1, 1, 1)
+
+
+def test_cohorts_roll_up_by_the_requested_dimensions(client, roster, mark):
+    mark({0: "present", 1: "absent", 2: "present", 3: "late"})
+
+    response = client.get(
+        "/api/dashboard/admin/cohorts",
+        params={"group_by": ["course_department", "semester"], "course_department": "CS", "semester": 3},
+        headers=roster.admin,
+    )
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["filters"] == {"course_department": "CS", "semester": 3}
+    (cohort,) = body["cohorts"]
+    assert (cohort["course_department"], cohort["semester"]) == ("CS", 3)
+    db = SessionLocal()
+    try:
+        (total,) = cohort_cube.query(db, filters={"course_department": "CS", "semester": 3})
+    finally:
+        db.close()
+    assert {k: v for k, v in cohort.items() if k not in ("course_department", "semester")} == total
+
+    assert client.get("/api/dashboard/admin/cohorts", headers=roster.faculty).status_code == 403
@@ -0,0 +1,78 @@
+import base64
+import datetime
+from uuid import UUID
+import pytest
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord
+from app.models.course import CourseEnrollment
+from app.schemas.attendance import CompactAttendanceCreate
+
+
+def bitmap(*bytes_):
+    return base64.b64encode(bytes(bytes_)).decode()
+
+
+def compact(roster, present, **extra):
+    return {
+        "course_id": roster.course_id,
+        "class_date": str(datetime.date.today()),
+        "roster": roster.student_ids,
+        "present": present,
+        **extra,
+    }
+
+
+def records(roster):
+    db = SessionLocal()
+    try:
+        return {
+            str(student_id): (status, remarks)
+            for student_id, status, remarks in db.query(
+                CourseEnrollment.student_id, AttendanceRecord.status, AttendanceRecord.remarks
+            ).join(
+                AttendanceRecord, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+            ).filter(CourseEnrollment.course_id == UUID(roster.course_id)).all()
+        }
+    finally:
+        db.close()
+
+
+def test_bitmap_decodes_least_significant_bit_first():
+    roster = [UUID(int=n) for n in range(10)]
+    body = CompactAttendanceCreate(
+        course_id=UUID(int=99), class_date=datetime.date.today(), roster=roster,
+        present=bitmap(0b10000101, 0b10), exceptions={1: "late"}, remarks={2: "note"},
+    )
+    assert [status for _, status, _ in body._marks] == [
+        "present", "late", "present", "absent", "absent", "absent", "absent", "present", "absent", "present",
+    ]
+    assert body._marks[2] == (roster[2], "present", "note")
+
+
+def test_compact_payload_marks_the_roster(client, roster):
+    response = client.post("/api/faculty/attendance/mark", json=compact(
+        roster, bitmap(0b0101), exceptions={"1": "excused"}, remarks={"3": "bus late"},
+    ), headers=roster.faculty)
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 4
+    assert records(roster) == {
+        roster.student_ids[0]: ("present", None),
+        roster.student_ids[1]: ("excused", None),
+        roster.student_ids[2]: ("present", None),
+        roster.student_ids[3]: ("absent", "bus late"),
+    }
+
+
+@pytest.mark.parametrize("present, extra", [
+    (bitmap(0b0101, 0), {}),                      # a byte too many
+    (bitmap(), {}),                               # a byte too few
+    (bitmap(0b10101), {}),                        # a bit past the roster
+    (bitmap(0b0101), {"exceptions": {"4": "late"}}),
+    (bitmap(0b0101), {"exceptions": {"0": "asleep"}}),
+    (bitmap(0b0101), {"remarks": {"-1": "x"}}),
+])
+def test_malformed_payloads_are_422(client, roster, present, extra):
+    response = client.post("/api/faculty/attendance/mark", json=compact(roster, present, **extra),
+                           headers=roster.faculty)
+    assert response.status_code == 422
+    assert records(roster) == {}
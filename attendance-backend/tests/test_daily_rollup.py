@@ -0,0 +1,69 @@
+import datetime
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.attendance import CourseDailyAttendance
+from app.services.rollup_service import daily_rollup
+
+TODAY = datetime.date.today()
+
+
+def rollup(roster):
+    """{days ago: (present, late, absent, excused)} for the course."""
+    db = SessionLocal()
+    try:
+        return {
+            (TODAY - row.class_date).days: (row.present_count, row.late_count, row.absent_count, row.excused_count)
+            for row in db.query(CourseDailyAttendance).filter(
+                CourseDailyAttendance.course_id == UUID(roster.course_id)
+            )
+        }
+    finally:
+        db.close()
+
+
+def rebuilt(roster):
+    """rollup() as recounted from attendance_records."""
+    db = SessionLocal()
+    try:
+        daily_rollup.rebuild(db)
+        db.flush()
+        return {
+            (TODAY - row.class_date).days: (row.present_count, row.late_count, row.absent_count, row.excused_count)
+            for row in db.query(CourseDailyAttendance).filter(
+                CourseDailyAttendance.course_id == UUID(roster.course_id)
+            )
+        }
+    finally:
+        db.rollback()
+        db.close()
+
+
+def test_marks_are_counted_per_day(roster, mark):
+    mark({0: "present", 1: "present", 2: "absent", 3: "late"}, days_ago=1)
+    mark({0: "excused", 1: "absent"})
+
+    assert rollup(roster) == {1: (2, 1, 1, 0), 0: (0, 0, 1, 1)}
+    assert rollup(roster) == rebuilt(roster)
+
+
+def test_remarking_moves_the_counts(roster, mark):
+    mark({0: "present", 1: "present"})
+    mark({0: "absent", 1: "present", 2: "late"})
+
+    assert rollup(roster) == {0: (1, 1, 1, 0)}
+    assert rollup(roster) == rebuilt(roster)
+
+
+def test_faculty_dashboard_reads_the_last_week(client, roster, mark):
+    mark({0: "present", 1: "late", 2: "absent"}, days_ago=2)
+    mark({0: "present"}, days_ago=9)
+
+    response = client.get("/api/dashboard/faculty", headers=roster.faculty)
+    assert response.status_code == 200, response.text
+    activity = response.json()["daily_activity"]
+    assert len(activity) == 7
+    # Late counts as present
+    assert activity[4] == {
+        "date": (TODAY - datetime.timedelta(days=2)).strftime("%b %d"), "present": 2, "absent": 1,
+    }
+    assert sum(day["present"] + day["absent"] for day in activity) == 3
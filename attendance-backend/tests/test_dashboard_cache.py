@@ -0,0 +1,49 @@
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.course import Course
+from app.services.dashboard_cache import student_dashboard_cache
+
+
+def dashboard(client, headers):
+    response = client.get("/api/students/dashboard", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_dashboard_is_served_from_cache(client, roster):
+    first = dashboard(client, roster.students[0])
+    hits = student_dashboard_cache.hits
+
+    assert dashboard(client, roster.students[0]) == first
+    assert student_dashboard_cache.hits == hits + 1
+
+
+def test_marking_drops_the_students_dashboard(client, roster, mark):
+    assert dashboard(client, roster.students[0])["overall_percentage"] == 0
+    assert dashboard(client, roster.students[1])["overall_percentage"] == 0
+
+    mark({0: "present"})
+    assert dashboard(client, roster.students[0])["overall_percentage"] == 100
+
+    mark({0: "absent"}, days_ago=1)
+    assert dashboard(client, roster.students[0])["overall_percentage"] == 50
+
+    # Not marked: still cached
+    hits = student_dashboard_cache.hits
+    dashboard(client, roster.students[1])
+    assert student_dashboard_cache.hits == hits + 1
+
+
+def test_rolled_back_write_keeps_the_dashboard(client, roster):
+    dashboard(client, roster.students[0])
+    db = SessionLocal()
+    try:
+        db.query(Course).first()
+        student_dashboard_cache.invalidate(db, [UUID(roster.student_ids[0])])
+        db.rollback()
+    finally:
+        db.close()
+
+    hits = student_dashboard_cache.hits
+    dashboard(client, roster.students[0])
+    assert student_dashboard_cache.hits == hits + 1
@@ -0,0 +1,66 @@
+import numpy as np
+from app.services.distribution_service import group_statistics, quantile
+
+
+def distribution(client, roster, **params):
+    response = client.get(f"/api/reports/distributions/{roster.course_id}", params=params, headers=roster.faculty)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_quartiles_and_percentile_ranks(client, roster, mark):
+    mark({0: "present", 1: "present", 2: "absent", 3: "present"}, days_ago=1)
+    mark({0: "present", 1: "absent", 2: "absent", 3: "present"})
+
+    body = distribution(client, roster, bin_width=50)
+    assert (body["students"], body["min"], body["max"], body["mean"]) == (4, 0.0, 100.0, 62.5)
+    assert body["quartiles"] == {"p25": 37.5, "p50": 75.0, "p75": 100.0}
+    assert body["histogram"] == [{"from": 0.0, "to": 50.0, "count": 1}, {"from": 50.0, "to": 100.0, "count": 3}]
+    # Mid-rank: the share below plus half of the ties
+    ranks = {r["roll_number"]: (r["percentage"], r["percentile_rank"]) for r in body["ranks"]}
+    assert ranks == {
+        roster.roll_numbers[2]: (0.0, 12.5),
+        roster.roll_numbers[1]: (50.0, 37.5),
+        roster.roll_numbers[0]: (100.0, 75.0),
+        roster.roll_numbers[3]: (100.0, 75.0),
+    }
+
+    (only,) = distribution(client, roster, student_id=roster.student_ids[1])["ranks"]
+    assert (only["student_id"], only["percentile_rank"]) == (roster.student_ids[1], 37.5)
+
+
+def test_marking_invalidates_the_cached_course(client, roster, mark):
+    mark({0: "present", 1: "absent"})
+    assert distribution(client, roster)["quartiles"]["p50"] == 50.0
+
+    mark({1: "present"})
+    assert distribution(client, roster)["quartiles"]["p50"] == 100.0
+
+
+def test_courses_without_classes_have_no_quartiles(client, roster):
+    body = distribution(client, roster)
+    assert (body["students"], body["quartiles"], body["ranks"]) == (0, None, [])
+
+
+def test_all_courses_are_reported_to_admins(client, roster, mark):
+    mark({0: "present", 1: "absent"})
+    response = client.get("/api/reports/distributions", headers=roster.admin)
+    assert response.status_code == 200, response.text
+    (course,) = [c for c in response.json()["courses"] if c["course_id"] == roster.course_id]
+    assert (course["students"], course["quartiles"]["p50"]) == (2, 50.0)
+    assert "ranks" not in course
+
+    assert client.get("/api/reports/distributions", headers=roster.faculty).status_code == 403
+
+
+def test_quantile_matches_numpy():
+    values = np.sort(np.random.default_rng(7).uniform(0, 100, 37))
+    for q in (0, 25, 50, 75, 100):
+        assert quantile(values, q) == np.percentile(values, q)
+
+
+def test_group_statistics_keep_groups_apart():
+    order, starts, counts, ranks = group_statistics([1, 0, 1, 0, 1], [80.0, 40.0, 20.0, 40.0, 80.0])
+    assert order.tolist()[:2] in ([1, 3], [3, 1])
+    assert (starts.tolist(), counts.tolist()) == ([0, 2], [2, 3])
+    assert np.allclose(ranks, [50.0, 50.0, 100 / 6, 200 / 3, 200 / 3])
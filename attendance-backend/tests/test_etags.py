@@ -0,0 +1,74 @@
+from app.database import SessionLocal
+from app.models.course import Course
+from app.services.version_service import COURSE, entity_versions
+
+
+def etag(client, url, headers):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.headers["etag"]
+
+
+def revalidate(client, url, headers, tag):
+    return client.get(url, headers={**headers, "If-None-Match": tag})
+
+
+def test_unchanged_resource_answers_304(client, roster):
+    url = f"/api/courses/{roster.course_id}/students"
+    tag = etag(client, url, roster.faculty)
+
+    response = revalidate(client, url, roster.faculty, tag)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == tag
+
+
+def test_marking_changes_the_etag(client, roster, mark):
+    course_url = f"/api/courses/{roster.course_id}/students"
+    course_tag = etag(client, course_url, roster.faculty)
+    student_tag = etag(client, "/api/students/attendance", roster.students[0])
+
+    assert mark({0: "absent"}).status_code == 200
+
+    for url, headers, old in (
+        (course_url, roster.faculty, course_tag),
+        ("/api/students/attendance", roster.students[0], student_tag),
+    ):
+        response = revalidate(client, url, headers, old)
+        assert response.status_code == 200
+        assert response.headers["etag"] != old
+        assert revalidate(client, url, headers, response.headers["etag"]).status_code == 304
+
+
+def test_marking_leaves_other_students_etags_alone(client, roster, mark):
+    other_tag = etag(client, "/api/students/attendance", roster.students[1])
+
+    assert mark({0: "present"}).status_code == 200
+
+    assert revalidate(client, "/api/students/attendance", roster.students[1], other_tag).status_code == 304
+
+
+def test_remarking_with_the_same_status_keeps_the_etag(client, roster, mark):
+    assert mark({0: "late"}).status_code == 200
+    tag = etag(client, "/api/students/attendance", roster.students[0])
+
+    assert mark({0: "late"}).json()["unchanged"] == 1
+
+    assert revalidate(client, "/api/students/attendance", roster.students[0], tag).status_code == 304
+
+
+def test_rolled_back_bump_keeps_the_etag(client, roster):
+    url = f"/api/courses/{roster.course_id}/students"
+    tag = etag(client, url, roster.faculty)
+
+    db = SessionLocal()
+    try:
+        # Inside a transaction, as on the write paths
+        db.query(Course).first()
+        entity_versions.bump(db, COURSE, [roster.course_id])
+        db.rollback()
+        db.commit()
+    finally:
+        db.close()
+
+    assert revalidate(client, url, roster.faculty, tag).status_code == 304
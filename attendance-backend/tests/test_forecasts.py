@@ -0,0 +1,60 @@
+import numpy as np
+from app.database import SessionLocal
+from app.services.forecast_service import NEVER, forecast, shortage_forecaster, whole_enrollments, window_stats
+
+
+def run_forecaster():
+    db = SessionLocal()
+    try:
+        result = shortage_forecaster.run(db, window=4, horizon=5)
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+
+def test_declining_enrollments_above_the_minimum_are_flagged(client, roster, mark):
+    # Student 0 slips from 100% to 80%, 1 never misses, 2 is already short
+    for days_ago in range(10, 0, -1):
+        mark({0: "absent" if days_ago <= 2 else "present", 1: "present", 2: "absent"}, days_ago=days_ago)
+    assert run_forecaster()["flagged"] >= 1
+
+    response = client.get("/api/reports/forecasts", params={"course_id": roster.course_id}, headers=roster.faculty)
+    assert response.status_code == 200, response.text
+    (flagged,) = response.json()["forecasts"]
+    assert flagged["student_id"] == roster.student_ids[0]
+    assert (flagged["classes_held"], flagged["current_percentage"], flagged["warning_percentage"]) == (10, 80.0, 80.0)
+    assert (flagged["recent_rate"], flagged["sessions_to_warning"]) == (50.0, 1)
+    assert flagged["trend_slope"] < 0 and flagged["projected_percentage"] < 80.0
+
+    assert client.get("/api/reports/forecasts", headers=roster.students[0]).status_code == 403
+
+
+def test_window_stats_per_enrollment():
+    keys, held, attended, recent_n, rate, slope = window_stats(
+        np.array(["a", "a", "a", "b", "b"]), np.array([1, 1, 0, 1, 1]), window=2
+    )
+    assert keys.tolist() == ["a", "b"]
+    assert (held.tolist(), attended.tolist(), recent_n.tolist()) == ([3, 2], [2, 2], [2, 2])
+    assert (rate.tolist(), slope.tolist()) == ([0.5, 1.0], [-1.0, 0.0])
+
+
+def test_forecast_finds_the_first_crossing():
+    current, projected, sessions = forecast(
+        held=[10, 10, 10], attended=[9, 10, 7], recent_n=np.array([4, 4, 4]),
+        rate=np.array([0.25, 1.0, 1.0]), slope=np.array([0.0, 0.0, 0.0]), warning=[80, 80, 80], horizon=3,
+    )
+    assert current.tolist() == [90.0, 100.0, 70.0]
+    # 9.25/11, 9.5/12 -> crosses at the second session
+    assert sessions.tolist() == [2, NEVER, 0]
+    assert np.isclose(projected[0], 9.75 / 13 * 100)
+
+
+def test_whole_enrollments_never_split_across_chunks():
+    chunks = [
+        (np.array(["a", "a", "b"]), np.array([1, 0, 1], dtype=np.int8)),
+        (np.array(["b", "c"]), np.array([0, 1], dtype=np.int8)),
+    ]
+    assert [(k.tolist(), x.tolist()) for k, x in whole_enrollments(chunks)] == [
+        (["a", "a"], [1, 0]), (["b", "b"], [1, 0]), (["c"], [1]),
+    ]
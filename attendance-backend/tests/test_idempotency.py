@@ -0,0 +1,117 @@
+import datetime
+import uuid
+from uuid import UUID
+import pytest
+from conftest import bearer
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord, AttendanceSummary
+from app.models.course import Course, CourseEnrollment
+from app.models.user import User
+from app.services.attendance_service import IdempotencyKeyConflict, idempotency_store
+
+
+def records(course_id):
+    db = SessionLocal()
+    try:
+        return db.query(AttendanceRecord).join(
+            CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+        ).filter(CourseEnrollment.course_id == UUID(course_id)).count()
+    finally:
+        db.close()
+
+
+def total_classes(course_id):
+    db = SessionLocal()
+    try:
+        return sum(total for (total,) in db.query(AttendanceSummary.total_classes).join(
+            CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
+        ).filter(CourseEnrollment.course_id == UUID(course_id)).all())
+    finally:
+        db.close()
+
+
+def test_retry_with_the_same_key_replays_the_result(roster, mark):
+    headers = {**roster.faculty, "Idempotency-Key": "retry-1"}
+    first = mark({0: "present", 1: "absent"}, headers=headers)
+    assert first.status_code == 200
+    assert first.json()["inserted"] == 2
+
+    retry = mark({0: "present", 1: "absent"}, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json()["replayed"] is True
+    assert retry.json()["inserted"] == 2
+    assert records(roster.course_id) == 2
+    assert total_classes(roster.course_id) == 2
+
+
+def test_same_key_with_a_different_submission_is_a_conflict(roster, mark):
+    headers = {**roster.faculty, "Idempotency-Key": "retry-2"}
+    assert mark({0: "present"}, headers=headers).status_code == 200
+
+    response = mark({0: "absent"}, headers=headers)
+    assert response.status_code == 409
+    assert records(roster.course_id) == 1
+
+
+def test_keys_are_scoped_to_the_submitter(client, roster, mark):
+    assert mark({0: "present"}, headers={**roster.faculty, "Idempotency-Key": "shared"}).status_code == 200
+
+    other = client.post("/api/faculty/attendance/mark", json={
+        "course_id": roster.course_id,
+        "class_date": str(datetime.date.today()),
+        "attendance_data": [{"student_id": roster.student_ids[0], "status": "absent"}],
+    }, headers={**roster.admin, "Idempotency-Key": "shared"})
+    assert other.status_code == 200
+    assert "replayed" not in other.json()
+
+
+def test_admins_without_a_faculty_profile_do_not_share_keys(client, roster, password_hash):
+    db = SessionLocal()
+    try:
+        other_admin = User(email="second-" + roster.faculty_email, password_hash=password_hash, role="admin",
+                           full_name="Second Admin")
+        db.add(other_admin)
+        db.commit()
+        other_headers = bearer(other_admin.email)
+    finally:
+        db.close()
+
+    def submit(headers, status):
+        return client.post("/api/faculty/attendance/mark", json={
+            "course_id": roster.course_id,
+            "class_date": str(datetime.date.today()),
+            "attendance_data": [{"student_id": roster.student_ids[0], "status": status}],
+        }, headers={**headers, "Idempotency-Key": "admin-shared"})
+
+    assert submit(roster.admin, "present").status_code == 200
+    # Neither a replay of the first admin's result nor a fingerprint conflict
+    other = submit(other_headers, "absent")
+    assert other.status_code == 200
+    assert other.json()["updated"] == 1
+    assert "replayed" not in other.json()
+
+
+def test_without_a_key_every_request_is_applied(roster, mark):
+    assert mark({0: "present"}).json()["inserted"] == 1
+    second = mark({0: "absent"}).json()
+    assert "replayed" not in second
+    assert second["updated"] == 1
+
+
+def test_entries_are_stored_only_when_the_transaction_commits(roster):
+    scope_key = (str(uuid.uuid4()), "staged")
+    db = SessionLocal()
+    try:
+        db.query(Course).first()
+        idempotency_store.stage(db, scope_key, "fingerprint", {"inserted": 1})
+        db.rollback()
+        assert idempotency_store.get(scope_key, "fingerprint") is None
+
+        db.query(Course).first()
+        idempotency_store.stage(db, scope_key, "fingerprint", {"inserted": 1})
+        db.commit()
+    finally:
+        db.close()
+    assert idempotency_store.get(scope_key, "fingerprint") == {"inserted": 1}
+    with pytest.raises(IdempotencyKeyConflict):
+        idempotency_store.get(scope_key, "other")
@@ -0,0 +1,101 @@
+import csv
+import datetime
+import io
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord, AttendanceSummary
+from app.models.course import CourseEnrollment
+from app.services.import_service import AttendanceImporter
+
+DAY = datetime.date.today() - datetime.timedelta(days=7)
+
+
+def upload(client, roster, text):
+    return client.post("/api/faculty/attendance/import", files={"file": ("attendance.csv", text.encode(), "text/csv")},
+                       headers=roster.faculty)
+
+
+def rows_for(roster, lines):
+    return "roll_number,course_code,date,status\n" + "".join(
+        f"{roll},{roster.course_code if code is None else code},{day},{status}\n" for roll, code, day, status in lines
+    )
+
+
+def stored(roster):
+    db = SessionLocal()
+    try:
+        records = {
+            (str(student_id), class_date): status
+            for student_id, class_date, status in db.query(
+                CourseEnrollment.student_id, AttendanceRecord.class_date, AttendanceRecord.status
+            ).join(
+                AttendanceRecord, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+            ).filter(CourseEnrollment.course_id == UUID(roster.course_id)).all()
+        }
+        totals = {
+            str(student_id): total
+            for student_id, total in db.query(CourseEnrollment.student_id, AttendanceSummary.total_classes).join(
+                AttendanceSummary, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
+            ).filter(CourseEnrollment.course_id == UUID(roster.course_id)).all()
+        }
+        return records, totals
+    finally:
+        db.close()
+
+
+def test_valid_rows_are_written_and_the_rest_reported(client, roster):
+    rolls = roster.roll_numbers
+    response = upload(client, roster, rows_for(roster, [
+        (rolls[0], None, DAY, "present"),
+        (rolls[1], None, DAY, "Absent"),
+        ("NOBODY", None, DAY, "present"),
+        (rolls[2], None, "yesterday", "present"),
+        (rolls[2], None, DAY, "gone"),
+        (rolls[3], "", DAY, "present"),
+    ]))
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["processed"], body["written"], body["rejected"]) == (6, 2, 4)
+    assert [(row["line"], row["reason"]) for row in body["rejected_rows"]] == [
+        (4, "student not enrolled in course"),
+        (5, "invalid date 'yesterday'"),
+        (6, "invalid status 'gone'"),
+        (7, "missing course_code"),
+    ]
+
+    records, totals = stored(roster)
+    assert records == {(roster.student_ids[0], DAY): "present", (roster.student_ids[1], DAY): "absent"}
+    assert totals == {roster.student_ids[0]: 1, roster.student_ids[1]: 1}
+
+
+def test_reimporting_replaces_rows_and_keeps_counts(client, roster):
+    rolls = roster.roll_numbers
+    upload(client, roster, rows_for(roster, [(rolls[0], None, DAY, "present")]))
+    upload(client, roster, rows_for(roster, [(rolls[0], None, DAY, "late"), (rolls[0], None, DAY, "absent")]))
+
+    records, totals = stored(roster)
+    assert records == {(roster.student_ids[0], DAY): "absent"}
+    assert totals == {roster.student_ids[0]: 1}
+
+
+def test_rows_are_committed_in_chunks(roster):
+    rolls = roster.roll_numbers
+    text = rows_for(roster, [
+        (rolls[n % 4], None, DAY - datetime.timedelta(days=n // 4), "present") for n in range(10)
+    ])
+    rejects = io.StringIO()
+    db = SessionLocal()
+    try:
+        stats = AttendanceImporter(db, marked_by=roster.faculty_id, chunk_size=4).run(
+            io.StringIO(text), rejects=csv.writer(rejects)
+        )
+    finally:
+        db.close()
+    assert (stats["written"], stats["chunks"], stats["rejected"]) == (10, 3, 0)
+    assert len(stored(roster)[0]) == 10
+
+
+def test_missing_columns_are_refused(client, roster):
+    response = upload(client, roster, "roll_number,date\nR1,2025-01-01\n")
+    assert response.status_code == 400
+    assert "course_code" in response.json()["detail"]
@@ -0,0 +1,90 @@
+import datetime
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.services.live_feed import live_feed
+from app.utils.security import create_access_token
+
+
+def feed_url(headers, last_event_id=None):
+    url = "/api/notifications/ws?token=" + headers["Authorization"][len("Bearer "):]
+    if last_event_id:
+        url += "&last_event_id=" + last_event_id
+    return url
+
+
+def receive_events(socket, count, pings=5):
+    """The next `count` events, skipping heartbeats; fails after `pings` idle ones."""
+    events = []
+    while len(events) < count:
+        message = socket.receive_json()
+        if message["type"] == "ping":
+            pings -= 1
+            assert pings, f"only {len(events)} of {count} events arrived"
+            continue
+        events.append(message)
+    return events
+
+
+def test_marking_is_delivered_to_the_student(client, roster, mark):
+    # Resuming from the current id, so a mark that lands before the
+    # subscription is registered is replayed rather than missed
+    since = live_feed.stats()["last_event_id"]
+    with client.websocket_connect(feed_url(roster.students[0], since)) as socket:
+        assert mark({0: "absent", 1: "present"}).status_code == 200
+        (event,) = receive_events(socket, 1)
+
+    assert event["type"] == "attendance_marked"
+    assert event["data"]["status"] == "absent"
+    assert event["data"]["class_date"] == str(datetime.date.today())
+
+
+def test_reconnecting_replays_missed_events_in_order(client, roster, mark):
+    since = live_feed.stats()["last_event_id"]
+    with client.websocket_connect(feed_url(roster.students[0], since)) as socket:
+        assert mark({0: "present"}, days_ago=3).status_code == 200
+        (seen,) = receive_events(socket, 1)
+
+    # Missed while disconnected, plus one for another student
+    assert mark({0: "absent"}, days_ago=2).status_code == 200
+    assert mark({1: "absent"}, days_ago=2).status_code == 200
+    assert mark({0: "late"}, days_ago=1).status_code == 200
+
+    with client.websocket_connect(feed_url(roster.students[0], seen["id"])) as socket:
+        missed = receive_events(socket, 2)
+        assert mark({0: "present"}).status_code == 200
+        (live,) = receive_events(socket, 1)
+
+    assert [(e["data"]["class_date"], e["data"]["status"]) for e in missed] == [
+        (str(datetime.date.today() - datetime.timedelta(days=2)), "absent"),
+        (str(datetime.date.today() - datetime.timedelta(days=1)), "late"),
+    ]
+    assert (live["data"]["class_date"], live["data"]["status"]) == (str(datetime.date.today()), "present")
+    ids = [seen["id"]] + [e["id"] for e in missed] + [live["id"]]
+    seqs = [int(event_id.rpartition("-")[2]) for event_id in ids]
+    assert seqs == sorted(set(seqs))
+
+
+def test_unknown_resume_point_gets_a_reset(client, roster):
+    # An id from another worker or before a restart
+    with client.websocket_connect(feed_url(roster.students[0], "0-1")) as socket:
+        (event,) = receive_events(socket, 1)
+    assert event["type"] == "reset"
+
+
+def test_faculty_follow_their_courses(client, roster, mark):
+    since = live_feed.stats()["last_event_id"]
+    with client.websocket_connect(feed_url(roster.faculty, since)) as socket:
+        assert mark({0: "absent", 1: "absent", 2: "present"}).status_code == 200
+        (event,) = receive_events(socket, 1)
+
+    assert event["data"]["course_id"] == roster.course_id
+    assert event["data"]["marked"] == 3
+    assert event["data"]["counts"] == {"absent": 2, "present": 1}
+
+
+@pytest.mark.parametrize("token", ["not-a-token", create_access_token({"sub": "nobody@example.edu"})])
+def test_bad_tokens_are_refused(client, token):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/api/notifications/ws?token=" + token) as socket:
+            socket.receive_json()
+    assert refused.value.code == 1008
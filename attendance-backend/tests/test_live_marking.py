@@ -0,0 +1,126 @@
+import datetime
+import json
+import time
+from uuid import UUID
+import pytest
+from starlette.websockets import WebSocketDisconnect
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord
+from app.models.course import CourseEnrollment
+from app.services.live_marking import live_marking
+
+TODAY = datetime.date.today()
+
+
+def live_url(roster, headers):
+    token = headers["Authorization"][len("Bearer "):]
+    return f"/api/faculty/attendance/live/{roster.course_id}/{TODAY}?token={token}"
+
+
+def until(socket, kind):
+    """The next message of type `kind`, skipping the others."""
+    while True:
+        message = json.loads(socket.receive_text())
+        if message["type"] == kind:
+            return message
+
+
+def records(roster):
+    """{student_id: (status, remarks)} written for the course today."""
+    db = SessionLocal()
+    try:
+        rows = db.query(CourseEnrollment.student_id, AttendanceRecord.status, AttendanceRecord.remarks).join(
+            AttendanceRecord, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+        ).filter(
+            CourseEnrollment.course_id == UUID(roster.course_id), AttendanceRecord.class_date == TODAY
+        ).all()
+        return {str(student_id): (status, remarks) for student_id, status, remarks in rows}
+    finally:
+        db.close()
+
+
+def test_changes_are_broadcast_and_flushed(client, roster):
+    with client.websocket_connect(live_url(roster, roster.faculty)) as marker, \
+            client.websocket_connect(live_url(roster, roster.admin)) as other:
+        snapshot = until(marker, "snapshot")
+        assert [entry["student_id"] for entry in snapshot["roster"]] == roster.student_ids
+        assert all(entry["status"] is None for entry in snapshot["roster"])
+        until(other, "snapshot")
+
+        marker.send_text(json.dumps({"type": "mark", "changes": [
+            {"student_id": roster.student_ids[0], "status": "absent", "remarks": "sick"},
+            {"student_id": roster.student_ids[1], "status": "present"},
+        ]}))
+        delta = until(other, "delta")
+        assert delta["by"] == "Faculty"
+        assert [change["status"] for change in delta["changes"]] == ["absent", "present"]
+
+        flushed = until(marker, "flushed")
+        assert flushed["version"] == delta["version"]
+        assert flushed["pending"] == 0
+
+    assert records(roster) == {
+        roster.student_ids[0]: ("absent", "sick"),
+        roster.student_ids[1]: ("present", None),
+    }
+
+
+def test_invalid_changes_are_rejected(client, roster):
+    with client.websocket_connect(live_url(roster, roster.faculty)) as marker:
+        until(marker, "snapshot")
+        marker.send_text(json.dumps({"type": "mark", "changes": [
+            {"student_id": roster.student_ids[0], "status": "present", "remarks": {"note": 1}},
+            {"student_id": roster.student_ids[1], "status": "late", "remarks": 5},
+            {"student_id": "not-a-student", "status": "present"},
+            {"student_id": roster.student_ids[2], "status": "bogus"},
+            {"student_id": roster.student_ids[3], "status": "absent", "remarks": "ok"},
+        ]}))
+        rejected = until(marker, "rejected")["changes"]
+        assert [change["student_id"] for change in rejected] == [
+            roster.student_ids[0], roster.student_ids[1], "not-a-student", roster.student_ids[2],
+        ]
+        assert "remarks" in rejected[0]["detail"]
+        until(marker, "flushed")
+
+    assert records(roster) == {roster.student_ids[3]: ("absent", "ok")}
+
+
+def test_a_row_the_database_refuses_does_not_hold_back_the_rest(client, roster):
+    with client.websocket_connect(live_url(roster, roster.faculty)) as marker:
+        until(marker, "snapshot")
+        session = live_marking._sessions[(UUID(roster.course_id), TODAY)]
+        # Past the validation in apply(), as a change could be if it were ever loosened
+        session._dirty = {
+            roster.student_ids[0]: ("present", {"note": 1}, roster.faculty_id, 1),
+            roster.student_ids[1]: ("late", None, roster.faculty_id, 2),
+        }
+        marker.send_text(json.dumps({"type": "flush"}))
+
+        error = until(marker, "error")
+        assert [entry["student_id"] for entry in error["dropped"]] == [roster.student_ids[0]]
+        flushed = until(marker, "flushed")
+        assert flushed["written"] == 1
+        assert session._dirty == {}
+
+    assert records(roster) == {roster.student_ids[1]: ("late", None)}
+
+
+def test_last_participant_leaving_flushes(client, roster):
+    with client.websocket_connect(live_url(roster, roster.faculty)) as marker:
+        until(marker, "snapshot")
+        marker.send_text(json.dumps({"type": "mark", "student_id": roster.student_ids[2], "status": "excused"}))
+        until(marker, "delta")
+
+    # The close is handled on the app's loop after the socket returns
+    deadline = time.monotonic() + 5
+    while (UUID(roster.course_id), TODAY) in live_marking._sessions and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert (UUID(roster.course_id), TODAY) not in live_marking._sessions
+    assert records(roster) == {roster.student_ids[2]: ("excused", None)}
+
+
+def test_students_are_refused(client, roster):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect(live_url(roster, roster.students[0])) as socket:
+            socket.receive_text()
+    assert refused.value.code == 1008
@@ -0,0 +1,94 @@
+import asyncio
+import time
+import pytest
+from app.database import SessionLocal
+from app.models.user import User
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy, password_hasher
+from app.utils.security import get_password_hash, verify_password
+from conftest import PASSWORD
+
+
+def stored_hash(email):
+    db = SessionLocal()
+    try:
+        return db.query(User.password_hash).filter(User.email == email).scalar()
+    finally:
+        db.close()
+
+
+def set_hash(email, hashed):
+    db = SessionLocal()
+    try:
+        db.query(User).filter(User.email == email).update({"password_hash": hashed})
+        db.commit()
+    finally:
+        db.close()
+
+
+def login(client, email, password=PASSWORD):
+    return client.post("/api/auth/login", data={"username": email, "password": password})
+
+
+def test_login_upgrades_hashes_made_at_another_cost(client, roster):
+    email = roster.student_emails[0]
+    set_hash(email, get_password_hash(PASSWORD, password_hasher.rounds + 1))
+    rehashed = password_hasher.rehashed
+
+    assert login(client, email).status_code == 200
+    upgraded = stored_hash(email)
+    assert upgraded.split("$")[2] == f"{password_hasher.rounds:02d}"
+    assert verify_password(PASSWORD, upgraded)
+    assert password_hasher.rehashed == rehashed + 1
+
+    # Already at the configured cost: left alone
+    assert login(client, email).status_code == 200
+    assert stored_hash(email) == upgraded
+
+
+def test_failed_logins_keep_the_old_hash(client, roster):
+    email = roster.student_emails[0]
+    old = get_password_hash(PASSWORD, password_hasher.rounds + 1)
+    set_hash(email, old)
+    assert login(client, email, "wrong-password").status_code == 401
+    assert stored_hash(email) == old
+
+
+def test_needs_rehash():
+    hasher = PasswordHasher(1, 0, 5, rounds=4)
+    assert not hasher.needs_rehash(get_password_hash(PASSWORD, 4))
+    assert hasher.needs_rehash(get_password_hash(PASSWORD, 5))
+    assert not hasher.needs_rehash("not-a-bcrypt-hash")
+
+
+def test_calls_beyond_the_queue_are_rejected():
+    hasher = PasswordHasher(workers=1, queue_limit=1, timeout_seconds=5, rounds=4)
+
+    async def burst():
+        return await asyncio.gather(
+            *[hasher._run(time.sleep, 0.2) for _ in range(3)], return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(burst())
+    finally:
+        hasher.stop()
+    assert sum(isinstance(r, PasswordHasherBusy) for r in results) == 1
+    stats = hasher.stats()
+    assert (stats["completed"], stats["rejected"]) == (2, 1)
+
+
+def test_slow_calls_time_out():
+    hasher = PasswordHasher(workers=1, queue_limit=0, timeout_seconds=0.05, rounds=4)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            asyncio.run(hasher._run(time.sleep, 0.3))
+    finally:
+        hasher.stop()
+    assert hasher.timeouts == 1
+
+
+def test_stats_are_admin_only(client, roster):
+    response = client.get("/api/auth/hasher", headers=roster.admin)
+    assert response.status_code == 200
+    assert response.json()["rounds"] == password_hasher.rounds
+    assert client.get("/api/auth/hasher", headers=roster.faculty).status_code == 403
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import event
+from app.async_database import async_engine
+from app.database import SessionLocal, engine
+from app.models.user import User
+from app.services.principal_cache import principal_cache
+
+
+@pytest.fixture
+def user_queries():
+    """Statements reading the users table, on either engine."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for e in engines:
+        event.listen(e, "before_cursor_execute", record)
+    yield statements
+    for e in engines:
+        event.remove(e, "before_cursor_execute", record)
+
+
+def update_user(current_email, **values):
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == current_email).one()
+        for name, value in values.items():
+            setattr(user, name, value)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_repeat_requests_do_not_load_the_user(client, roster, user_queries):
+    assert client.get("/api/auth/me", headers=roster.students[0]).status_code == 200
+    assert user_queries
+
+    user_queries.clear()
+    response = client.get("/api/auth/me", headers=roster.students[0])
+    assert response.status_code == 200
+    assert response.json()["email"] == roster.student_emails[0]
+    assert user_queries == []
+
+
+def test_committed_user_changes_apply_at_once(client, roster):
+    assert client.get("/api/auth/me", headers=roster.students[0]).json()["full_name"] == "Student 0"
+
+    update_user(roster.student_emails[0], full_name="Renamed")
+    assert client.get("/api/auth/me", headers=roster.students[0]).json()["full_name"] == "Renamed"
+
+    update_user(roster.student_emails[0], is_active=False)
+    assert client.get("/api/auth/me", headers=roster.students[0]).json()["is_active"] is False
+
+    # Tokens name the user by email
+    update_user(roster.student_emails[0], email="moved-" + roster.student_emails[0])
+    assert client.get("/api/auth/me", headers=roster.students[0]).status_code == 401
+
+
+def test_rolled_back_user_change_keeps_the_entry(client, roster, user_queries):
+    client.get("/api/auth/me", headers=roster.students[0])
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.email == roster.student_emails[0]).one()
+        user.full_name = "Not saved"
+        db.flush()
+        db.rollback()
+    finally:
+        db.close()
+
+    user_queries.clear()
+    assert client.get("/api/auth/me", headers=roster.students[0]).json()["full_name"] == "Student 0"
+    assert user_queries == []
+
+
+def test_principal_is_resolved_without_holding_a_connection(client, roster):
+    principal_cache.clear()
+    assert client.get("/api/auth/me", headers=roster.students[0]).status_code == 200
+    assert async_engine.pool.checkedout() == 0
+
+
+def test_invalid_tokens_are_refused(client, roster):
+    assert client.get("/api/auth/me", headers={"Authorization": "Bearer x.y.z"}).status_code == 401
+    unknown = {"Authorization": roster.students[0]["Authorization"].replace("a", "b", 1)}
+    assert client.get("/api/auth/me", headers=unknown).status_code == 401
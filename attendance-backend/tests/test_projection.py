@@ -0,0 +1,54 @@
+from app.services.projection_service import UNBOUNDED, project
+
+
+def one(held, attended, planned, threshold):
+    return {name: values[0].item() for name, values in project([held], [attended], [planned], [threshold]).items()}
+
+
+def test_classes_needed_and_can_miss_over_planned_sessions():
+    result = one(held=4, attended=2, planned=40, threshold=75)
+    assert result["below_threshold"] is True
+    # 2 + 4 of 4 + 4 is 75%
+    assert result["classes_needed"] == 4
+    assert result["remaining"] == 36
+    assert result["can_miss"] == 8
+    assert result["recoverable"] is True
+    assert result["max_possible_percentage"] == 95.0
+
+
+def test_without_planned_sessions_can_miss_is_counted_from_now():
+    result = one(held=4, attended=4, planned=0, threshold=75)
+    assert (result["below_threshold"], result["classes_needed"]) == (False, 0)
+    assert result["remaining"] == UNBOUNDED
+    assert result["can_miss"] == 1
+    assert result["recoverable"] is True
+
+
+def test_unreachable_thresholds():
+    assert one(held=4, attended=3, planned=0, threshold=100)["classes_needed"] == UNBOUNDED
+    assert one(held=4, attended=3, planned=0, threshold=100)["recoverable"] is False
+    # Needs 12 more but only 6 sessions are left
+    late = one(held=34, attended=20, planned=40, threshold=75)
+    assert (late["classes_needed"], late["remaining"], late["recoverable"]) == (22, 6, False)
+
+
+def test_exact_thresholds_are_not_shortfalls():
+    # 0.75 * 4 - 3 is 4e-16 in floating point
+    assert one(held=4, attended=3, planned=0, threshold=75)["below_threshold"] is False
+
+
+def test_student_projection(client, roster, mark):
+    mark({0: "absent"}, days_ago=1)
+    mark({0: "late"})
+
+    response = client.get("/api/students/projection", headers=roster.students[0])
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["totals"] == {"enrollments": 1, "below_threshold": 1, "unrecoverable": 0}
+    (projection,) = body["projections"]
+    assert projection["course_id"] == roster.course_id
+    assert (projection["classes_held"], projection["classes_attended"], projection["planned_classes"]) == (2, 1, 40)
+    assert projection["current_percentage"] == 50.0
+    expected = one(held=2, attended=1, planned=40, threshold=projection["threshold"])
+    assert projection["classes_needed"] == expected["classes_needed"]
+    assert projection["can_miss"] == expected["can_miss"]
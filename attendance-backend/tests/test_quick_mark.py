@@ -0,0 +1,73 @@
+import datetime
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.attendance import AttendanceRecord
+from app.models.course import CourseEnrollment
+
+
+def quick_mark(client, roster, **body):
+    return client.post(f"/api/faculty/courses/{roster.course_id}/quick-mark", json=body or None,
+                       headers=roster.faculty)
+
+
+def records(roster):
+    """{(student_id, academic_year): status} for the course today."""
+    db = SessionLocal()
+    try:
+        return {
+            (str(student_id), year): status
+            for student_id, year, status in db.query(
+                CourseEnrollment.student_id, CourseEnrollment.academic_year, AttendanceRecord.status
+            ).join(
+                AttendanceRecord, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+            ).filter(
+                CourseEnrollment.course_id == UUID(roster.course_id),
+                AttendanceRecord.class_date == datetime.date.today(),
+            ).all()
+        }
+    finally:
+        db.close()
+
+
+def test_everyone_but_the_absentees_is_present(client, roster):
+    response = quick_mark(client, roster, absentees=roster.student_ids[:1])
+    assert response.status_code == 200
+    assert (response.json()["inserted"], response.json()["present"], response.json()["absent"]) == (4, 3, 1)
+    assert records(roster) == {
+        (student_id, "2025-2026"): "absent" if n == 0 else "present"
+        for n, student_id in enumerate(roster.student_ids)
+    }
+
+
+def test_only_unmarked_students_are_filled_in(client, roster, mark):
+    mark({0: "late", 1: "absent"})
+
+    response = quick_mark(client, roster)
+    assert response.json()["inserted"] == 2
+    statuses = {student_id: status for (student_id, _), status in records(roster).items()}
+    assert [statuses[s] for s in roster.student_ids] == ["late", "absent", "present", "present"]
+
+    # Nobody left to mark
+    assert quick_mark(client, roster).status_code == 400
+
+
+def test_only_the_latest_academic_year_is_marked(client, roster):
+    db = SessionLocal()
+    try:
+        db.add(CourseEnrollment(student_id=UUID(roster.student_ids[0]), course_id=UUID(roster.course_id),
+                                faculty_id=roster.faculty_id, academic_year="2024-2025"))
+        db.commit()
+    finally:
+        db.close()
+
+    assert quick_mark(client, roster).json()["inserted"] == 4
+    assert (roster.student_ids[0], "2024-2025") not in records(roster)
+    assert records(roster)[(roster.student_ids[0], "2025-2026")] == "present"
+
+
+def test_summaries_count_quick_marks(client, roster):
+    quick_mark(client, roster, absentees=roster.student_ids[1:2])
+    dashboard = client.get("/api/students/dashboard", headers=roster.students[1]).json()
+    assert dashboard["overall_percentage"] == 0
+    dashboard = client.get("/api/students/dashboard", headers=roster.students[0]).json()
+    assert dashboard["overall_percentage"] == 100
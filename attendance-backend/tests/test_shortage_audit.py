@@ -0,0 +1,37 @@
+from io import BytesIO
+from uuid import UUID
+from openpyxl import load_workbook
+from app.database import SessionLocal
+from app.models.attendance import AttendanceSummary
+from app.models.course import CourseEnrollment
+
+
+def audit_rows(client, roster):
+    """(roll number, attendance %) listed for the roster's course."""
+    response = client.get("/api/reports/faculty/shortage-audit", headers=roster.faculty)
+    assert response.status_code == 200, response.text
+    sheet = load_workbook(BytesIO(response.content)).active
+    return [
+        (row[0], row[4]) for row in sheet.iter_rows(min_row=5, values_only=True) if row[2] == roster.course_code
+    ]
+
+
+def test_audit_lists_enrollments_below_the_minimum(client, roster, mark):
+    mark({0: "absent", 1: "present"})
+
+    assert audit_rows(client, roster) == [(roster.roll_numbers[0], "0.00%")]
+
+
+def test_enrollments_without_classes_are_not_shortages(client, roster):
+    # A summary row before any class is held: 0 of 0 is not a shortage
+    db = SessionLocal()
+    try:
+        enrollment_id = db.query(CourseEnrollment.enrollment_id).filter(
+            CourseEnrollment.student_id == UUID(roster.student_ids[0])
+        ).scalar()
+        db.add(AttendanceSummary(enrollment_id=enrollment_id))
+        db.commit()
+    finally:
+        db.close()
+
+    assert audit_rows(client, roster) == []
@@ -0,0 +1,96 @@
+import datetime
+from uuid import UUID
+from app.database import SessionLocal
+from app.models.attendance import AttendanceSummary, ShortageReport
+from app.models.course import CourseEnrollment
+
+
+def sweep(client, roster):
+    response = client.post("/api/reports/shortage-sweep", headers=roster.faculty)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def state(roster, n):
+    """(shortage_status, [(report type, notification_sent)] for today) of student n."""
+    db = SessionLocal()
+    try:
+        enrollment_id = db.query(CourseEnrollment.enrollment_id).filter(
+            CourseEnrollment.course_id == UUID(roster.course_id),
+            CourseEnrollment.student_id == UUID(roster.student_ids[n]),
+        ).scalar()
+        status = db.query(AttendanceSummary.shortage_status).filter(
+            AttendanceSummary.enrollment_id == enrollment_id
+        ).scalar()
+        reports = db.query(ShortageReport.shortage_type, ShortageReport.notification_sent).filter(
+            ShortageReport.enrollment_id == enrollment_id, ShortageReport.report_date == datetime.date.today()
+        ).all()
+        return bool(status), [tuple(report) for report in reports]
+    finally:
+        db.close()
+
+
+def notifications(client, roster, n):
+    response = client.get("/api/notifications/", headers=roster.students[n])
+    return [(item["title"], item["type"]) for item in response.json()]
+
+
+def test_enrollments_enter_and_leave_shortage(client, roster, mark):
+    mark({0: "absent", 1: "present"}, days_ago=1)
+    result = sweep(client, roster)
+    assert result["entered_shortage"] >= 1
+
+    assert state(roster, 0) == (True, [("critical", True)])
+    assert state(roster, 1) == (False, [])
+    assert notifications(client, roster, 0) == [("Attendance Shortage Alert", "shortage_alert")]
+    assert notifications(client, roster, 1) == []
+
+    # Still short: the report is refreshed, nobody is notified again
+    mark({0: "absent"})
+    sweep(client, roster)
+    assert state(roster, 0) == (True, [("critical", True)])
+    assert len(notifications(client, roster, 0)) == 1
+
+    # Back above the minimum: today's report goes and the student is told
+    for days_ago in range(2, 10):
+        mark({0: "present"}, days_ago=days_ago)
+    result = sweep(client, roster)
+    assert result["left_shortage"] >= 1
+    assert state(roster, 0) == (False, [])
+    assert sorted(notifications(client, roster, 0)) == [
+        ("Attendance Shortage Alert", "shortage_alert"), ("Attendance Shortage Cleared", "info"),
+    ]
+
+
+def test_reports_record_only_alerts_sent_by_that_sweep(client, roster, mark):
+    mark({0: "absent"}, days_ago=1)
+    sweep(client, roster)
+    db = SessionLocal()
+    try:
+        # As if the report were dropped after the alert went out
+        db.query(ShortageReport).filter(ShortageReport.report_date == datetime.date.today()).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    sweep(client, roster)
+    assert state(roster, 0) == (True, [("critical", False)])
+
+
+def test_enrollments_without_classes_are_not_short(client, roster):
+    db = SessionLocal()
+    try:
+        enrollment_id = db.query(CourseEnrollment.enrollment_id).filter(
+            CourseEnrollment.student_id == UUID(roster.student_ids[0])
+        ).scalar()
+        db.add(AttendanceSummary(enrollment_id=enrollment_id))
+        db.commit()
+    finally:
+        db.close()
+
+    sweep(client, roster)
+    assert state(roster, 0) == (False, [])
+
+
+def test_students_cannot_run_the_sweep(client, roster):
+    assert client.post("/api/reports/shortage-sweep", headers=roster.students[0]).status_code == 403
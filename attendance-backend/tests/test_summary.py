@@ -0,0 +1,119 @@
+import datetime
+import threading
+from uuid import UUID
+import pytest
+from sqlalchemy import event
+from app.database import SessionLocal, engine
+from app.models.attendance import AttendanceRecord, AttendanceSummary
+from app.models.course import CourseEnrollment
+from app.schemas.attendance import AttendanceMark
+from app.services.attendance_service import attendance_service
+
+COUNTERS = ("total_classes", "classes_attended", "classes_absent", "classes_late", "classes_excused")
+
+
+def summary(roster, n):
+    db = SessionLocal()
+    try:
+        row = db.query(AttendanceSummary).join(
+            CourseEnrollment, AttendanceSummary.enrollment_id == CourseEnrollment.enrollment_id
+        ).filter(
+            CourseEnrollment.course_id == UUID(roster.course_id),
+            CourseEnrollment.student_id == UUID(roster.student_ids[n]),
+        ).one_or_none()
+        return None if row is None else {name: getattr(row, name) for name in COUNTERS}
+    finally:
+        db.close()
+
+
+def recount(roster, n):
+    """The counters computed from scratch from attendance_records."""
+    db = SessionLocal()
+    try:
+        statuses = [status for (status,) in db.query(AttendanceRecord.status).join(
+            CourseEnrollment, AttendanceRecord.enrollment_id == CourseEnrollment.enrollment_id
+        ).filter(
+            CourseEnrollment.course_id == UUID(roster.course_id),
+            CourseEnrollment.student_id == UUID(roster.student_ids[n]),
+        ).all()]
+    finally:
+        db.close()
+    return {
+        "total_classes": len(statuses),
+        "classes_attended": statuses.count("present"),
+        "classes_absent": statuses.count("absent"),
+        "classes_late": statuses.count("late"),
+        "classes_excused": statuses.count("excused"),
+    }
+
+
+def test_marks_and_remarks_move_the_counters(roster, mark):
+    assert summary(roster, 0) is None
+
+    mark({0: "present", 1: "absent"}, days_ago=2)
+    mark({0: "absent"}, days_ago=1)
+    mark({0: "late"})
+    assert summary(roster, 0) == {"total_classes": 3, "classes_attended": 1, "classes_absent": 1,
+                                  "classes_late": 1, "classes_excused": 0}
+
+    # Re-marking moves one counter to another; the class count stays
+    mark({0: "excused"}, days_ago=1)
+    assert summary(roster, 0) == {"total_classes": 3, "classes_attended": 1, "classes_absent": 0,
+                                  "classes_late": 1, "classes_excused": 1}
+    assert summary(roster, 1) == recount(roster, 1)
+
+
+def test_unchanged_marks_leave_the_counters(roster, mark):
+    mark({0: "present"})
+    before = summary(roster, 0)
+    assert mark({0: "present"}).json()["unchanged"] == 1
+    assert summary(roster, 0) == before
+
+
+@pytest.fixture
+def read_together():
+    """
+    Holds each transaction after it reads the day's existing records until a
+    second one has too (or a short wait passes), so concurrent submissions
+    read at the same time whenever nothing serialises them.
+    """
+    barrier = threading.Barrier(2, timeout=0.5)
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT") and "attendance_records.marked_at" in statement:
+            try:
+                barrier.wait()
+            except threading.BrokenBarrierError:
+                pass
+
+    event.listen(engine, "after_cursor_execute", after)
+    yield
+    event.remove(engine, "after_cursor_execute", after)
+
+
+def test_concurrent_identical_submissions_count_once(roster, read_together):
+    marks = [AttendanceMark(student_id=roster.student_ids[0], status="present")]
+    results, errors = [], []
+
+    def submit():
+        db = SessionLocal()
+        try:
+            results.append(attendance_service.mark_attendance(
+                db, roster.course_id, datetime.date.today(), marks, roster.faculty_id
+            ))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=submit) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted((r["inserted"], r["unchanged"]) for r in results) == [(0, 1), (1, 0)]
+    assert summary(roster, 0) == recount(roster, 0) == {
+        "total_classes": 1, "classes_attended": 1, "classes_absent": 0, "classes_late": 0, "classes_excused": 0,
+    }
@@ -0,0 +1,66 @@
+import datetime
+from app.services.trend_service import bucket_range, semester_start
+
+TODAY = datetime.date.today()
+
+
+def trends(client, roster, n=0, **params):
+    response = client.get("/api/students/trends", params=params, headers=roster.students[n])
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_daily_points_cover_the_window(client, roster, mark):
+    mark({0: "present"})
+    mark({0: "absent"}, days_ago=1)
+    mark({0: "late"}, days_ago=1 + 7)  # outside the window
+
+    body = trends(client, roster, window="7", granularity="day")
+    assert body["start"] == (TODAY - datetime.timedelta(days=6)).isoformat()
+    points = body["overall"]
+    assert [p["fullDate"] for p in points] == [
+        (TODAY - datetime.timedelta(days=d)).isoformat() for d in range(6, -1, -1)
+    ]
+    assert [(p["classes"], p["attendance"]) for p in points[-2:]] == [(1, 0), (1, 100)]
+    assert sum(p["classes"] for p in points) == 2
+
+    (course,) = body["courses"]
+    assert course["course_id"] == roster.course_id
+    assert course["series"] == points
+
+
+def test_weekly_buckets_sum_the_days(client, roster, mark):
+    # One class a day for the last ten days, newest first
+    statuses = ["present", "absent", "late", "present", "absent", "present", "present", "absent", "present", "present"]
+    for days_ago, status in enumerate(statuses):
+        mark({0: status}, days_ago=days_ago)
+
+    points = trends(client, roster, window="30", granularity="week")["overall"]
+    week_starts = [datetime.date.fromisoformat(p["fullDate"]) for p in points]
+    assert all(start.weekday() == 0 for start in week_starts)
+    assert week_starts[-1] == TODAY - datetime.timedelta(days=TODAY.weekday())
+    assert sum(p["classes"] for p in points) == len(statuses)
+
+    this_week = statuses[:TODAY.weekday() + 1]
+    attended = sum(status != "absent" for status in this_week)
+    assert points[-1]["classes"] == len(this_week)
+    assert points[-1]["attendance"] == round(attended / len(this_week) * 100, 1)
+
+
+def test_semester_window_starts_at_the_semester(client, roster):
+    body = trends(client, roster, window="semester", granularity="month")
+    assert body["start"] == semester_start(TODAY).isoformat()
+    assert body["overall"][0]["fullDate"] == semester_start(TODAY).isoformat()
+    assert all(p["classes"] == 0 and p["attendance"] == 0 for p in body["overall"])
+
+
+def test_month_buckets_cross_the_year():
+    assert bucket_range(datetime.date(2024, 11, 20), datetime.date(2025, 2, 3), "month") == [
+        datetime.date(2024, 11, 1), datetime.date(2024, 12, 1), datetime.date(2025, 1, 1), datetime.date(2025, 2, 1),
+    ]
+
+
+def test_unknown_windows_are_refused(client, roster):
+    response = client.get("/api/students/trends", params={"window": "14"}, headers=roster.students[0])
+    assert response.status_code == 422
+    assert client.get("/api/students/trends", headers=roster.faculty).status_code == 403
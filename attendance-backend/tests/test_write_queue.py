@@ -0,0 +1,63 @@
+import datetime
+import time
+from app.database import SessionLocal
+from app.models.user import User
+from app.schemas.attendance import BulkAttendanceCreate
+from app.services.write_queue import AttendanceWriteQueue
+
+
+def submission(roster, statuses):
+    return {
+        "course_id": roster.course_id,
+        "class_date": str(datetime.date.today()),
+        "attendance_data": [
+            {"student_id": roster.student_ids[n], "status": status} for n, status in statuses.items()
+        ],
+    }
+
+
+def wait_for(poll, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = poll()
+        if job["status"] in ("committed", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def test_queued_submissions_are_acknowledged_then_committed(client, roster, mark):
+    response = mark({0: "present", 1: "absent"}, params={"queued": True})
+    assert response.status_code == 202, response.text
+    job = response.json()
+    assert job["status"] == "queued"
+
+    def poll():
+        return client.get(f"/api/faculty/attendance/jobs/{job['job_id']}", headers=roster.faculty).json()
+
+    done = wait_for(poll)
+    assert done["status"] == "committed"
+    assert (done["result"]["inserted"], done["committed_at"] is not None) == (2, True)
+    assert mark({0: "present", 1: "absent"}).json()["unchanged"] == 2
+
+    # Only the submitter can see the job
+    assert client.get(f"/api/faculty/attendance/jobs/{job['job_id']}", headers=roster.admin).status_code == 404
+    assert client.get("/api/faculty/attendance/jobs/unknown", headers=roster.faculty).status_code == 404
+
+
+def test_a_failing_submission_does_not_sink_its_batch(roster, mark):
+    assert mark({0: "present"}, headers={**roster.faculty, "Idempotency-Key": "first"}).status_code == 200
+    writer = AttendanceWriteQueue(maxsize=10, batch_size=10, max_wait_ms=200)
+    db = SessionLocal()
+    try:
+        user_id = db.query(User.user_id).filter(User.email == roster.faculty_email).scalar()
+    finally:
+        db.close()
+
+    # Same key, different payload: an idempotency conflict inside the batch
+    bad = writer.submit(BulkAttendanceCreate(**submission(roster, {0: "absent"})), roster.faculty_id, "first", user_id)
+    good = writer.submit(BulkAttendanceCreate(**submission(roster, {1: "late"})), roster.faculty_id, None, user_id)
+
+    bad = wait_for(lambda: writer.status(bad["job_id"], user_id))
+    good = wait_for(lambda: writer.status(good["job_id"], user_id))
+    assert bad["status"] == "failed" and bad["error"]
+    assert (good["status"], good["result"]["inserted"]) == ("committed", 1)
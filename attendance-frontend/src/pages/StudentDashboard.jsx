@@ -21,7 +21,7 @@ const StudentDashboard = () => {
 
                 // Fetch real trend data
                 const trendResponse = await api.get('/api/students/trends');
-                setTrendData(trendResponse.data);
+                setTrendData(trendResponse.data.overall);
             } catch (error) {
                 console.error("Error fetching student data", error);
             } finally {
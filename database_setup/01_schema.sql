@@ -122,6 +122,60 @@ CREATE TABLE notifications (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- 11. Per-course daily attendance rollup (maintained by trigger, see attendance-backend/app/schema_patches.py)
+CREATE TABLE course_daily_attendance (
+    course_id UUID REFERENCES courses(course_id) ON DELETE CASCADE,
+    class_date DATE NOT NULL,
+    present_count INTEGER NOT NULL DEFAULT 0,
+    late_count INTEGER NOT NULL DEFAULT 0,
+    absent_count INTEGER NOT NULL DEFAULT 0,
+    excused_count INTEGER NOT NULL DEFAULT 0,
+    last_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (course_id, class_date)
+);
+
+-- 12. Early-warning shortage forecasts (rewritten nightly by run_shortage_forecast.py)
+CREATE TABLE shortage_forecasts (
+    enrollment_id UUID PRIMARY KEY REFERENCES course_enrollments(enrollment_id) ON DELETE CASCADE,
+    forecast_date DATE NOT NULL,
+    classes_held INTEGER NOT NULL,
+    current_percentage DECIMAL(5,2) NOT NULL,
+    recent_rate DECIMAL(5,2) NOT NULL,
+    trend_slope DECIMAL(6,2) NOT NULL,
+    projected_percentage DECIMAL(5,2) NOT NULL,
+    warning_percentage DECIMAL(5,2) NOT NULL,
+    sessions_to_warning INTEGER NOT NULL,
+    computed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 13. Cohort cube for admin analytics (maintained by trigger, see attendance-backend/app/schema_patches.py)
+CREATE TABLE attendance_cohort_cube (
+    student_department VARCHAR(100) NOT NULL,
+    semester INTEGER NOT NULL,
+    batch_year INTEGER NOT NULL,
+    course_department VARCHAR(100) NOT NULL,
+    academic_year VARCHAR(10) NOT NULL,
+    enrollments INTEGER NOT NULL DEFAULT 0,
+    total_classes INTEGER NOT NULL DEFAULT 0,
+    classes_attended INTEGER NOT NULL DEFAULT 0,
+    classes_late INTEGER NOT NULL DEFAULT 0,
+    classes_absent INTEGER NOT NULL DEFAULT 0,
+    classes_excused INTEGER NOT NULL DEFAULT 0,
+    percentage_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    shortage_count INTEGER NOT NULL DEFAULT 0,
+    last_updated TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (student_department, semester, batch_year, course_department, academic_year)
+);
+
+-- 14. Per-entity version counters behind the API's ETags
+CREATE TABLE entity_versions (
+    kind VARCHAR(20) NOT NULL,
+    entity_id VARCHAR(64) NOT NULL,
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (kind, entity_id)
+);
+
 -- Create indexes for performance
 CREATE INDEX idx_students_user_id ON students(user_id);
 CREATE INDEX idx_faculty_user_id ON faculty(user_id);
@@ -131,4 +185,5 @@ CREATE INDEX idx_attendance_records_enrollment ON attendance_records(enrollment_
 CREATE INDEX idx_attendance_records_date ON attendance_records(class_date);
 CREATE INDEX idx_attendance_enrollment_date ON attendance_records(enrollment_id, class_date);
 CREATE INDEX idx_shortage_reports_enrollment_date ON shortage_reports(enrollment_id, report_date DESC);
+CREATE UNIQUE INDEX uq_shortage_reports_enrollment_date ON shortage_reports(enrollment_id, report_date);
 CREATE INDEX idx_attendance_summary_shortage ON attendance_summary(shortage_status) WHERE shortage_status = TRUE;